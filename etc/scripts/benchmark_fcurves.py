@@ -0,0 +1,88 @@
+"""Benchmark of the vectorized F-curve evaluator on show-sized inputs.
+
+Builds one influence curve for every storyboard entry of every drone, with a
+mixture of constant, linear and Bézier segments, and evaluates all of them on
+every frame of the show in chunks, the same way the analytical show evaluator
+does. Prints the evaluation time and the peak memory usage of the process.
+
+Usage::
+
+    PYTHONPATH=src/modules python3 etc/scripts/benchmark_fcurves.py \\
+        --drones 3000 --entries 20 --minutes 20
+"""
+
+import resource
+import sys
+
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+from sbstudio.math.fcurves import BEZIER, CONSTANT, LINEAR, FCurveBatch, Keyframe
+
+
+def create_curves(
+    num_curves: int, num_frames: int, num_entries: int, seed: int
+) -> list[list[Keyframe]]:
+    """Creates influence curves that ramp up from 0 to 1 and back to 0 around
+    a randomly chosen storyboard entry of the show.
+    """
+    rng = Random(seed)
+    entry_length = max(num_frames // max(num_entries, 1), 8)
+    curves = []
+    for _ in range(num_curves):
+        start = rng.randrange(0, max(num_frames - entry_length, 1))
+        points = [start, start + entry_length // 4, start + 3 * entry_length // 4]
+        points.append(start + entry_length)
+        values = [0.0, 1.0, 1.0, 0.0]
+        curve = []
+        for x, y in zip(points, values):
+            interpolation = rng.choice((CONSTANT, LINEAR, BEZIER))
+            curve.append((x, y, x - 5.0, y, x + 5.0, y, interpolation))
+        curves.append(curve)
+    return curves
+
+
+def main() -> int:
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--drones", type=int, default=3000)
+    parser.add_argument("--entries", type=int, default=20)
+    parser.add_argument("--minutes", type=float, default=20)
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--max-values", type=int, default=1 << 20)
+    parser.add_argument("--seed", type=int, default=42)
+    options = parser.parse_args()
+
+    num_curves = options.drones * options.entries
+    num_frames = int(options.minutes * 60 * options.fps)
+
+    started = perf_counter()
+    batch = FCurveBatch(
+        create_curves(num_curves, num_frames, options.entries, options.seed)
+    )
+    built = perf_counter()
+
+    chunk_size = max(options.max_values // max(num_curves, 1), 1)
+    checksum = 0.0
+    for start in range(0, num_frames, chunk_size):
+        frames = range(start, min(start + chunk_size, num_frames))
+        checksum += float(batch.evaluate(frames).sum())
+    finished = perf_counter()
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+    print(f"Curves: {num_curves}, frames: {num_frames}, chunk: {chunk_size} frames")
+    print(f"Building the batch: {built - started:.2f} s")
+    print(
+        f"Evaluation: {finished - built:.2f} s "
+        f"({(finished - built) / num_frames * 1000:.2f} ms per frame)"
+    )
+    print(f"Peak memory usage: {peak_mb:.0f} MB")
+    print(f"Checksum: {checksum:.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
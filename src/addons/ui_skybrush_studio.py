@@ -74,6 +74,8 @@ from sbstudio.plugin.operators import (
     AddMarkersFromZippedDSSOperator,
     AppendFormationToStoryboardOperator,
     ApplyColorsToSelectedDronesOperator,
+    BakeLightEffectsOperator,
+    ClearLightEffectBakeOperator,
     CreateFormationOperator,
     CreateNewScheduleOverrideEntryOperator,
     CreateNewStoryboardEntryOperator,
@@ -120,6 +122,7 @@ from sbstudio.plugin.operators import (
     SkybrushCSVExportOperator,
     SkybrushPDFExportOperator,
     SkybrushSKYCAndPDFExportOperator,
+    SkybrushBatchExportOperator,
     SwapColorsInLEDControlPanelOperator,
     TakeoffOperator,
     TriggerPyroOnSelectedDronesOperator,
@@ -168,6 +171,7 @@ from sbstudio.plugin.state import (
 from sbstudio.plugin.tasks import (
     InitializationTask,
     InvalidatePixelCacheTask,
+    LightEffectBakeTask,
     PyroEffectsTask,
     SafetyCheckTask,
     UpdateLightEffectsTask,
@@ -224,6 +228,8 @@ operators = (
     RemoveLightEffectOperator,
     SetLightEffectEndFrameOperator,
     SetLightEffectStartFrameOperator,
+    BakeLightEffectsOperator,
+    ClearLightEffectBakeOperator,
     CreateTakeoffGridOperator,
     DetachMaterialsFromDroneTemplateOperator,
     FixConstraintOrderingOperator,
@@ -237,6 +243,7 @@ operators = (
     SkybrushCSVExportOperator,
     SkybrushPDFExportOperator,
     SkybrushSKYCAndPDFExportOperator,
+    SkybrushBatchExportOperator,
     DACExportOperator,
     DDSFExportOperator,
     DrotekExportOperator,
@@ -290,6 +297,7 @@ headers = ()
 tasks = (
     InitializationTask(),
     InvalidatePixelCacheTask(),
+    LightEffectBakeTask(),
     PyroEffectsTask(),
     SafetyCheckTask(),
     UpdateLightEffectsTask(),
@@ -4,6 +4,7 @@ import re
 from base64 import b64encode
 from collections.abc import Iterator, Sequence
 from contextlib import contextmanager
+from functools import partial
 from gzip import compress
 from http import HTTPStatus
 from http.client import HTTPResponse
@@ -12,6 +13,7 @@ from natsort import natsorted
 from pathlib import Path
 from shutil import copyfileobj
 from ssl import create_default_context, CERT_NONE
+from time import perf_counter
 from typing import Any, Optional
 from urllib.error import HTTPError
 from urllib.parse import urljoin
@@ -19,6 +21,7 @@ from urllib.request import Request, urlopen
 
 from sbstudio.model.cameras import Camera
 from sbstudio.model.color import Color3D
+from sbstudio.model.export_report import ExportReport, ExportStage
 from sbstudio.model.point import Point3D
 from sbstudio.model.light_program import LightProgram
 from sbstudio.model.location import ShowLocation
@@ -31,12 +34,22 @@ from sbstudio.model.yaw import YawSetpointList
 from sbstudio.utils import create_path_and_open
 
 from .constants import COMMUNITY_SERVER_URL
-from .errors import SkybrushStudioAPIError
+from .errors import RequestRejectedError, SkybrushStudioAPIError
+from .streaming import StreamedArray, iter_gzipped_json_chunks
 from .types import Limits, Mapping, SmartRTHPlan, TransitionPlan, Version
 
 __all__ = ("SkybrushStudioAPI",)
 
 
+_UNSUPPORTED_VERSION_PATTERN = re.compile(
+    r"\b(unsupported|unknown|invalid)\b.*\bversion\b", re.IGNORECASE
+)
+"""Regular expression matching the details of the errors that the server
+responds with when it does not support the requested version of the
+representation of a light program or a list of yaw setpoints.
+"""
+
+
 class Response:
     """Class representing a response from the Skybrush Studio API."""
 
@@ -133,6 +146,12 @@ class SkybrushStudioAPI:
     _http_status: dict[int | None, str]
     """Predefined HTTP status messages."""
 
+    _supports_binary_representations: Optional[bool] = None
+    """Whether the server accepts the binary (version 2) representations of
+    light programs and yaw setpoints in export requests; `None` if this is not
+    known yet.
+    """
+
     @staticmethod
     def validate_api_key(key: str) -> str:
         """Validates the given API key.
@@ -223,7 +242,14 @@ class SkybrushStudioAPI:
         self._root = value
 
     @contextmanager
-    def _send_request(self, url: str, data: Any = None) -> Iterator[Response]:
+    def _send_request(
+        self,
+        url: str,
+        data: Any = None,
+        *,
+        stream: bool = False,
+        report: Optional[ExportReport] = None,
+    ) -> Iterator[Response]:
         """Sends a request to the given URL, relative to the API root, and
         returns the corresponding HTTP response object.
 
@@ -240,6 +266,15 @@ class SkybrushStudioAPI:
                 object, it will be encoded as JSON, compressed with `gzip` and
                 then sent as a request with `Content-Type` equal to
                 `application/json`.
+            stream: whether to encode and compress JSON request bodies on the
+                fly and send them with chunked transfer encoding instead of
+                constructing the entire compressed body in memory first. The
+                body may contain `StreamedArray` instances in this case; their
+                items are generated and encoded one by one.
+            report: optional report where the time spent in encoding and
+                compressing the request body and in the network transfer
+                (including the time the server needs to respond) should be
+                recorded
 
         Raises:
             SkybrushStudioAPIError: when the request returned a non-successful
@@ -247,20 +282,30 @@ class SkybrushStudioAPI:
         """
         content_type = None
         content_encoding = None
+        encoding: Optional[ExportStage] = None
 
         if data is None:
             method = "GET"
         else:
             method = "POST"
-            if not isinstance(data, bytes):
-                data = json.dumps(data).encode("utf-8")
+            if isinstance(data, bytes):
+                content_type = "application/octet-stream"
+            else:
                 content_type = "application/json"
                 content_encoding = "gzip"
-            else:
-                content_type = "application/octet-stream"
-
-        if content_encoding == "gzip":
-            data = compress(data)
+                encoding = report.add("encoding") if report is not None else None
+                if stream:
+                    # urllib uses chunked transfer encoding automatically
+                    # for iterable request bodies
+                    data = iter_gzipped_json_chunks(data)
+                    if encoding is not None:
+                        data = encoding.measure_chunks(data)
+                else:
+                    start = perf_counter()
+                    data = compress(json.dumps(data).encode("utf-8"))
+                    if encoding is not None:
+                        encoding.duration = perf_counter() - start
+                        encoding.bytes = len(data)
 
         headers = {}
         if content_type is not None:
@@ -274,9 +319,21 @@ class SkybrushStudioAPI:
         req = Request(url, data=data, headers=headers, method=method)
 
         try:
+            start = perf_counter()
             with urlopen(req, context=self._request_context) as raw_response:
                 response = Response(raw_response)
                 response._run_sanity_checks()
+                if report is not None:
+                    # Streamed request bodies are encoded while they are being
+                    # uploaded so exclude the encoding time from the transfer
+                    duration = perf_counter() - start
+                    if encoding is not None and stream:
+                        duration -= encoding.duration
+                    report.add(
+                        "transfer",
+                        duration,
+                        bytes=encoding.bytes if encoding is not None else None,
+                    )
                 yield response
         except HTTPError as ex:
             # If the status code is 400, 403 or 500, we may have more details about the
@@ -296,8 +353,10 @@ class SkybrushStudioAPI:
                     decoded_body = {}
                 if isinstance(decoded_body, dict) and decoded_body.get("detail"):
                     detail = str(decoded_body.get("detail"))
-                    raise SkybrushStudioAPIError(
-                        f"{self._http_status[ex.status]}: {detail}"
+                    raise RequestRejectedError(
+                        f"{self._http_status[ex.status]}: {detail}",
+                        status=ex.status,
+                        detail=detail,
                     ) from None
             elif ex.status == 413:
                 # Content too large
@@ -367,10 +426,13 @@ class SkybrushStudioAPI:
         timestamp_offset: Optional[float] = None,
         time_markers: Optional[TimeMarkers] = None,
         cameras: Optional[list[Camera]] = None,
+        pyro_fps: Optional[int] = None,
+        trajectory_version: int = 2,
         renderer: str | list[str] = "skyc",
         renderer_params: Optional[
             dict[str, Any] | list[Optional[dict[str, Any]]]
         ] = None,
+        report: Optional[ExportReport] = None,
     ) -> Optional[bytes]:
         """
         Export drone show data.
@@ -396,11 +458,26 @@ class SkybrushStudioAPI:
             time_markers: When specified, time markers will be exported as
                 temporal cues.
             cameras: When specified, list of cameras to include in the environment.
+            pyro_fps: Frame rate that the frame numbers of the pyro programs
+                refer to; `None` to use the frame rate of the current Blender
+                scene.
+            trajectory_version: Version of the representation of the
+                trajectories. Version 3 is a compact, quantized delta encoding
+                that requires a recent server.
             renderer: The renderer(s) to use to export the show.
             renderer_params: Extra parameters for the renderer(s).
+            report: Optional report where the time spent in the individual
+                stages of the export request should be recorded.
 
         Note: drone names must match in trajectories and lights
 
+        Light programs and yaw setpoints are sent in their compact binary
+        representation. When the server rejects the first such request because
+        it does not support the representation, the request is repeated with
+        the standard representation, and the standard representation is used
+        for all subsequent requests to the same server. Requests with a
+        non-default trajectory version are not repeated.
+
         Returns:
             The exported drone show data or `None` if an `output` filename
             was specified.
@@ -434,26 +511,35 @@ class SkybrushStudioAPI:
 
         # TODO: add music to the "media" key
 
-        def format_drone(name: str):
+        if pyro_programs is not None and pyro_fps is None:
+            import bpy
+
+            pyro_fps = bpy.context.scene.render.fps
+
+        def format_drone(name: str, version: int):
             settings = {
                 "name": name,
-                "lights": lights[name].as_dict(ndigits=ndigits),
-                "trajectory": trajectories[name].as_dict(ndigits=ndigits),
+                "lights": lights[name].as_dict(ndigits=ndigits, version=version),
+                "trajectory": trajectories[name].as_dict(
+                    ndigits=ndigits, version=trajectory_version
+                ),
             }
 
             if pyro_programs is not None:
-                import bpy
-
-                fps = bpy.context.scene.render.fps
-
                 settings["pyro"] = pyro_programs[name].as_api_dict(
-                    fps=fps, ndigits=ndigits
+                    fps=pyro_fps, ndigits=ndigits
                 )
             if yaw_setpoints is not None:
-                settings["yawControl"] = yaw_setpoints[name].as_dict(ndigits=ndigits)
+                settings["yawControl"] = yaw_setpoints[name].as_dict(
+                    ndigits=ndigits, version=version
+                )
 
             return {"type": "generic", "settings": settings}
 
+        def format_drones(version: int):
+            for name in natsorted(trajectories.keys()):
+                yield format_drone(name, version)
+
         data: dict[str, Any] = {
             "input": {
                 "format": "json",
@@ -464,12 +550,7 @@ class SkybrushStudioAPI:
                         "cues": time_markers.as_dict(ndigits=ndigits),
                         "validation": validation.as_dict(ndigits=ndigits),
                     },
-                    "swarm": {
-                        "drones": [
-                            format_drone(name)
-                            for name in natsorted(trajectories.keys())
-                        ]
-                    },
+                    "swarm": {},
                     "meta": meta,
                 },
             },
@@ -491,11 +572,48 @@ class SkybrushStudioAPI:
             if renderer_params is not None:
                 data["output"]["parameters"] = renderer_params
 
-        with self._send_request(f"operations/{operation}", data) as response:
-            if output:
-                response.save_to_file(output)
-            else:
-                return response.as_bytes()
+        # Use the binary representations of light programs and yaw setpoints
+        # unless we know that the server does not support them. If we do not
+        # know yet, fall back to version 1 when the server rejects the request
+        # because of the version of the representation. This is not done for
+        # non-default trajectory versions as the rejection may be caused by
+        # the trajectories in this case
+        if self._supports_binary_representations is False:
+            versions = [1]
+        elif self._supports_binary_representations or trajectory_version != 2:
+            versions = [2]
+        else:
+            versions = [2, 1]
+        num_stages = len(report.stages) if report is not None else 0
+        for version in versions:
+            data["input"]["data"]["swarm"]["drones"] = StreamedArray(
+                partial(format_drones, version)
+            )
+            try:
+                with self._send_request(
+                    f"operations/{operation}", data, stream=True, report=report
+                ) as response:
+                    if self._supports_binary_representations is None:
+                        self._supports_binary_representations = version == 2
+                    with (report or ExportReport()).measure("write") as stage:
+                        if output:
+                            response.save_to_file(output)
+                            stage.bytes = Path(output).stat().st_size
+                            return None
+                        else:
+                            result = response.as_bytes()
+                            stage.bytes = len(result)
+                            return result
+            except RequestRejectedError as ex:
+                is_unsupported = _UNSUPPORTED_VERSION_PATTERN.search(ex.detail)
+                if version == versions[-1] or not is_unsupported:
+                    raise
+
+                # Forget the statistics of the rejected attempt so the report
+                # contains the stages of the successful one only
+                self._supports_binary_representations = False
+                if report is not None:
+                    del report.stages[num_stages:]
 
     def convert_show_to_csv(
         self,
@@ -590,6 +708,7 @@ class SkybrushStudioAPI:
         fps: float = 4,
         ndigits: int = 3,
         time_markers: Optional[TimeMarkers] = None,
+        report: Optional[ExportReport] = None,
     ) -> None:
         """Export drone show data into Skybrush Compiled Format (.skyc).
 
@@ -601,6 +720,8 @@ class SkybrushStudioAPI:
             fps: number of frames per second in the plots [1/s]
             ndigits: round floats to this precision
             time_markers: temporal cues to use in the plots
+            report: optional report where the time spent in the individual
+                stages of the request should be recorded
         """
 
         if time_markers is None:
@@ -642,8 +763,10 @@ class SkybrushStudioAPI:
             },
         }
 
-        with self._send_request("operations/render", data) as response:
-            response.save_to_file(output)
+        with self._send_request("operations/render", data, report=report) as response:
+            with (report or ExportReport()).measure("write") as stage:
+                response.save_to_file(output)
+                stage.bytes = Path(output).stat().st_size
 
     def get_limits(self) -> Limits:
         """Returns the limits and supported file formats of the server."""
@@ -14,6 +14,23 @@ class SkybrushStudioAPIError(SkybrushStudioError):
         return str(self)
 
 
+class RequestRejectedError(SkybrushStudioAPIError):
+    """Error thrown when the server rejects a request with an HTTP error code
+    and provides details about the reason of the rejection.
+    """
+
+    status: int
+    """The HTTP status code of the response."""
+
+    detail: str
+    """The details of the error as provided by the server."""
+
+    def __init__(self, message: str, *, status: int, detail: str):
+        super().__init__(message)
+        self.status = status
+        self.detail = detail
+
+
 class NoOnlineAccessAllowedError(SkybrushStudioAPIError):
     """Error thrown when online access is explicitly disabled in Blender."""
 
@@ -0,0 +1,117 @@
+"""Streaming JSON encoder for large request bodies that should not be
+materialized in memory all at once.
+"""
+
+import json
+
+from collections.abc import Iterable, Iterator
+from typing import Any, Callable
+from zlib import DEFLATED, MAX_WBITS, compressobj
+
+__all__ = ("StreamedArray", "iter_json_chunks", "iter_gzipped_json_chunks")
+
+
+DEFAULT_CHUNK_SIZE = 65536
+"""Default size of the chunks yielded by the gzip-compressed streaming
+encoder, in bytes.
+"""
+
+
+class StreamedArray:
+    """Placeholder for a JSON array whose items are produced lazily, one by one,
+    while the enclosing JSON document is being encoded.
+
+    Each item is encoded as soon as it is produced and it is not referenced
+    afterwards, so the whole array never has to be kept in memory.
+    """
+
+    _factory: Callable[[], Iterable[Any]]
+
+    def __init__(self, factory: Callable[[], Iterable[Any]]):
+        """Constructor.
+
+        Parameters:
+            factory: function that returns an iterable yielding the items of
+                the array when called. It is called once for every encoding of
+                the array.
+        """
+        self._factory = factory
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._factory())
+
+
+def iter_json_chunks(value: Any) -> Iterator[str]:
+    """Encodes the given value as JSON, yielding the encoded representation in
+    chunks.
+
+    The value may contain `StreamedArray` instances anywhere in its structure;
+    these are encoded as regular JSON arrays, one item at a time. Other parts of
+    the value are encoded with `json.dumps()`.
+    """
+    if isinstance(value, StreamedArray):
+        yield "["
+        for index, item in enumerate(value):
+            if index:
+                yield ", "
+            yield from iter_json_chunks(item)
+        yield "]"
+    elif isinstance(value, dict) and _contains_streamed_array(value):
+        yield "{"
+        for index, (key, item) in enumerate(value.items()):
+            if index:
+                yield ", "
+            yield json.dumps(str(key))
+            yield ": "
+            yield from iter_json_chunks(item)
+        yield "}"
+    elif isinstance(value, (list, tuple)) and _contains_streamed_array(value):
+        yield "["
+        for index, item in enumerate(value):
+            if index:
+                yield ", "
+            yield from iter_json_chunks(item)
+        yield "]"
+    else:
+        yield json.dumps(value)
+
+
+def iter_gzipped_json_chunks(
+    value: Any, *, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Encodes the given value as JSON and compresses it with gzip on the fly,
+    yielding the compressed representation in chunks of approximately the
+    given size.
+
+    The value may contain `StreamedArray` instances; see `iter_json_chunks()`
+    for more details.
+    """
+    compressor = compressobj(wbits=MAX_WBITS | 16, method=DEFLATED)
+    pending: list[bytes] = []
+    pending_size = 0
+
+    for chunk in iter_json_chunks(value):
+        compressed = compressor.compress(chunk.encode("utf-8"))
+        if compressed:
+            pending.append(compressed)
+            pending_size += len(compressed)
+            if pending_size >= chunk_size:
+                yield b"".join(pending)
+                pending.clear()
+                pending_size = 0
+
+    pending.append(compressor.flush())
+    yield b"".join(pending)
+
+
+def _contains_streamed_array(value: Any) -> bool:
+    """Returns whether the given dict, list or tuple contains a
+    `StreamedArray` anywhere in its structure.
+    """
+    items = value.values() if isinstance(value, dict) else value
+    for item in items:
+        if isinstance(item, StreamedArray):
+            return True
+        if isinstance(item, (dict, list, tuple)) and _contains_streamed_array(item):
+            return True
+    return False
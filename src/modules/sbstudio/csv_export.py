@@ -0,0 +1,235 @@
+"""Local renderer that writes drone shows into the zipped Skybrush CSV format
+without sending them to a Skybrush Studio server first.
+
+The output consists of one CSV file per drone, each containing the position
+and the color of the drone, resampled at a fixed frame rate. Unlike the
+renderer of the Skybrush Studio server, the local renderer does not write the
+yaw and pyro columns.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from numpy import (
+    arange,
+    array,
+    clip,
+    column_stack,
+    empty,
+    float64,
+    interp,
+    newaxis,
+    rint,
+    savetxt,
+    searchsorted,
+    uint8,
+    where,
+)
+from numpy.typing import NDArray
+from pathlib import Path
+from time import localtime
+from typing import Optional
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+from zlib import DEFLATED, Z_DEFAULT_COMPRESSION, compressobj, crc32
+
+from sbstudio.model.light_program import LightProgram
+from sbstudio.model.trajectory import Trajectory
+
+__all__ = ("render_csv_zip", "sample_light_program", "sample_trajectory")
+
+
+CSV_HEADER = "Time [msec],x [m],y [m],z [m],Red,Green,Blue"
+"""Header line of the CSV files in the zipped Skybrush CSV format."""
+
+_CSV_ROW_FORMAT = "%d,%.3f,%.3f,%.3f,%d,%d,%d"
+"""Format string of a single row in the CSV files."""
+
+
+def sample_trajectory(trajectory: Trajectory, times: NDArray) -> NDArray:
+    """Samples a trajectory at the given timestamps, assuming linear
+    interpolation between the points of the trajectory.
+
+    Parameters:
+        trajectory: the trajectory to sample
+        times: the timestamps to sample the trajectory at
+
+    Returns:
+        array of shape ``(N, 3)`` with the sampled coordinates. Timestamps
+        before the first or after the last point of the trajectory get the
+        coordinates of the first or last point. All coordinates are zero when
+        the trajectory is empty.
+    """
+    result = empty((len(times), 3), dtype=float64)
+    points = array([point.as_tuple() for point in trajectory.points], dtype=float64)
+    if len(points) == 0:
+        result.fill(0)
+        return result
+
+    for axis in range(3):
+        result[:, axis] = interp(times, points[:, 0], points[:, axis + 1])
+
+    return result
+
+
+def sample_light_program(light_program: LightProgram, times: NDArray) -> NDArray:
+    """Samples a light program at the given timestamps.
+
+    The color is interpolated linearly towards keypoints that are marked as
+    fades and kept constant before keypoints that are not.
+
+    Parameters:
+        light_program: the light program to sample
+        times: the timestamps to sample the light program at
+
+    Returns:
+        array of shape ``(N, 3)`` with the sampled RGB colors as unsigned
+        bytes. Timestamps before the first or after the last keypoint get the
+        color of the first or last keypoint. All colors are white when the
+        light program is empty.
+    """
+    colors = light_program.colors
+    result = empty((len(times), 3), dtype=uint8)
+    if not colors:
+        result.fill(255)
+        return result
+
+    keys = array([color.t for color in colors], dtype=float64)
+    rgb = array([(color.r, color.g, color.b) for color in colors], dtype=float64)
+    is_fade = array([color.is_fade for color in colors], dtype=bool)
+
+    # Index of the last keypoint not later than each timestamp, and the
+    # keypoint that follows it
+    prev = clip(searchsorted(keys, times, side="right") - 1, 0, len(keys) - 1)
+    following = clip(prev + 1, 0, len(keys) - 1)
+
+    span = keys[following] - keys[prev]
+    is_fading = (span > 0) & is_fade[following]
+    ratios = where(is_fading, (times - keys[prev]) / where(is_fading, span, 1), 0)
+    ratios = clip(ratios, 0, 1)
+
+    sampled = rgb[prev] + ratios[:, newaxis] * (rgb[following] - rgb[prev])
+    result[:] = clip(rint(sampled), 0, 255)
+    return result
+
+
+def render_csv_zip(
+    output: Path,
+    *,
+    trajectories: dict[str, Trajectory],
+    lights: Optional[dict[str, LightProgram]] = None,
+    fps: float = 4,
+    max_workers: Optional[int] = None,
+) -> None:
+    """Writes the given trajectories and light programs into a zipped Skybrush
+    CSV file, one CSV file per drone.
+
+    All the drones are sampled at the same timestamps, from zero to the end of
+    the longest trajectory or light program, at the given frame rate.
+
+    The CSV files of the individual drones are rendered and compressed in a
+    thread pool; the compressed files are then written into the output file
+    in the order of the trajectories in the input dictionary. The files
+    contain the positions and colors of the drones only; the yaw and pyro
+    columns of the CSV files rendered by the server are omitted.
+
+    Parameters:
+        output: the path of the output file
+        trajectories: dictionary of trajectories indexed by drone names
+        lights: dictionary of light programs indexed by drone names. Drones
+            without a light program are white.
+        fps: number of samples per second
+        max_workers: maximum number of worker threads; `None` lets the thread
+            pool decide
+    """
+    if fps <= 0:
+        raise ValueError("frame rate must be positive")
+
+    lights = lights or {}
+    times = _get_sampling_times(trajectories, lights, fps)
+
+    def render(name: str) -> tuple[bytes, int, int]:
+        positions = sample_trajectory(trajectories[name], times)
+        colors = sample_light_program(lights.get(name) or LightProgram(), times)
+        data = _format_csv(times, positions, colors)
+
+        # zlib releases the GIL while compressing so the files of the drones
+        # are compressed in parallel; raw deflate streams are what ZIP stores
+        compressor = compressobj(Z_DEFAULT_COMPRESSION, DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        return compressed, crc32(data), len(data)
+
+    names = list(trajectories.keys())
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with ZipFile(output, "w", compression=ZIP_DEFLATED) as zip_file:
+            for name, (data, crc, size) in zip(names, executor.map(render, names)):
+                _write_compressed_member(zip_file, f"{name}.csv", data, crc, size)
+
+
+def _write_compressed_member(
+    zip_file: ZipFile, name: str, data: bytes, crc: int, size: int
+) -> None:
+    """Writes a member that is already compressed with raw deflate into the
+    given ZIP file that is open for writing.
+
+    `ZipFile` has no public API for this so the local header and the data
+    are written directly into the underlying file; the member is then
+    registered in the ZIP file so it is added to the central directory when
+    the file is closed.
+
+    Parameters:
+        zip_file: the ZIP file to write the member into
+        name: the name of the member
+        data: the compressed contents of the member
+        crc: CRC-32 checksum of the uncompressed contents
+        size: size of the uncompressed contents
+    """
+    info = ZipInfo(name, date_time=localtime()[:6])
+    info.compress_type = ZIP_DEFLATED
+    info.external_attr = 0o600 << 16
+    info.file_size = size
+    info.compress_size = len(data)
+    info.CRC = crc
+
+    fp = zip_file.fp
+    assert fp is not None
+    info.header_offset = fp.tell()
+    fp.write(info.FileHeader())
+    fp.write(data)
+
+    zip_file.filelist.append(info)
+    zip_file.NameToInfo[name] = info
+    zip_file.start_dir = fp.tell()  # type: ignore
+
+
+def _get_sampling_times(
+    trajectories: dict[str, Trajectory],
+    lights: dict[str, LightProgram],
+    fps: float,
+) -> NDArray:
+    """Returns the common timestamps where all the drones should be sampled."""
+    end = 0.0
+    for trajectory in trajectories.values():
+        if trajectory.points:
+            end = max(end, trajectory.points[-1].t)
+    for light_program in lights.values():
+        if light_program.colors:
+            end = max(end, light_program.colors[-1].t)
+
+    # Round to whole milliseconds so the timestamps in the CSV files are exact;
+    # make sure that the end of the show is included
+    times = rint(arange(int(end * fps) + 1, dtype=float64) / fps * 1000) / 1000
+    end = round(end, 3)
+    if times[-1] < end:
+        times = array([*times, end], dtype=float64)
+    return times
+
+
+def _format_csv(times: NDArray, positions: NDArray, colors: NDArray) -> bytes:
+    """Formats the sampled positions and colors of a single drone as a CSV
+    file.
+    """
+    rows = column_stack((rint(times * 1000), positions, colors))
+    buffer = BytesIO()
+    savetxt(
+        buffer, rows, fmt=_CSV_ROW_FORMAT, header=CSV_HEADER, comments="", newline="\n"
+    )
+    return buffer.getvalue()
@@ -1,7 +1,14 @@
 from enum import auto, IntEnum
-from typing import Callable, List, MutableSequence, Sequence
+from numpy import asarray, clip, float64, int64, maximum, minimum, rint, sqrt, where
+from numpy.typing import ArrayLike, NDArray
+from typing import Callable, List, MutableSequence, Optional, Sequence
 
-__all__ = ("blend_in_place", "BlendMode")
+__all__ = (
+    "blend_array_in_place",
+    "blend_in_place",
+    "evaluate_lookup_table",
+    "BlendMode",
+)
 
 
 class BlendMode(IntEnum):
@@ -18,7 +25,7 @@ class BlendMode(IntEnum):
     # saved Blender scenes.
     #
     # When adding a new blend mode, also add a new function to the end of
-    # _blend_funcs below
+    # _blend_funcs and _array_blend_funcs below
 
     @property
     def description(self) -> str:
@@ -167,3 +174,159 @@ def blend_in_place(
     blend = _blend_funcs[mode]
     blend(source, backdrop, a, 1 - a)
     backdrop[3] = alpha_overlay
+
+
+# Array-based variants of the blending functions above. Each function receives
+# the RGB parts of the source and backdrop colors as arrays of shape (N, 3) and
+# the weights of the source and backdrop as arrays of shape (N, 1), and returns
+# the blended RGB colors. The expressions mirror the scalar variants so the
+# results are identical to the ones of `blend_in_place()`, except for the
+# rounding of the square root in the soft light mode.
+
+
+def _blend_normal_array(source: NDArray, backdrop: NDArray, a, b) -> NDArray:
+    return a * source + b * backdrop
+
+
+def _blend_multiply_array(source: NDArray, backdrop: NDArray, a, b) -> NDArray:
+    return a * backdrop * source + b * backdrop
+
+
+def _blend_screen_array(source: NDArray, backdrop: NDArray, a, b) -> NDArray:
+    return a * (1 - (1 - backdrop) * (1 - source)) + b * backdrop
+
+
+def _blend_darken_array(source: NDArray, backdrop: NDArray, a, b) -> NDArray:
+    return a * minimum(backdrop, source) + b * backdrop
+
+
+def _blend_lighten_array(source: NDArray, backdrop: NDArray, a, b) -> NDArray:
+    return a * maximum(backdrop, source) + b * backdrop
+
+
+def _blend_overlay_array(source: NDArray, backdrop: NDArray, a, b) -> NDArray:
+    return where(
+        backdrop >= 0.5,
+        a * (1 - (2 - 2 * backdrop) * (1 - source)) + b * backdrop,
+        a * (2 * backdrop) * source + b * backdrop,
+    )
+
+
+def _blend_hard_light_array(source: NDArray, backdrop: NDArray, a, b) -> NDArray:
+    return where(
+        source <= 0.5,
+        a * backdrop * (2 * source) + b * backdrop,
+        a * (1 - (1 - backdrop) * (2 - 2 * source)) + b * backdrop,
+    )
+
+
+def _blend_soft_light_array(source: NDArray, backdrop: NDArray, a, b) -> NDArray:
+    # Same W3C variant as in _blend_soft_light(). The square root is evaluated
+    # on clipped values to avoid warnings in the branch that is not selected.
+    d = where(
+        backdrop <= 0.25,
+        ((16 * backdrop - 12) * backdrop + 4) * backdrop,
+        sqrt(clip(backdrop, 0.25, None)),
+    )
+    return where(
+        source <= 0.5,
+        a * (backdrop - (1 - 2 * source) * backdrop * (1 - backdrop)) + b * backdrop,
+        a * (backdrop + (2 * source - 1) * (d - backdrop)) + b * backdrop,
+    )
+
+
+def _blend_nop_array(source: NDArray, backdrop: NDArray, a, b) -> NDArray:
+    return backdrop
+
+
+_array_blend_funcs: List[Callable[[NDArray, NDArray, NDArray, NDArray], NDArray]] = [
+    _blend_nop_array,
+    _blend_normal_array,
+    _blend_multiply_array,
+    _blend_screen_array,
+    _blend_darken_array,
+    _blend_lighten_array,
+    _blend_overlay_array,
+    _blend_soft_light_array,
+    _blend_hard_light_array,
+]
+
+
+if len(_array_blend_funcs) != len(_blend_funcs):
+    raise RuntimeError("one or more blend modes are unimplemented for arrays")
+
+
+def blend_array_in_place(
+    source: ArrayLike,
+    backdrop: NDArray,
+    mode: BlendMode = BlendMode.NORMAL,
+    alpha: Optional[ArrayLike] = None,
+) -> None:
+    """Blends an array of colors onto another array of colors according to
+    standard alpha compositing rules, using the given blending mode and
+    updating the second array in-place.
+
+    This function is equivalent to calling `blend_in_place()` on each row of
+    the arrays (up to floating-point rounding), but it processes all the rows
+    at once.
+
+    Parameters:
+        source: the colors to blend, as an array of shape ``(N, 4)``
+        backdrop: the colors to blend onto, as a floating-point array of shape
+            ``(N, 4)``; modified in-place
+        mode: the blending mode
+        alpha: optional array of shape ``(N,)`` that the alpha channel of each
+            source color is multiplied with before blending. Rows where the
+            resulting alpha is zero are left intact.
+    """
+    source = asarray(source, dtype=float64)
+    if alpha is None:
+        alpha_source = source[:, 3]
+    else:
+        alpha_source = source[:, 3] * asarray(alpha, dtype=float64)
+
+    # Shortcut for the common case when the source is opaque and the mode is
+    # NORMAL
+    if mode is BlendMode.NORMAL:
+        opaque = alpha_source >= 1
+        if opaque.any():
+            backdrop[opaque, :3] = source[opaque, :3]
+            backdrop[opaque, 3] = alpha_source[opaque]
+        active = (alpha_source > 0) & ~opaque
+    else:
+        active = alpha_source > 0
+
+    if not active.any():
+        return
+
+    alpha_source = alpha_source[active]
+    alpha_backdrop = backdrop[active, 3]
+
+    is_backdrop_opaque = alpha_backdrop >= 1
+    alpha_overlay = where(
+        is_backdrop_opaque, 1, 1 - (1 - alpha_source) * (1 - alpha_backdrop)
+    )
+    a = (alpha_source / alpha_overlay)[:, None]
+
+    blend = _array_blend_funcs[mode]
+    backdrop[active, :3] = blend(source[active, :3], backdrop[active, :3], a, 1 - a)
+    backdrop[active, 3] = alpha_overlay
+
+
+def evaluate_lookup_table(table: NDArray, values: ArrayLike) -> NDArray:
+    """Evaluates a lookup table that samples a color gradient (e.g., a color
+    ramp) at evenly spaced positions of the [0; 1] range.
+
+    Parameters:
+        table: the lookup table, as an array of shape ``(M, 4)``; the first
+            row belongs to position 0 and the last row to position 1
+        values: the positions to evaluate the gradient at; values outside the
+            [0; 1] range are clamped and all the values are rounded to the
+            nearest entry of the table
+
+    Returns:
+        the colors of the gradient at the given positions
+    """
+    values = clip(asarray(values, dtype=float64), 0.0, 1.0)
+    indices = rint(values * (len(table) - 1)).astype(int64)
+    return table[indices]
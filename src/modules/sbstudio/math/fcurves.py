@@ -0,0 +1,339 @@
+"""Vectorized evaluation of Blender-style F-curves that were snapshotted into
+plain keyframe tuples.
+"""
+
+from numpy import (
+    arange,
+    argsort,
+    asarray,
+    bincount,
+    clip,
+    empty,
+    float64,
+    full,
+    inf,
+    int8,
+    int64,
+    minimum,
+    maximum,
+    newaxis,
+    nonzero,
+    searchsorted,
+    where,
+    zeros,
+)
+from numpy.typing import ArrayLike, NDArray
+from typing import Sequence
+
+__all__ = ("FCurveBatch", "Keyframe", "CONSTANT", "LINEAR", "BEZIER")
+
+
+CONSTANT = 0
+"""Interpolation code of keyframes that hold their value until the next one."""
+
+LINEAR = 1
+"""Interpolation code of keyframes that are linearly interpolated."""
+
+BEZIER = 2
+"""Interpolation code of keyframes that are interpolated with a cubic Bézier
+curve defined by the handles of the keyframes.
+"""
+
+Keyframe = tuple[float, float, float, float, float, float, int]
+"""Snapshot of a single keyframe: the X and Y coordinates of the keyframe, the
+X and Y coordinates of its left handle, the X and Y coordinates of its right
+handle, and the interpolation code of the segment that _starts_ at the
+keyframe.
+"""
+
+_BISECTION_STEPS = 40
+"""Number of bisection steps used to find the curve parameter corresponding to
+a given frame in a Bézier segment; 40 steps yield a precision well below
+1e-9 on the unit interval.
+"""
+
+
+class FCurveBatch:
+    """Batch of snapshotted F-curves that can be evaluated at many frames at
+    once, in a vectorized manner.
+
+    The curves use constant extrapolation, i.e. they hold the value of their
+    first keyframe before the first keyframe and the value of their last
+    keyframe after the last keyframe, just like Blender F-curves with the
+    default extrapolation mode.
+    """
+
+    _co: NDArray[float64]
+    """Keyframe coordinates of all curves, padded to the same length; shape
+    is ``(N, K, 2)``.
+    """
+
+    _handle_left: NDArray[float64]
+    """Left handles of all keyframes; shape is ``(N, K, 2)``."""
+
+    _handle_right: NDArray[float64]
+    """Right handles of all keyframes; shape is ``(N, K, 2)``."""
+
+    _interpolation: NDArray[int8]
+    """Interpolation codes of all keyframes; shape is ``(N, K)``."""
+
+    _num_keyframes: NDArray
+    """Number of keyframes in each curve; shape is ``(N,)``."""
+
+    _keyframe_curve: NDArray
+    """Index of the curve of each keyframe of all the curves, without the
+    padding; shape is ``(M,)`` where M is the total number of keyframes.
+    """
+
+    _keyframe_x: NDArray[float64]
+    """X coordinate of each keyframe of all the curves, without the padding;
+    shape is ``(M,)``.
+    """
+
+    def __init__(self, curves: Sequence[Sequence[Keyframe]]):
+        """Constructor.
+
+        Parameters:
+            curves: the keyframes of each curve, sorted by their X coordinates.
+                Each curve must have at least one keyframe.
+        """
+        num_curves = len(curves)
+        max_length = max((len(curve) for curve in curves), default=1)
+
+        co = zeros((num_curves, max_length, 2), dtype=float64)
+        handle_left = zeros((num_curves, max_length, 2), dtype=float64)
+        handle_right = zeros((num_curves, max_length, 2), dtype=float64)
+        interpolation = zeros((num_curves, max_length), dtype=int8)
+
+        # Padding keyframes are placed at infinity so they never precede a
+        # frame being evaluated
+        co[:, :, 0] = inf
+
+        num_keyframes = zeros(num_curves, dtype=int)
+        for index, curve in enumerate(curves):
+            if not curve:
+                raise ValueError("F-curves must have at least one keyframe")
+
+            length = len(curve)
+            data = asarray(curve, dtype=float64)
+            co[index, :length] = data[:, 0:2]
+            handle_left[index, :length] = data[:, 2:4]
+            handle_right[index, :length] = data[:, 4:6]
+            interpolation[index, :length] = data[:, 6]
+            num_keyframes[index] = length
+
+        self._co = co
+        self._handle_left = handle_left
+        self._handle_right = handle_right
+        self._interpolation = interpolation
+        self._num_keyframes = num_keyframes
+
+        curve_indices, keyframe_indices = nonzero(
+            arange(max_length)[newaxis, :] < num_keyframes[:, newaxis]
+        )
+        self._keyframe_curve = curve_indices
+        self._keyframe_x = co[curve_indices, keyframe_indices, 0]
+
+    def __len__(self) -> int:
+        return len(self._num_keyframes)
+
+    def evaluate(self, frames: ArrayLike) -> NDArray[float64]:
+        """Evaluates all the curves in the batch at the given frames.
+
+        The memory needed by the evaluation is proportional to the size of the
+        result, so callers evaluating many curves should split the frames into
+        chunks accordingly.
+
+        Parameters:
+            frames: the frames to evaluate the curves at; shape is ``(F,)``
+
+        Returns:
+            the values of the curves; shape is ``(F, N)``
+        """
+        frames = asarray(frames, dtype=float64)
+        num_frames, num_curves = len(frames), len(self)
+        if not num_curves:
+            return zeros((num_frames, 0), dtype=float64)
+
+        # Find the segment that each frame belongs to in each curve; index -1
+        # means that the frame is before the first keyframe
+        segment = self._find_segments(frames)
+        last = self._num_keyframes[newaxis, :] - 1
+        before_first = segment < 0
+        after_last = segment >= last
+
+        start = clip(segment, 0, last)
+        end = clip(segment + 1, 0, last)
+        del segment
+
+        # Indices into the flattened (N, K) keyframe arrays; gathering with
+        # these is much faster than gathering along the transposed arrays
+        offset = arange(num_curves)[newaxis, :] * self._co.shape[1]
+        flat_start, flat_end = start + offset, end + offset
+
+        x, y = self._co[:, :, 0].ravel(), self._co[:, :, 1].ravel()
+        x0, y0 = x.take(flat_start), y.take(flat_start)
+        x1, y1 = x.take(flat_end), y.take(flat_end)
+        interpolation = self._interpolation.ravel().take(flat_start)
+        del flat_start, flat_end
+
+        span = where(after_last, 1.0, x1 - x0)
+        span = where(span > 0, span, 1.0)
+        ratio = clip((frames[:, newaxis] - x0) / span, 0.0, 1.0)
+
+        result = where(interpolation == CONSTANT, y0, y0 + (y1 - y0) * ratio)
+        del span, ratio
+
+        # Bisection is needed only for the frames that fall into Bézier
+        # segments so it is run on those entries only
+        frame_indices, curve_indices = nonzero(
+            (interpolation == BEZIER) & ~after_last & ~before_first
+        )
+        if len(frame_indices):
+            result[frame_indices, curve_indices] = self._evaluate_bezier(
+                frames[frame_indices],
+                curve_indices,
+                start[frame_indices, curve_indices],
+                end[frame_indices, curve_indices],
+            )
+
+        result = where(before_first, y0, result)
+        result = where(after_last, y.take(last + offset), result)
+        return result
+
+    def is_constant_between(self, start: float, end: float) -> NDArray:
+        """Returns whether each curve in the batch is provably constant in the
+        given closed interval of frames.
+
+        The check is conservative: it inspects the keyframes and Bézier
+        handles of the segments overlapping with the interval, and reports a
+        curve as constant only if all of them are equal to the value of the
+        curve at the start of the interval.
+
+        Parameters:
+            start: the start of the interval
+            end: the end of the interval
+
+        Returns:
+            a boolean array with one entry per curve
+        """
+        num_curves = len(self)
+        if not num_curves:
+            return zeros(0, dtype=bool)
+
+        x = self._co[:, :, 0]
+        y = self._co[:, :, 1]
+        value = self.evaluate([start])[0][:, newaxis]
+
+        # Keyframes from the one that starts the segment containing the start
+        # of the interval up to the first one at or after its end
+        index = arange(x.shape[1])[newaxis, :]
+        last = self._num_keyframes[:, newaxis] - 1
+        first_relevant = maximum((x <= start).sum(axis=1)[:, newaxis] - 1, 0)
+        last_relevant = minimum((x < end).sum(axis=1)[:, newaxis], last)
+        relevant = (index >= first_relevant) & (index <= last_relevant)
+
+        # A keyframe after the end of the interval does not matter if the
+        # segment leading to it is constant
+        reached_via_constant = zeros(x.shape, dtype=bool)
+        reached_via_constant[:, 1:] = self._interpolation[:, :-1] == CONSTANT
+        relevant &= (x <= end) | ~reached_via_constant | (index == first_relevant)
+        keys_ok = where(relevant, y == value, True).all(axis=1)
+
+        # Bézier segments may overshoot even if their endpoints are equal so
+        # their handles need to be checked as well
+        is_bezier_segment = (
+            relevant & (index < last_relevant) & (self._interpolation == BEZIER)
+        )
+        right_ok = self._handle_right[:, :, 1] == value
+        left_ok = self._handle_left[:, 1:, 1] == value
+        handles_ok = where(is_bezier_segment[:, :-1], right_ok[:, :-1] & left_ok, True)
+
+        return keys_ok & handles_ok.all(axis=1)
+
+    def _evaluate_bezier(
+        self,
+        frames: NDArray[float64],
+        curves: NDArray,
+        start: NDArray,
+        end: NDArray,
+    ) -> NDArray[float64]:
+        """Evaluates Bézier segments of the curves at the given frames.
+
+        Handles are corrected the same way as Blender does it: when the
+        handles of a segment overlap along the X axis, both are scaled down
+        proportionally so the curve remains a function of X.
+
+        Parameters:
+            frames: the frames to evaluate the segments at; shape is ``(M,)``
+            curves: the index of the curve for each frame; shape is ``(M,)``
+            start: the index of the keyframe starting the segment for each
+                frame; shape is ``(M,)``
+            end: the index of the keyframe ending the segment for each frame;
+                shape is ``(M,)``
+
+        Returns:
+            the values of the segments at the given frames; shape is ``(M,)``
+        """
+        x0, y0 = self._co[curves, start, 0], self._co[curves, start, 1]
+        x1, y1 = self._co[curves, end, 0], self._co[curves, end, 1]
+        hr_x = self._handle_right[curves, start, 0]
+        hr_y = self._handle_right[curves, start, 1]
+        hl_x = self._handle_left[curves, end, 0]
+        hl_y = self._handle_left[curves, end, 1]
+
+        h1_x, h1_y = x0 - hr_x, y0 - hr_y
+        h2_x, h2_y = x1 - hl_x, y1 - hl_y
+        length = x1 - x0
+        total = abs(h1_x) + abs(h2_x)
+        factor = where(total > length, length / where(total > 0, total, 1.0), 1.0)
+
+        p1_x, p1_y = x0 - factor * h1_x, y0 - factor * h1_y
+        p2_x, p2_y = x1 - factor * h2_x, y1 - factor * h2_y
+
+        # Find the curve parameter for each frame with bisection; the X
+        # coordinate is monotonic in the curve parameter after the correction
+        lo = zeros(frames.shape, dtype=float64)
+        hi = full(frames.shape, 1.0, dtype=float64)
+        for _ in range(_BISECTION_STEPS):
+            mid = (lo + hi) / 2
+            below = _cubic(x0, p1_x, p2_x, x1, mid) < frames
+            lo = where(below, mid, lo)
+            hi = where(below, hi, mid)
+
+        return _cubic(y0, p1_y, p2_y, y1, (lo + hi) / 2)
+
+    def _find_segments(self, frames: NDArray[float64]) -> NDArray:
+        """Finds the index of the keyframe that starts the segment containing
+        each frame in each curve.
+
+        Instead of comparing every frame with every keyframe of every curve,
+        each keyframe is located among the sorted frames with a binary search,
+        and the number of keyframes preceding each frame is then counted with
+        a cumulative sum over the frames.
+
+        Parameters:
+            frames: the frames to evaluate the curves at; shape is ``(F,)``
+
+        Returns:
+            the keyframe indices; shape is ``(F, N)``. -1 means that the frame
+            is before the first keyframe of the curve.
+        """
+        num_frames, num_curves = len(frames), len(self)
+
+        order = argsort(frames, kind="stable")
+        positions = searchsorted(frames[order], self._keyframe_x, side="left")
+        counts = bincount(
+            positions * num_curves + self._keyframe_curve,
+            minlength=(num_frames + 1) * num_curves,
+        ).reshape(num_frames + 1, num_curves)[:num_frames]
+
+        segment = empty((num_frames, num_curves), dtype=int64)
+        segment[order] = counts.cumsum(axis=0) - 1
+        return segment
+
+
+def _cubic(p0, p1, p2, p3, t):
+    """Evaluates a one-dimensional cubic Bézier curve at parameter ``t``."""
+    s = 1 - t
+    return s * s * s * p0 + 3 * s * s * t * p1 + 3 * s * t * t * p2 + t * t * t * p3
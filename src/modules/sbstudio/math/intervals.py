@@ -0,0 +1,106 @@
+"""Index structure for answering which intervals of a fixed set of intervals
+contain a given point or overlap with a given range.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Iterable
+
+__all__ = ("IntervalIndex",)
+
+
+class IntervalIndex:
+    """Static index over a set of half-open intervals ``[start, end)``, each
+    identified by its position in the list of intervals that the index was
+    built from.
+
+    The index splits the number line at the endpoints of the intervals into
+    segments and stores the intervals covering each segment, so the intervals
+    containing a point are found with a single binary search. Queries take
+    O(log n + k) time where k is the number of intervals returned. The index
+    is meant to be rebuilt when the intervals change.
+    """
+
+    _breakpoints: list[float]
+    """Sorted list of the distinct endpoints of the intervals."""
+
+    _covering: list[tuple[int, ...]]
+    """Indices of the intervals covering the segment starting at the
+    corresponding breakpoint, in increasing order.
+    """
+
+    _starts: list[float]
+    """Start points of the intervals, in increasing order."""
+
+    _indices_by_start: list[int]
+    """Indices of the intervals, sorted by their start points."""
+
+    def __init__(self, intervals: Iterable[tuple[float, float]]):
+        """Constructor.
+
+        Parameters:
+            intervals: the start and end points of the intervals; the end
+                points are excluded. Empty intervals are ignored.
+        """
+        items = [
+            (start, end, index)
+            for index, (start, end) in enumerate(intervals)
+            if start < end
+        ]
+
+        items.sort()
+        self._starts = [start for start, _, _ in items]
+        self._indices_by_start = [index for _, _, index in items]
+
+        events: dict[float, tuple[list[int], list[int]]] = {}
+        for start, end, index in items:
+            events.setdefault(start, ([], []))[0].append(index)
+            events.setdefault(end, ([], []))[1].append(index)
+
+        self._breakpoints = sorted(events)
+        self._covering = []
+
+        active: set[int] = set()
+        for point in self._breakpoints:
+            added, removed = events[point]
+            active.difference_update(removed)
+            active.update(added)
+            self._covering.append(tuple(sorted(active)))
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def query(self, point: float) -> tuple[int, ...]:
+        """Returns the indices of the intervals containing the given point.
+
+        Parameters:
+            point: the point to query
+
+        Returns:
+            the indices of the intervals containing the point, in increasing
+            order
+        """
+        segment = bisect_right(self._breakpoints, point) - 1
+        return self._covering[segment] if segment >= 0 else ()
+
+    def query_range(self, start: float, end: float) -> list[int]:
+        """Returns the indices of the intervals overlapping with the given
+        half-open range.
+
+        Parameters:
+            start: the start of the range
+            end: the end of the range, excluded
+
+        Returns:
+            the indices of the intervals overlapping with the range, in
+            increasing order
+        """
+        if start >= end:
+            return []
+
+        # An interval overlaps with the range if it contains the start of the
+        # range or if it starts within the range
+        result = set(self.query(start))
+        lo = bisect_right(self._starts, start)
+        hi = bisect_left(self._starts, end)
+        result.update(self._indices_by_start[lo:hi])
+        return sorted(result)
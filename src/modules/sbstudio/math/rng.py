@@ -1,20 +1,39 @@
 """Classes and functions related to random number generation."""
 
+from numpy import asarray, empty, float64, int64
+from numpy.typing import ArrayLike, NDArray
 from random import Random
 from threading import Lock
-from typing import Callable, List, Optional, Sequence, TypeVar
+from typing import Callable, Optional, Sequence, TypeVar
 
 
 C = TypeVar("C", bound="RandomSequence")
 
+_BLOCK_SIZE = 1024
+"""Number of items that the buffer of a random sequence is grown by at once."""
+
+_MAX_EXACT_INTEGER = 2**53
+"""Largest integer such that all the non-negative integers up to it can be
+represented exactly as floats.
+"""
+
+_MAX_INT64 = 2**63 - 1
+"""Largest integer that fits into a 64-bit signed integer."""
+
 
 class RandomSequence(Sequence[int]):
     """Thread-safe random sequence class where individual items are cached and
     can be accessed by indexing.
     """
 
-    _cache: List[int]
-    """Cached items of the sequence that were already generated."""
+    _cache: NDArray
+    """Buffer holding the cached items of the sequence that were already
+    generated. The buffer is grown in blocks so it may be longer than the
+    number of generated items.
+    """
+
+    _length: int
+    """Number of items of the sequence that were already generated."""
 
     _max: int
     """Maximum value that can be returned in the sequence."""
@@ -48,24 +67,45 @@ class RandomSequence(Sequence[int]):
                 and that returns an instance of Random_ to use. ``None`` must
                 be interpreted by the function as "use a random seed".
         """
-        self._cache = []
+        self._cache = empty(0, dtype=int64 if max <= _MAX_INT64 else object)
+        self._length = 0
         self._rng_factory = rng_factory
         self._rng = rng_factory(seed)
         self._max = max
         self._lock = Lock()
 
     def __getitem__(self, index: int) -> int:
-        if len(self._cache) <= index:
+        if self._length <= index:
             self._ensure_length_is_at_least(index + 1)
-        return self._cache[index]
+        elif index < 0:
+            index += self._length
+            if index < 0:
+                raise IndexError("random sequence index out of range")
+        return int(self._cache[index])
 
     def __len__(self) -> int:
-        return len(self._cache)
+        return self._length
 
     def _ensure_length_is_at_least(self, length: int) -> None:
         with self._lock:
-            while len(self._cache) < length:
-                self._cache.append(self._rng.randint(0, self._max))
+            if self._length >= length:
+                return
+
+            cache = self._cache
+            if len(cache) < length:
+                # Grow the buffer in blocks; the old buffer is left intact in
+                # case another thread is still reading from it
+                capacity = max(-(-length // _BLOCK_SIZE) * _BLOCK_SIZE, 2 * len(cache))
+                cache = empty(capacity, dtype=cache.dtype)
+                cache[: self._length] = self._cache[: self._length]
+
+            randint, upper = self._rng.randint, self._max
+            cache[self._length : length] = [
+                randint(0, upper) for _ in range(length - self._length)
+            ]
+
+            self._cache = cache
+            self._length = length
 
     def fork(self: C, index: int) -> C:
         """Forks off a new random sequence from the given index such that the
@@ -86,6 +126,46 @@ class RandomSequence(Sequence[int]):
         """
         return self[index] / self.max
 
+    def get_floats(self, indices: ArrayLike) -> NDArray[float64]:
+        """Returns the random numbers at the given indices in the sequence,
+        divided by the maximum number that could theoretically be there.
+
+        This is the bulk variant of `get_float()`; the results are identical
+        to the ones returned by `get_float()` for the same indices.
+
+        Args:
+            indices: the indices of the random numbers; must not be negative
+
+        Returns:
+            the random numbers as floats between 0 and 1, inclusive
+
+        Raises:
+            IndexError: if any of the indices is negative
+        """
+        indices = asarray(indices, dtype=int64)
+        if not indices.size:
+            return empty(indices.shape, dtype=float64)
+
+        if int(indices.min()) < 0:
+            raise IndexError("random sequence index out of range")
+
+        length = int(indices.max()) + 1
+        if self._length < length:
+            self._ensure_length_is_at_least(length)
+
+        # Only the generated part of the buffer is indexed; the length is read
+        # first because the buffer is replaced before the length is updated
+        length = self._length
+        items = self._cache[:length][indices]
+        if self._max <= _MAX_EXACT_INTEGER:
+            # Both the items and the maximum are exactly representable as
+            # floats so the division is rounded the same way as in Python
+            return items.astype(float64) / float(self._max)
+        else:
+            return asarray(
+                [item / self._max for item in items.ravel().tolist()], dtype=float64
+            ).reshape(items.shape)
+
     @property
     def max(self) -> int:
         """Returns the maximum value that can be returned in the random sequence."""
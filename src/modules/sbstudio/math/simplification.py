@@ -0,0 +1,198 @@
+"""Array-based implementations of the Ramer-Douglas-Peucker polyline
+simplification algorithm.
+"""
+
+from numpy import (
+    argmax,
+    asarray,
+    diff,
+    flatnonzero,
+    float64,
+    newaxis,
+    ones,
+    sqrt,
+    zeros,
+)
+from numpy.typing import ArrayLike, NDArray
+from typing import Callable, Sequence
+
+__all__ = (
+    "find_points_to_keep",
+    "find_points_to_keep_in_path",
+    "simplify_trajectory_array",
+    "simplify_trajectory_mask",
+    "synchronized_distances_from_segment",
+)
+
+
+DeviationFunc = Callable[[Sequence, int, int], NDArray]
+"""Type of functions that receive a sequence of points and the indices of the
+start and end points of a segment, and return the distances of the points
+strictly between the start and end points from the segment.
+"""
+
+
+def find_points_to_keep(
+    points: NDArray, tolerance: float, deviation_func: DeviationFunc
+) -> NDArray:
+    """Runs the Ramer-Douglas-Peucker algorithm on the given array of points
+    and returns a boolean mask marking the points that must be kept.
+
+    The algorithm is iterative; it maintains an explicit stack of segments to
+    process, and the distances of all the points within a segment from the
+    segment are calculated at once by the deviation function.
+
+    Parameters:
+        points: the array of points; the first axis enumerates the points
+        tolerance: the maximum allowed distance of a removed point from the
+            segment that replaces it
+        deviation_func: function that calculates the distances of the points
+            strictly between two points from the segment formed by them
+
+    Returns:
+        boolean mask with one entry per point; the first and the last point
+        are always kept
+    """
+    num_points = len(points)
+    to_keep = zeros(num_points, dtype=bool)
+    if num_points == 0:
+        return to_keep
+
+    to_keep[0] = to_keep[-1] = True
+    _mark_points_to_keep(points, 0, num_points - 1, tolerance, deviation_func, to_keep)
+    return to_keep
+
+
+def find_points_to_keep_in_path(
+    points: Sequence, eps: float, deviation_func: DeviationFunc, eq_with_next: NDArray
+) -> NDArray:
+    """Simplifies a path consisting of constant and non-constant stretches and
+    returns a boolean mask marking the points that must be kept.
+
+    Constant stretches (runs of points that are equal to their successors) are
+    replaced by their first and last points. Non-constant stretches are
+    simplified with the Ramer-Douglas-Peucker algorithm; see
+    `find_points_to_keep()` for more details.
+
+    Parameters:
+        points: the points of the path; any sequence that the deviation
+            function can deal with
+        eps: the maximum allowed distance of a removed point from the segment
+            that replaces it. Zero skips the simplification of non-constant
+            stretches and keeps all their points except the one right before
+            the end of each stretch, the same way as `simplify_path()` always
+            did.
+        deviation_func: function that calculates the distances of the points
+            strictly between two points from the segment formed by them
+        eq_with_next: boolean array that tells whether each point is equal to
+            its successor; its length is one less than the number of points
+
+    Returns:
+        boolean mask with one entry per point
+    """
+    num_points = len(points)
+    if num_points < 2:
+        return ones(num_points, dtype=bool)
+
+    eq_with_next = asarray(eq_with_next, dtype=bool)
+
+    to_keep = zeros(num_points, dtype=bool)
+    to_keep[0] = to_keep[-1] = True
+    to_keep[flatnonzero(diff(eq_with_next)) + 1] = True
+
+    breakpoints = flatnonzero(to_keep).tolist()
+    for start, end in zip(breakpoints, breakpoints[1:]):
+        if eq_with_next[start]:
+            continue
+        if eps > 0:
+            _mark_points_to_keep(points, start, end, eps, deviation_func, to_keep)
+        else:
+            to_keep[start + 1 : end - 1] = True
+
+    return to_keep
+
+
+def _mark_points_to_keep(
+    points: Sequence,
+    start: int,
+    end: int,
+    tolerance: float,
+    deviation_func: DeviationFunc,
+    to_keep: NDArray,
+) -> None:
+    """Runs the Ramer-Douglas-Peucker algorithm on the points between the
+    given start and end indices, marking the points to keep in the given mask.
+    """
+    stack = [(start, end)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        deviations = deviation_func(points, start, end)
+        index = int(argmax(deviations))
+        if deviations[index] > tolerance:
+            split = start + 1 + index
+            to_keep[split] = True
+            stack.append((split, end))
+            stack.append((start, split))
+
+
+def synchronized_distances_from_segment(
+    points: NDArray, start: int, end: int
+) -> NDArray:
+    """Deviation function for trajectories represented as rows of time and
+    spatial coordinates.
+
+    The distance of each point is measured from the position where a drone
+    moving with constant velocity along the segment would be at the timestamp
+    of the point (i.e. the synchronized Euclidean distance). This ensures that
+    the simplified trajectory stays close to the original one in space _and_
+    time.
+    """
+    times = points[start : end + 1, 0]
+    coords = points[start : end + 1, 1:]
+
+    span = times[-1] - times[0]
+    if span > 0:
+        ratios = (times[1:-1] - times[0]) / span
+    else:
+        ratios = zeros(len(times) - 2, dtype=float64)
+
+    expected = coords[0] + ratios[:, newaxis] * (coords[-1] - coords[0])
+    diffs = coords[1:-1] - expected
+    return sqrt((diffs * diffs).sum(axis=1))
+
+
+def simplify_trajectory_mask(points: ArrayLike, tolerance: float) -> NDArray:
+    """Returns a boolean mask marking the samples of a trajectory that are
+    kept by `simplify_trajectory_array()`.
+
+    Parameters:
+        points: the trajectory to simplify; shape is ``(N, 4)``
+        tolerance: maximum allowed spatial error, in the same units as the
+            coordinates
+    """
+    return find_points_to_keep(
+        asarray(points, dtype=float64),
+        tolerance,
+        synchronized_distances_from_segment,
+    )
+
+
+def simplify_trajectory_array(points: ArrayLike, tolerance: float) -> NDArray:
+    """Simplifies a trajectory represented as an array with rows of
+    ``(t, x, y, z)``, dropping samples that are within the given spatial
+    tolerance from the linear interpolation of the remaining samples at the
+    same time instant.
+
+    Parameters:
+        points: the trajectory to simplify; shape is ``(N, 4)``
+        tolerance: maximum allowed spatial error, in the same units as the
+            coordinates
+
+    Returns:
+        the rows of the input array that were kept
+    """
+    points = asarray(points)
+    return points[simplify_trajectory_mask(points, tolerance)]
@@ -0,0 +1,191 @@
+import json
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import Iterable, Iterator, Optional
+
+__all__ = ("ExportReport", "ExportStage")
+
+
+@dataclass
+class ExportStage:
+    """Timing and throughput statistics of a single stage of an export
+    operation.
+    """
+
+    name: str
+    """The name of the stage."""
+
+    duration: float = 0.0
+    """Wall-clock time spent in the stage, in seconds."""
+
+    bytes: Optional[int] = None
+    """Number of bytes produced or transferred by the stage; ``None`` if not
+    applicable.
+    """
+
+    objects: Optional[int] = None
+    """Number of objects (typically drones) processed by the stage; ``None`` if
+    not applicable.
+    """
+
+    frames: Optional[int] = None
+    """Number of frames or samples processed by the stage; ``None`` if not
+    applicable.
+    """
+
+    @property
+    def bytes_per_second(self) -> Optional[float]:
+        """Number of bytes processed per second; ``None`` if not known."""
+        if self.bytes is None or self.duration <= 0:
+            return None
+        return self.bytes / self.duration
+
+    @property
+    def frames_per_second(self) -> Optional[float]:
+        """Number of frames processed per second; ``None`` if not known."""
+        if self.frames is None or self.duration <= 0:
+            return None
+        return self.frames / self.duration
+
+    def as_dict(self, ndigits: int = 3):
+        """Returns a JSON-compatible dictionary representation of the stage.
+
+        Parameters:
+            ndigits: round floats to this precision
+        """
+        result = {"name": self.name, "duration": round(self.duration, ndigits)}
+        if self.bytes is not None:
+            result["bytes"] = self.bytes
+        if self.objects is not None:
+            result["objects"] = self.objects
+        if self.frames is not None:
+            result["frames"] = self.frames
+        if (bytes_per_second := self.bytes_per_second) is not None:
+            result["bytesPerSecond"] = round(bytes_per_second, ndigits)
+        if (frames_per_second := self.frames_per_second) is not None:
+            result["framesPerSecond"] = round(frames_per_second, ndigits)
+        return result
+
+    def measure_chunks(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Wraps an iterable of byte chunks such that the time spent in
+        producing the chunks and their total size is added to the statistics
+        of this stage.
+
+        Only the time spent in the iterable itself is measured; the time that
+        the consumer spends with the chunks is excluded.
+        """
+        it = iter(chunks)
+        while True:
+            start = perf_counter()
+            try:
+                chunk = next(it)
+            except StopIteration:
+                return
+            finally:
+                self.duration += perf_counter() - start
+
+            self.bytes = (self.bytes or 0) + len(chunk)
+            yield chunk
+
+    def format(self) -> str:
+        """Returns a short, human-readable summary of the stage."""
+        details = []
+        if self.frames is not None:
+            details.append(f"{self.frames} frames")
+            if (frames_per_second := self.frames_per_second) is not None:
+                details.append(f"{frames_per_second:.1f} fps")
+        if self.bytes is not None:
+            details.append(_format_bytes(self.bytes))
+        suffix = f" ({', '.join(details)})" if details else ""
+        return f"{self.name} {self.duration:.2f}s{suffix}"
+
+
+@dataclass
+class ExportReport:
+    """Timing and throughput report of an export operation, consisting of the
+    statistics of its stages in the order they were started.
+    """
+
+    stages: list[ExportStage] = field(default_factory=list)
+    """The stages of the export operation."""
+
+    def add(
+        self,
+        name: str,
+        duration: float = 0.0,
+        *,
+        bytes: Optional[int] = None,
+        objects: Optional[int] = None,
+        frames: Optional[int] = None,
+    ) -> ExportStage:
+        """Adds a new stage with the given statistics to the report.
+
+        Returns:
+            the new stage
+        """
+        stage = ExportStage(
+            name, duration=duration, bytes=bytes, objects=objects, frames=frames
+        )
+        self.stages.append(stage)
+        return stage
+
+    @contextmanager
+    def measure(
+        self,
+        name: str,
+        *,
+        bytes: Optional[int] = None,
+        objects: Optional[int] = None,
+        frames: Optional[int] = None,
+    ) -> Iterator[ExportStage]:
+        """Context manager that measures the wall-clock time spent in its
+        body as a new stage of the export.
+
+        The stage is yielded to the caller so it can fill in the statistics
+        that are known only at the end of the stage.
+        """
+        stage = self.add(name, bytes=bytes, objects=objects, frames=frames)
+        start = perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.duration += perf_counter() - start
+
+    def as_dict(self, ndigits: int = 3):
+        """Returns a JSON-compatible dictionary representation of the report.
+
+        Parameters:
+            ndigits: round floats to this precision
+        """
+        return {
+            "stages": [stage.as_dict(ndigits=ndigits) for stage in self.stages],
+            "version": 1,
+        }
+
+    def format(self) -> str:
+        """Returns a short, human-readable, single-line summary of the
+        report.
+        """
+        return "; ".join(stage.format() for stage in self.stages)
+
+    def save(self, path: Path) -> None:
+        """Saves the report into a JSON file.
+
+        Parameters:
+            path: the path of the file to write the report into
+        """
+        with open(path, "w") as fp:
+            json.dump(self.as_dict(), fp, indent=2)
+
+
+def _format_bytes(value: int) -> str:
+    """Formats a number of bytes in a human-readable manner."""
+    if value < 1024:
+        return f"{value} B"
+    elif value < 1024 * 1024:
+        return f"{value / 1024:.1f} KiB"
+    else:
+        return f"{value / (1024 * 1024):.1f} MiB"
@@ -0,0 +1,926 @@
+"""Evaluation of light effects from snapshots of their properties, without
+depending on Blender.
+
+A light effect in Blender refers to color ramps, images, meshes and Python
+modules that can only be accessed from the main thread of Blender. The
+descriptors in this module contain everything that is needed to evaluate an
+effect in a given frame: the lookup table of the color ramp, the pixels of
+the image, the paths of the custom functions and a snapshot of the geometry
+of the mesh. Descriptors can be pickled, so the colors of many frames can be
+evaluated in parallel in worker processes.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from numpy import (
+    arange,
+    argsort,
+    array,
+    asarray,
+    clip,
+    empty,
+    flatnonzero,
+    float64,
+    full,
+    isnan,
+    lexsort,
+    nan,
+    ones,
+    rint,
+    searchsorted,
+    sort,
+    uint8,
+    where,
+    zeros,
+)
+from numpy.typing import NDArray
+from os import cpu_count
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from sbstudio.math.colors import BlendMode, blend_array_in_place, evaluate_lookup_table
+from sbstudio.math.rng import RandomSequence
+from sbstudio.utils import is_vectorized, load_function, load_module
+
+from .plane import Plane
+from .types import Coordinate3D
+
+__all__ = (
+    "OUTPUT_TYPE_TO_AXIS_INDICES",
+    "LightEffectBakeChunk",
+    "LightEffectDescriptor",
+    "LightEffectMesh",
+    "bake_light_effect_chunk",
+    "bake_light_effect_chunks",
+    "output_type_supports_mapping_mode",
+    "test_containment_of_points_in_triangles",
+)
+
+
+log = logging.getLogger(__name__)
+
+OUTPUT_TYPE_TO_AXIS_INDICES = {
+    "GRADIENT_XYZ": (0, 1, 2),
+    "GRADIENT_XZY": (0, 2, 1),
+    "GRADIENT_YXZ": (1, 0, 2),
+    "GRADIENT_YZX": (1, 2, 0),
+    "GRADIENT_ZXY": (2, 0, 1),
+    "GRADIENT_ZYX": (2, 1, 0),
+    "default": (0, 0, 0),
+}
+"""Axis mapping for the gradient-based output types"""
+
+FunctionReference = tuple[str, str]
+"""Reference to a custom function: the absolute path of the module that
+contains the function and the name of the function.
+"""
+
+_MAX_PAIRS_PER_BATCH = 1 << 20
+"""Maximum number of point-triangle pairs to test at once in containment
+tests, to keep the size of the intermediate arrays bounded.
+"""
+
+_MAX_POINTS_PER_BATCH = 64
+"""Maximum number of points to test at once in containment tests. Smaller
+batches span a narrower range along the axes perpendicular to the rays, so
+fewer triangles need to be tested against each batch.
+"""
+
+_random_sequences: dict[int, RandomSequence] = {}
+"""Random sequences used by `bake_light_effect_chunk()`, keyed by their
+seeds, so the random numbers are generated only once in each process.
+"""
+
+
+def output_type_supports_mapping_mode(type: str) -> bool:
+    """Returns whether the light effect output type given in the argument may
+    have a mapping mode that defines how the output values are mapped to the
+    [0; 1] range of the color ramp or image.
+    """
+    return type == "DISTANCE" or type.startswith("GRADIENT_")
+
+
+def test_containment_of_points_in_triangles(
+    triangles: NDArray, points: NDArray, bounds: Optional[NDArray] = None
+) -> NDArray:
+    """Tests whether the given points are _probably_ within the mesh consisting
+    of the given triangles.
+
+    This is done by casting three rays from each point in the X, Y and Z
+    directions. A point is assumed to be within the mesh if all three rays
+    hit the mesh; this is the same test that the BVH-tree based containment
+    test performs in Blender.
+
+    Parameters:
+        triangles: the vertices of the triangles of the mesh in world
+            coordinates, as an array of shape ``(T, 3, 3)``
+        points: the points to test, as an array of shape ``(N, 3)``
+        bounds: the bounding box of the mesh as an array of shape ``(2, 3)``
+            with the minimum and maximum coordinates, or `None` if the
+            bounding box is not known. Points outside the bounding box are
+            rejected without casting any rays.
+
+    Returns:
+        boolean array that tells which points are _probably_ within the mesh
+    """
+    points = asarray(points, dtype=float64)
+    triangles = asarray(triangles, dtype=float64).reshape(-1, 3, 3)
+
+    if bounds is not None:
+        candidates = flatnonzero(
+            ((points >= bounds[0]) & (points <= bounds[1])).all(axis=1)
+        )
+    else:
+        candidates = arange(len(points))
+
+    for axis in range(3):
+        if not len(candidates):
+            break
+        hits = _cast_rays_along_axis(triangles, points[candidates], axis)
+        candidates = candidates[hits]
+
+    result = zeros(len(points), dtype=bool)
+    result[candidates] = True
+    return result
+
+
+def _cast_rays_along_axis(triangles: NDArray, points: NDArray, axis: int) -> NDArray:
+    """Casts rays from the given points in the positive direction of the given
+    axis and returns which of them hit at least one of the given triangles.
+    """
+    u, v = (axis + 1) % 3, (axis + 2) % 3
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+
+    # Twice the signed area of the triangles projected onto the plane
+    # perpendicular to the axis; rays are parallel to degenerate triangles
+    area = (b[:, u] - a[:, u]) * (c[:, v] - a[:, v]) - (b[:, v] - a[:, v]) * (
+        c[:, u] - a[:, u]
+    )
+    keep = area != 0
+    a, b, c, area = a[keep], b[keep], c[keep], area[keep]
+
+    result = zeros(len(points), dtype=bool)
+    if not len(area):
+        return result
+
+    # Process the points in order of their U coordinates so each batch needs
+    # to be tested only against the triangles that overlap with the batch
+    # along the U axis
+    tri_min_u = _minimum3(a[:, u], b[:, u], c[:, u])
+    tri_max_u = _maximum3(a[:, u], b[:, u], c[:, u])
+    tri_max_axis = _maximum3(a[:, axis], b[:, axis], c[:, axis])
+
+    order = argsort(points[:, u], kind="stable")
+    batch_size = min(max(_MAX_PAIRS_PER_BATCH // len(area), 1), _MAX_POINTS_PER_BATCH)
+    for start in range(0, len(order), batch_size):
+        indices = order[start : start + batch_size]
+        p = points[indices]
+
+        relevant = flatnonzero(
+            (tri_max_u >= p[:, u].min())
+            & (tri_min_u <= p[:, u].max())
+            & (tri_max_axis >= p[:, axis].min())
+        )
+        if not len(relevant):
+            continue
+
+        ta, tb, tc = a[relevant], b[relevant], c[relevant]
+        pu, pv = p[:, u, None], p[:, v, None]
+
+        # Barycentric coordinates of the projected points
+        wa = (
+            (tb[:, u] - pu) * (tc[:, v] - pv) - (tb[:, v] - pv) * (tc[:, u] - pu)
+        ) / area[relevant]
+        wb = (
+            (tc[:, u] - pu) * (ta[:, v] - pv) - (tc[:, v] - pv) * (ta[:, u] - pu)
+        ) / area[relevant]
+        wc = 1 - wa - wb
+
+        depth = wa * ta[:, axis] + wb * tb[:, axis] + wc * tc[:, axis]
+        hit = (wa >= 0) & (wb >= 0) & (wc >= 0) & (depth >= p[:, axis, None])
+        result[indices] = hit.any(axis=1)
+
+    return result
+
+
+def _minimum3(x: NDArray, y: NDArray, z: NDArray) -> NDArray:
+    return where(x < y, where(x < z, x, z), where(y < z, y, z))
+
+
+def _maximum3(x: NDArray, y: NDArray, z: NDArray) -> NDArray:
+    return where(x > y, where(x > z, x, z), where(y > z, y, z))
+
+
+@dataclass(frozen=True, eq=False)
+class LightEffectMesh:
+    """Snapshot of the mesh associated to a light effect, in world
+    coordinates.
+    """
+
+    position: Coordinate3D
+    """The position of the mesh object."""
+
+    plane: Optional[Plane] = None
+    """The plane of the first face of the mesh; `None` if the mesh has no
+    faces or it was not needed when the snapshot was taken.
+    """
+
+    triangles: Optional[NDArray] = None
+    """The vertices of the triangles of the mesh, as an array of shape
+    ``(T, 3, 3)``; `None` if they were not needed when the snapshot was taken.
+    """
+
+    bounds: Optional[NDArray] = None
+    """The bounding box of the mesh as an array of shape ``(2, 3)``; `None` if
+    the mesh has no vertices or the bounding box was not needed.
+    """
+
+    def contains(self, points: NDArray) -> NDArray:
+        """Tests whether the given points are _probably_ within the mesh.
+
+        Returns:
+            boolean array that tells which points are within the mesh; all
+            `True` if the triangles of the mesh are not known
+        """
+        if self.triangles is None:
+            return ones(len(points), dtype=bool)
+        return test_containment_of_points_in_triangles(
+            self.triangles, points, self.bounds
+        )
+
+
+@dataclass(frozen=True, eq=False)
+class LightEffectDescriptor:
+    """Snapshot of a single light effect that contains everything that is
+    needed to evaluate the effect without Blender.
+    """
+
+    frame_start: int
+    """Frame when the light effect starts."""
+
+    duration: int
+    """Duration of the light effect, in frames."""
+
+    influence: float = 1.0
+    """Influence of the effect on the final color of drones."""
+
+    fade_in_duration: int = 0
+    """Duration of the fade-in part of the effect."""
+
+    fade_out_duration: int = 0
+    """Duration of the fade-out part of the effect."""
+
+    output: str = "LAST_COLOR"
+    """Output type that determines the X coordinate of the drones in the
+    color space of the effect.
+    """
+
+    output_mapping_mode: str = "ORDERED"
+    """Mapping mode of the output type of the X axis."""
+
+    output_function: Optional[FunctionReference] = None
+    """Custom function of the ``CUSTOM`` output type of the X axis."""
+
+    output_y: str = "LAST_COLOR"
+    """Output type that determines the Y coordinate of the drones in the
+    color space of the effect; used only by images.
+    """
+
+    output_mapping_mode_y: str = "ORDERED"
+    """Mapping mode of the output type of the Y axis."""
+
+    output_function_y: Optional[FunctionReference] = None
+    """Custom function of the ``CUSTOM`` output type of the Y axis."""
+
+    randomness: float = 0.0
+    """Maximum range of the random offset of the output values."""
+
+    blend_mode: BlendMode = BlendMode.NORMAL
+    """Blending mode of the effect."""
+
+    target: str = "ALL"
+    """Spatial constraint of the effect: ``ALL``, ``INSIDE_MESH`` or
+    ``FRONT_SIDE``.
+    """
+
+    invert_target: bool = False
+    """Whether to apply the effect to the drones that do _not_ satisfy the
+    spatial constraint.
+    """
+
+    color_ramp: Optional[NDArray] = None
+    """Lookup table of the color ramp of the effect (see
+    `evaluate_lookup_table()`), if the effect uses a color ramp.
+    """
+
+    image: Optional[NDArray] = None
+    """Pixels of the image of the effect in linear space, as an array of shape
+    ``(N, 4)``, if the effect uses an image.
+    """
+
+    image_size: tuple[int, int] = (0, 0)
+    """Width and height of the image of the effect."""
+
+    color_function: Optional[FunctionReference] = None
+    """Custom function that calculates the colors of the drones, if the effect
+    uses one.
+    """
+
+    mesh: Optional[LightEffectMesh] = None
+    """Snapshot of the mesh of the effect, if it has one."""
+
+    @property
+    def frame_end(self) -> int:
+        """The last frame of the effect, inclusive."""
+        return self.frame_start + self.duration - 1
+
+    def contains_frame(self, frame: int) -> bool:
+        """Returns whether the light effect contains the given frame."""
+        return 0 <= (frame - self.frame_start) < self.duration
+
+    def apply_on_colors(
+        self,
+        colors: NDArray,
+        coords: NDArray,
+        mapping: Optional[Sequence[Optional[int]]],
+        *,
+        frame: int,
+        random_seq: RandomSequence,
+    ) -> None:
+        """Applies this effect on an array of colors in-place.
+
+        Parameters:
+            colors: the RGBA colors of the drones, as a floating-point array of
+                shape ``(N, 4)``; modified in-place
+            coords: the positions of the drones, as an array of shape
+                ``(N, 3)``
+            mapping: optional mapping of the drones to formation markers
+            frame: the frame index
+            random_seq: random sequence used to randomize the output values
+        """
+        result = self.evaluate(coords, mapping, frame=frame, random_seq=random_seq)
+        if result is None:
+            return
+
+        indices, new_colors, alpha = result
+        backdrop = colors[indices]
+        blend_array_in_place(new_colors, backdrop, self.blend_mode, alpha)
+        colors[indices] = backdrop
+
+    def evaluate(
+        self,
+        coords: NDArray,
+        mapping: Optional[Sequence[Optional[int]]],
+        *,
+        frame: int,
+        random_seq: RandomSequence,
+        containment_test: Optional[Callable[[NDArray], NDArray]] = None,
+    ) -> Optional[tuple[NDArray, NDArray, NDArray]]:
+        """Evaluates the effect for all the drones at once in the given frame.
+
+        Parameters:
+            coords: the positions of the drones, as an array of shape
+                ``(N, 3)``
+            mapping: optional mapping of the drones to formation markers; used
+                only by the ``INDEXED_BY_FORMATION`` output type
+            frame: the frame index
+            random_seq: a random sequence that is used to spread out the items
+                on the color ramp or a principal axis of the image if
+                randomization is turned on
+            containment_test: optional function that tests which of the given
+                points are inside the mesh of the effect; overrides the
+                containment test based on the triangles of the mesh snapshot
+
+        Returns:
+            `None` if the effect does not affect any of the drones, otherwise
+            the indices of the affected drones, their new RGBA colors and the
+            alpha values to blend the new colors with
+
+        Raises:
+            RuntimeError: if the custom color function of the effect failed
+        """
+        if not self.contains_frame(frame):
+            return None
+
+        coords = asarray(coords, dtype=float64).reshape(-1, 3)
+        num_positions = len(coords)
+        if num_positions == 0:
+            return None
+
+        time_fraction = (frame - self.frame_start) / max(self.duration - 1, 1)
+
+        color_function = (
+            load_function(*self.color_function) if self.color_function else None
+        )
+
+        # Calculate the output values of the effect that go through the color
+        # ramp or image mapper. NaN means that the effect is disabled for the
+        # given drone
+        outputs_x = self._get_output_values(
+            self.output,
+            self.output_mapping_mode,
+            self.output_function,
+            coords,
+            mapping,
+            frame=frame,
+            time_fraction=time_fraction,
+        )
+        enabled = ~isnan(outputs_x)
+        if self.image is not None:
+            outputs_y = self._get_output_values(
+                self.output_y,
+                self.output_mapping_mode_y,
+                self.output_function_y,
+                coords,
+                mapping,
+                frame=frame,
+                time_fraction=time_fraction,
+            )
+            enabled &= ~isnan(outputs_y)
+        else:
+            outputs_y = None
+
+        indices = flatnonzero(enabled)
+        if not len(indices):
+            return None
+
+        outputs_x = outputs_x[indices]
+        if outputs_y is not None:
+            outputs_y = outputs_y[indices]
+
+        # Randomize the output values if needed. Note that the same random
+        # offset is used for both axes of the image
+        if self.randomness != 0:
+            offsets = (random_seq.get_floats(indices) - 0.5) * self.randomness
+            outputs_x = (offsets + outputs_x) % 1.0
+            if outputs_y is not None:
+                outputs_y = (offsets + outputs_y) % 1.0
+
+        # Calculate the influence of the effect, depending on the fade-in and
+        # fade-out durations and the optional mesh
+        alpha = full(
+            len(indices), max(min(self.evaluate_influence_at(frame), 1.0), 0.0)
+        )
+        mask = self._get_spatial_effect_mask(coords[indices], containment_test)
+        if mask is not None:
+            alpha[~mask] = 0.0
+
+        # Calculate the new colors of the drones
+        new_colors = empty((len(indices), 4), dtype=float64)
+        if color_function is not None and is_vectorized(color_function):
+            try:
+                result = asarray(
+                    color_function(
+                        frame=frame,
+                        time_fraction=time_fraction,
+                        drone_indices=indices,
+                        formation_indices=_get_formation_indices(mapping, indices),
+                        positions=coords[indices],
+                        drone_count=num_positions,
+                    ),
+                    dtype=float64,
+                )
+                if result.ndim != 2 or result.shape[1] not in (3, 4):
+                    raise ValueError(
+                        f"color function returned an array of shape {result.shape}"
+                    )
+                new_colors[:, 3] = 1.0
+                new_colors[:, : result.shape[1]] = result
+            except Exception as exc:
+                raise RuntimeError("ERROR_COLOR_FUNCTION") from exc
+        elif color_function is not None:
+            positions = coords.tolist()
+            try:
+                new_colors[:] = [
+                    color_function(
+                        frame=frame,
+                        time_fraction=time_fraction,
+                        drone_index=index,
+                        formation_index=(
+                            mapping[index] if mapping is not None else None
+                        ),
+                        position=tuple(positions[index]),
+                        drone_count=num_positions,
+                    )
+                    for index in indices.tolist()
+                ]
+            except Exception as exc:
+                raise RuntimeError("ERROR_COLOR_FUNCTION") from exc
+        elif self.image is not None:
+            assert outputs_y is not None
+            width, height = self.image_size
+            pixels = self.image
+
+            xs = ((width - 1) * outputs_x).astype(int)
+            ys = ((height - 1) * outputs_y).astype(int)
+            offsets = xs + ys * width
+
+            # Pixel coordinates may be out of the bounds of the image, e.g.,
+            # for custom output functions; these drones are left intact
+            in_bounds = (offsets >= 0) & (offsets < len(pixels))
+            alpha[~in_bounds] = 0.0
+
+            new_colors[:] = pixels[where(in_bounds, offsets, 0)] if len(pixels) else 0
+        elif self.color_ramp is not None:
+            new_colors[:] = evaluate_lookup_table(self.color_ramp, outputs_x)
+        else:
+            # should not happen
+            new_colors[:] = 1.0
+
+        return indices, new_colors, alpha
+
+    def evaluate_influence_at(self, frame: int) -> float:
+        """Eveluates the effective influence of the effect at the given frame,
+        not taking into account the spatial constraints of the effect.
+
+        Parameters:
+            frame: the frame count
+        """
+        influence = self.influence
+
+        # Apply fade-in
+        if self.fade_in_duration > 0:
+            diff = frame - self.frame_start + 1
+            if diff < self.fade_in_duration:
+                influence *= diff / self.fade_in_duration
+
+        # Apply fade_out
+        if self.fade_out_duration > 0:
+            diff = self.frame_end - frame
+            if diff < self.fade_out_duration:
+                influence *= diff / self.fade_out_duration
+
+        return influence
+
+    def _get_output_values(
+        self,
+        output_type: str,
+        mapping_mode: str,
+        output_function: Optional[FunctionReference],
+        coords: NDArray,
+        mapping: Optional[Sequence[Optional[int]]],
+        *,
+        frame: int,
+        time_fraction: float,
+    ) -> NDArray:
+        """Returns the output values of the effect for color ramp or image
+        indexing for all the drones, based on the given output type.
+
+        Parameters:
+            output_type: the output type used for indexing
+            mapping_mode: mapping mode corresponding to the output type
+            output_function: custom output function used by the ``CUSTOM``
+                output type
+            coords: the positions of the drones as an array of shape ``(N, 3)``
+            mapping: optional mapping of positions to formation markers
+            frame: the frame index
+            time_fraction: the fraction of the duration of the effect that has
+                passed in the given frame
+
+        Returns:
+            the output values of the drones; NaN for drones that should be
+            left intact by the effect
+        """
+        num_positions = len(coords)
+
+        if output_type == "FIRST_COLOR":
+            return full(num_positions, 0.0)
+        elif output_type == "LAST_COLOR":
+            return full(num_positions, 1.0)
+        elif output_type == "TEMPORAL":
+            return full(num_positions, float(time_fraction))
+        elif output_type_supports_mapping_mode(output_type):
+            # There are two options here:
+            # 1. Legacy, non-proportional mode. We sort the drones based on the
+            #    sort key derived above and then space them out equally on the
+            #    color ramp or image axis.
+            # 2. Proportional mode. Same as above, but we assign drones to
+            #    positions on the color ramp or image axis in a way that their
+            #    distances on the color ramp or image axis are proportional to
+            #    the differences in their sort keys. Note that this needs a
+            #    _scalar_ sorting key so we ignore all but the principal axis
+            #    for gradient output types.
+            proportional = mapping_mode == "PROPORTIONAL"
+            sort_keys: Optional[NDArray]
+
+            if output_type == "DISTANCE":
+                if self.mesh:
+                    position_of_mesh = self.mesh.position
+                    sort_keys = (
+                        (coords[:, 0] - position_of_mesh[0]) ** 2
+                        + (coords[:, 1] - position_of_mesh[1]) ** 2
+                        + (coords[:, 2] - position_of_mesh[2]) ** 2
+                    )
+                else:
+                    sort_keys = None
+            else:
+                axes = OUTPUT_TYPE_TO_AXIS_INDICES.get(
+                    output_type, OUTPUT_TYPE_TO_AXIS_INDICES["default"]
+                )
+                if proportional:
+                    # In proportional mode, we are using the primary axis only
+                    # because we need a scalar
+                    sort_keys = coords[:, axes[0]]
+                else:
+                    # In non-proportional mode, we are sorting along multiple
+                    # axes; lexsort() expects the primary key last
+                    sort_keys = coords[:, axes[::-1]].T
+
+            outputs = ones(num_positions, dtype=float64)
+            if num_positions > 1:
+                if proportional and sort_keys is not None:
+                    # Proportional mode -- distribute the drones along the
+                    # color axis proportionally to the differences between the
+                    # numeric values of the sort keys
+                    min_value, max_value = sort_keys.min(), sort_keys.max()
+                    diff = max_value - min_value
+                    if diff > 0:
+                        outputs = (sort_keys - min_value) / diff
+                else:
+                    if sort_keys is None:
+                        order = arange(num_positions)
+                    elif sort_keys.ndim > 1:
+                        order = lexsort(sort_keys)
+                    else:
+                        order = argsort(sort_keys, kind="stable")
+                    outputs[order] = arange(num_positions) / (num_positions - 1)
+
+            return outputs
+
+        elif output_type == "INDEXED_BY_DRONES":
+            # Gradient based on drone index
+            if num_positions > 1:
+                return arange(num_positions) / (num_positions - 1)
+            else:
+                return full(num_positions, 1.0)
+
+        elif output_type == "INDEXED_BY_FORMATION":
+            # Gradient based on formation index
+            if mapping is None:
+                # if there is no mapping at all, we do not change color of drones
+                return full(num_positions, nan)
+
+            assert num_positions == len(mapping)
+
+            # TODO: this now works only if the number of valid entries in the mapping
+            # is consistent with the number of drones in the given formation;
+            # e.g., it will not work with two formations of half size at the same time
+            # for this case, single-formation specific mapping would be needed
+            indices = array([nan if x is None else x for x in mapping], dtype=float64)
+            is_valid = ~isnan(indices)
+            if not is_valid.all():
+                # reduce mapping of all positions to rank, in case formation size
+                # is smaller than the number of drones
+                sorted_valid_mapping = sort(indices[is_valid])
+                np_m1 = max(len(sorted_valid_mapping) - 1, 1)
+                ranks = searchsorted(sorted_valid_mapping, indices[is_valid])
+                indices[is_valid] = ranks
+            else:
+                # otherwise just normalize full mapping to [0, 1]
+                np_m1 = max(num_positions - 1, 1)
+            return indices / np_m1
+
+        elif output_type == "CUSTOM":
+            path, name = output_function or ("", "")
+            module = load_module(path) if path else None
+            if not name:
+                return full(num_positions, 1.0)
+
+            fn = getattr(module, name)
+            if is_vectorized(fn):
+                indices = arange(num_positions)
+                return asarray(
+                    fn(
+                        frame=frame,
+                        time_fraction=time_fraction,
+                        drone_indices=indices,
+                        formation_indices=_get_formation_indices(mapping, indices),
+                        positions=coords,
+                        drone_count=num_positions,
+                    ),
+                    dtype=float64,
+                ).reshape(num_positions)
+
+            positions = coords.tolist()
+            outputs = [
+                fn(
+                    frame=frame,
+                    time_fraction=time_fraction,
+                    drone_index=index,
+                    formation_index=(mapping[index] if mapping is not None else None),
+                    position=tuple(positions[index]),
+                    drone_count=num_positions,
+                )
+                for index in range(num_positions)
+            ]
+            return array(
+                [nan if output is None else output for output in outputs],
+                dtype=float64,
+            )
+
+        else:
+            # Should not get here
+            return full(num_positions, 1.0)
+
+    def _get_spatial_effect_mask(
+        self,
+        coords: NDArray,
+        containment_test: Optional[Callable[[NDArray], NDArray]] = None,
+    ) -> Optional[NDArray]:
+        """Evaluates the spatial constraint of the effect on the given drones.
+
+        Parameters:
+            coords: the positions of the drones to evaluate the constraint on,
+                as an array of shape ``(N, 3)``
+            containment_test: optional function that overrides the containment
+                test of the mesh snapshot
+
+        Returns:
+            boolean mask that tells which of the given drones satisfy the
+            spatial constraint of the effect, or `None` if the effect has no
+            spatial constraint
+        """
+        mask: Optional[NDArray]
+
+        if self.target == "INSIDE_MESH":
+            if containment_test is not None:
+                mask = containment_test(coords)
+            elif self.mesh is not None:
+                mask = self.mesh.contains(coords)
+            else:
+                mask = ones(len(coords), dtype=bool)
+        elif self.target == "FRONT_SIDE":
+            plane = self.mesh.plane if self.mesh is not None else None
+            if plane is not None:
+                normal = plane.normal
+                mask = (
+                    normal[0] * coords[:, 0]
+                    + normal[1] * coords[:, 1]
+                    + normal[2] * coords[:, 2]
+                ) >= plane.offset
+            else:
+                mask = ones(len(coords), dtype=bool)
+        else:
+            mask = None
+
+        if self.invert_target:
+            mask = zeros(len(coords), dtype=bool) if mask is None else ~mask
+
+        return mask
+
+
+def _get_formation_indices(
+    mapping: Optional[Sequence[Optional[int]]], indices: NDArray
+) -> Optional[NDArray]:
+    """Returns the formation indices of the drones with the given indices as an
+    array for vectorized custom functions, using -1 for drones that are not
+    mapped to the formation.
+    """
+    if mapping is None:
+        return None
+
+    return array(
+        [
+            -1 if mapping[index] is None else mapping[index]
+            for index in indices.tolist()
+        ],
+        dtype=int,
+    )
+
+
+@dataclass(eq=False)
+class LightEffectBakeChunk:
+    """Input of the evaluation of the light effects in a set of consecutive
+    frames of the show.
+    """
+
+    frames: list[int]
+    """The frames to evaluate."""
+
+    positions: NDArray
+    """The positions of the drones in each frame, as an array of shape
+    ``(F, N, 3)``.
+    """
+
+    colors: NDArray
+    """The base RGBA colors of the drones in each frame before applying the
+    light effects, as an array of shape ``(F, N, 4)``.
+    """
+
+    mappings: list[Optional[list[Optional[int]]]]
+    """The mapping of the drones to formation markers in each frame."""
+
+    effects: list[list[LightEffectDescriptor]]
+    """The light effects that are active in each frame, in the order they need
+    to be applied.
+    """
+
+    random_seed: int
+    """Seed of the random sequence that randomizes the output values of the
+    effects.
+    """
+
+
+def bake_light_effect_chunk(chunk: LightEffectBakeChunk) -> NDArray[uint8]:
+    """Evaluates the light effects in the frames of the given chunk.
+
+    Returns:
+        the colors of the drones in each frame of the chunk as an array of
+        shape ``(F, N, 4)`` with RGBA components in the [0; 255] range
+    """
+    random_seq = _random_sequences.get(chunk.random_seed)
+    if random_seq is None:
+        random_seq = _random_sequences[chunk.random_seed] = RandomSequence(
+            seed=chunk.random_seed
+        )
+
+    colors = array(chunk.colors, dtype=float64)
+    for index, frame in enumerate(chunk.frames):
+        for effect in chunk.effects[index]:
+            effect.apply_on_colors(
+                colors[index],
+                chunk.positions[index],
+                chunk.mappings[index],
+                frame=frame,
+                random_seq=random_seq,
+            )
+
+    return clip(rint(colors * 255), 0, 255).astype(uint8)
+
+
+def bake_light_effect_chunks(
+    chunks: Iterable[LightEffectBakeChunk], *, max_workers: Optional[int] = None
+) -> Iterator[tuple[LightEffectBakeChunk, NDArray[uint8]]]:
+    """Evaluates the light effects in the given chunks in parallel in worker
+    processes.
+
+    Chunks are consumed from the input lazily, and only a limited number of
+    chunks are queued for the workers at any time. This allows the caller to
+    prepare the next chunks while the workers are busy, and it keeps the
+    memory usage bounded for long shows.
+
+    Chunks that cannot be evaluated in a worker process (e.g., because a
+    custom function of an effect needs Blender) are evaluated in the current
+    process instead.
+
+    Parameters:
+        chunks: the chunks to evaluate
+        max_workers: the number of worker processes; `None` means the number
+            of CPU cores. No worker processes are used if it is 1.
+
+    Yields:
+        the chunks and the colors of the drones in each frame of the chunks
+        (see `bake_light_effect_chunk()`), in the order of the input
+    """
+    num_workers = max_workers or cpu_count() or 1
+    if num_workers <= 1:
+        for chunk in chunks:
+            yield chunk, bake_light_effect_chunk(chunk)
+        return
+
+    # Worker processes are started from scratch instead of forking the
+    # current process, which might be Blender itself
+    executor = ProcessPoolExecutor(num_workers, mp_context=get_context("spawn"))
+    pending: deque[tuple[LightEffectBakeChunk, Optional[Future]]] = deque()
+    use_workers = True
+
+    def get_next_result() -> tuple[LightEffectBakeChunk, NDArray[uint8]]:
+        nonlocal use_workers
+
+        chunk, future = pending.popleft()
+        if future is not None:
+            try:
+                return chunk, future.result()
+            except Exception as exc:
+                # Chunks that fail in a worker process are likely to fail
+                # in the other worker processes as well, so stop using them
+                if use_workers:
+                    log.warning(
+                        f"Evaluating light effects in a worker process failed "
+                        f"({exc}), evaluating them in the current process"
+                    )
+                    use_workers = False
+
+        return chunk, bake_light_effect_chunk(chunk)
+
+    with executor:
+        for chunk in chunks:
+            future: Optional[Future] = None
+            if use_workers:
+                try:
+                    future = executor.submit(bake_light_effect_chunk, chunk)
+                except Exception:
+                    # The pool is broken; evaluate the chunk when it is its turn
+                    use_workers = False
+            pending.append((chunk, future))
+
+            while len(pending) >= 2 * num_workers or (pending and not use_workers):
+                yield get_next_result()
+
+        while pending:
+            yield get_next_result()
@@ -1,44 +1,71 @@
+from base64 import b64encode
+from numpy import (
+    array,
+    asarray,
+    column_stack,
+    dtype,
+    flatnonzero,
+    float64,
+    full,
+    newaxis,
+)
+from numpy.typing import ArrayLike, NDArray
 from operator import attrgetter
-from typing import Iterable, Optional, Sequence, TypeVar
+from typing import Optional, Sequence, TypeVar
 
-from sbstudio.utils import simplify_path
+from sbstudio.math.simplification import find_points_to_keep_in_path
 
 from .color import Color4D
 
-__all__ = ("LightProgram",)
+__all__ = ("LightProgram", "simplify_light_program_mask")
 
 C = TypeVar("C", bound="LightProgram")
 
 
-def _simplify_color_distance_func(
-    keypoints: Iterable[Color4D], start: Color4D, end: Color4D
-):
-    """Distance function for LightProgram.simplify()"""
-    timespan = end.t - start.t
+_BINARY_RECORD_DTYPE = dtype([("t", "<f4"), ("rgb", "u1", (3,)), ("fade", "u1")])
+"""Data type of a single keypoint in the binary (version 2) representation of
+a light program.
+"""
 
-    result: list[float] = []
+SIMPLIFICATION_TOLERANCE = 4
+"""Maximum allowed deviation of any color channel of a light program from its
+original value when the light program is simplified.
+"""
 
-    for point in keypoints:
-        ratio = (point.t - start.t) / timespan if timespan > 0 else 0.5
-        interp = (
-            start.r + ratio * (end.r - start.r),
-            start.g + ratio * (end.g - start.g),
-            start.b + ratio * (end.b - start.b),
-        )
 
-        diff = max(
-            abs(interp[0] - point.r),
-            abs(interp[1] - point.g),
-            abs(interp[2] - point.b),
-        )
-        result.append(diff)
+def simplify_light_program_mask(times: ArrayLike, colors: ArrayLike) -> NDArray:
+    """Returns a boolean mask marking the keypoints of a sampled light program
+    that are kept by `LightProgram.simplify()`.
 
-    return result
+    Parameters:
+        times: the timestamps of the keypoints; shape is ``(N, )``
+        colors: the RGB colors of the keypoints; shape is ``(N, 3)``
+    """
+    points = column_stack(
+        (asarray(times, dtype=float64), asarray(colors, dtype=float64)[:, :3])
+    )
+    eq_with_next = (points[1:, 1:] == points[:-1, 1:]).all(axis=1)
+    return find_points_to_keep_in_path(
+        points, SIMPLIFICATION_TOLERANCE, _color_deviations_from_segment, eq_with_next
+    )
+
+
+def _color_deviations_from_segment(points: NDArray, start: int, end: int) -> NDArray:
+    """Deviation function for `simplify_light_program_mask()`; returns the
+    maximum absolute deviation of the color channels of each keypoint from the
+    color interpolated linearly between the endpoints of the segment.
+    """
+    times = points[start : end + 1, 0]
+    colors = points[start : end + 1, 1:]
 
+    timespan = times[-1] - times[0]
+    if timespan > 0:
+        ratios = (times[1:-1] - times[0]) / timespan
+    else:
+        ratios = full(len(times) - 2, 0.5)
 
-def _simplify_color_eq_func(p1: Color4D, p2: Color4D):
-    """Equality function for LightProgram.simplify()"""
-    return p1.r == p2.r and p1.g == p2.g and p1.b == p2.b
+    interp = colors[0] + ratios[:, newaxis] * (colors[-1] - colors[0])
+    return abs(interp - colors[1:-1]).max(axis=1)
 
 
 class LightProgram:
@@ -59,26 +86,53 @@ class LightProgram:
             )
         self.colors.append(color)
 
-    def as_dict(self, ndigits: int = 3):
+    def as_dict(self, ndigits: int = 3, *, version: int = 1):
         """Create a Skybrush-compatible dictionary representation of this instance.
 
         Parameters:
             ndigits: round floats to this precision
+            version: version of the representation to generate
 
         Return:
             dictionary to be converted to JSON later
         """
-        return {
-            "data": [
+        if version == 1:
+            # Standard representation
+            return {
+                "data": [
+                    [
+                        round(color.t, ndigits=ndigits),
+                        [int(color.r), int(color.g), int(color.b)],
+                        1 if color.is_fade else 0,
+                    ]
+                    for color in self.colors
+                ],
+                "version": 1,
+            }
+        elif version == 2:
+            # Representation similar to version 1 but in a binary form for
+            # reducing bandwidth usage: each keypoint is a record consisting of
+            # a little-endian float32 timestamp, three uint8 color components
+            # and an uint8 fade flag
+            records = array(
                 [
-                    round(color.t, ndigits=ndigits),
-                    [int(color.r), int(color.g), int(color.b)],
-                    1 if color.is_fade else 0,
-                ]
-                for color in self.colors
-            ],
-            "version": 1,
-        }
+                    (
+                        color.t,
+                        (int(color.r), int(color.g), int(color.b)),
+                        1 if color.is_fade else 0,
+                    )
+                    for color in self.colors
+                ],
+                dtype=_BINARY_RECORD_DTYPE,
+            )
+            return {
+                "data": b64encode(records.tobytes()).decode("ascii"),
+                "version": 2,
+            }
+        else:
+            raise ValueError(
+                f"Unknown version {version} for light program representation"
+            )
 
     def shift_time_in_place(self: C, delta: float) -> C:
         """Shifts all timestamps of the light program in-place.
@@ -99,11 +153,12 @@ class LightProgram:
             LightProgram instance with the simplified light code.
 
         """
-        new_items = simplify_path(
-            list(self.colors),
-            eps=4,
-            distance_func=_simplify_color_distance_func,
-            eq_func=_simplify_color_eq_func,
-        )
+        colors = self.colors
+        if len(colors) < 2:
+            return LightProgram(colors)
 
-        return LightProgram(new_items)
+        mask = simplify_light_program_mask(
+            [color.t for color in colors],
+            [(color.r, color.g, color.b) for color in colors],
+        )
+        return LightProgram([colors[index] for index in flatnonzero(mask)])
@@ -0,0 +1,288 @@
+"""Columnar storage for positions, colors and yaw angles sampled from a
+drone show.
+"""
+
+from numpy import (
+    asarray,
+    column_stack,
+    concatenate,
+    empty,
+    float64,
+    ones,
+    uint8,
+)
+from numpy.typing import ArrayLike, NDArray
+from typing import Optional, Sequence
+
+from sbstudio.math.simplification import simplify_trajectory_mask
+
+from .color import Color4D
+from .light_program import LightProgram, simplify_light_program_mask
+from .point import Point4D
+from .trajectory import Trajectory
+from .yaw import YawSetpoint, YawSetpointList
+
+__all__ = ("SampleBuffer",)
+
+
+class SampleBuffer:
+    """Preallocated, columnar storage for the positions, colors and yaw angles
+    of a set of drones, sampled at a given list of frames.
+
+    Storing the samples in NumPy arrays avoids the construction of one Python
+    object per drone per frame while the show is being sampled. Trajectories,
+    light programs and yaw setpoint lists are constructed from slices of the
+    arrays only when they are needed, one drone at a time.
+    """
+
+    times: NDArray[float64]
+    """Timestamps of the sampled frames, in seconds; shape is ``(F,)``."""
+
+    positions: Optional[NDArray[float64]] = None
+    """Sampled positions; shape is ``(F, D, 3)``. ``None`` if positions are
+    not being sampled. Positions are stored in double precision so the
+    trajectories constructed from them are identical to the ones constructed
+    from the sampled Python floats directly; the binary trajectory format
+    rounds them to single precision on its own.
+    """
+
+    colors: Optional[NDArray[uint8]] = None
+    """Sampled RGB colors in the [0; 255] range; shape is ``(F, D, 3)``.
+    ``None`` if colors are not being sampled.
+    """
+
+    yaw: Optional[NDArray[float64]] = None
+    """Sampled yaw angles, in degrees, CW; shape is ``(F, D)``. ``None`` if yaw
+    angles are not being sampled. Yaw angles are stored in double precision
+    because the simplification of yaw setpoint lists is sensitive to rounding
+    errors.
+    """
+
+    _length: int
+    """Number of frames that were already filled in the buffer."""
+
+    def __init__(
+        self,
+        num_frames: int,
+        num_drones: int,
+        *,
+        positions: bool = True,
+        colors: bool = False,
+        yaw: bool = False,
+    ):
+        """Constructor.
+
+        Parameters:
+            num_frames: the number of frames that the buffer must be able to
+                hold
+            num_drones: the number of drones in the buffer
+            positions: whether to allocate storage for positions
+            colors: whether to allocate storage for colors
+            yaw: whether to allocate storage for yaw angles
+        """
+        self.times = empty(num_frames, dtype=float64)
+        if positions:
+            self.positions = empty((num_frames, num_drones, 3), dtype=float64)
+        if colors:
+            self.colors = empty((num_frames, num_drones, 3), dtype=uint8)
+        if yaw:
+            self.yaw = empty((num_frames, num_drones), dtype=float64)
+        self._length = 0
+
+    @classmethod
+    def from_arrays(
+        cls,
+        times: ArrayLike,
+        *,
+        positions: Optional[ArrayLike] = None,
+        colors: Optional[ArrayLike] = None,
+        yaw: Optional[ArrayLike] = None,
+    ) -> "SampleBuffer":
+        """Creates a completely filled sample buffer from existing arrays.
+
+        Parameters:
+            times: timestamps of the frames, in seconds; shape is ``(F,)``
+            positions: positions of the drones; shape is ``(F, D, 3)``
+            colors: RGB colors of the drones; shape is ``(F, D, 3)``
+            yaw: yaw angles of the drones; shape is ``(F, D)``
+        """
+        result = cls.__new__(cls)
+        result.times = asarray(times, dtype=float64)
+        if positions is not None:
+            result.positions = asarray(positions, dtype=float64)
+        if colors is not None:
+            result.colors = asarray(colors, dtype=uint8)
+        if yaw is not None:
+            result.yaw = asarray(yaw, dtype=float64)
+        result._length = len(result.times)
+        return result
+
+    @classmethod
+    def concatenate(cls, buffers: Sequence["SampleBuffer"]) -> "SampleBuffer":
+        """Concatenates the filled parts of the given sample buffers along the
+        time axis.
+
+        All the buffers must contain the same channels for the same number of
+        drones. The frames of the buffers are expected to be in increasing
+        order of time.
+        """
+        if not buffers:
+            raise ValueError("at least one buffer is needed")
+
+        def _join(getter):
+            parts = [getter(buffer) for buffer in buffers]
+            if any(part is None for part in parts):
+                return None
+            return concatenate(parts)
+
+        return cls.from_arrays(
+            _join(lambda b: b.times[: len(b)]),
+            positions=_join(lambda b: _head(b.positions, len(b))),
+            colors=_join(lambda b: _head(b.colors, len(b))),
+            yaw=_join(lambda b: _head(b.yaw, len(b))),
+        )
+
+    def __len__(self) -> int:
+        return self._length
+
+    def select(self, frames: ArrayLike) -> "SampleBuffer":
+        """Returns a new, completely filled sample buffer that contains only
+        the given frames of this buffer.
+
+        Parameters:
+            frames: boolean mask or indices of the frames to keep, relative to
+                the filled part of the buffer
+        """
+        length = self._length
+        return self.__class__.from_arrays(
+            self.times[:length][frames],
+            positions=_select(self.positions, length, frames),
+            colors=_select(self.colors, length, frames),
+            yaw=_select(self.yaw, length, frames),
+        )
+
+    @property
+    def capacity(self) -> int:
+        """Returns the maximum number of frames that the buffer can hold."""
+        return len(self.times)
+
+    def next_frame(self, time: float) -> int:
+        """Reserves the next frame slot in the buffer for the given timestamp.
+
+        Returns:
+            the index of the reserved slot
+
+        Raises:
+            IndexError: if the buffer is full
+        """
+        index = self._length
+        if index >= self.capacity:
+            raise IndexError("sample buffer is full")
+
+        self.times[index] = time
+        self._length += 1
+        return index
+
+    def light_program_of(self, index: int, *, simplify: bool = False) -> LightProgram:
+        """Constructs the light program of the drone with the given index.
+
+        Parameters:
+            index: the index of the drone
+            simplify: whether to simplify the light program
+        """
+        if self.colors is None:
+            raise RuntimeError("colors were not sampled")
+
+        times = self.times[: self._length]
+        colors = self.colors[: self._length, index]
+
+        if simplify and len(times) > 1:
+            mask = simplify_light_program_mask(times, colors)
+            times, colors = times[mask], colors[mask]
+
+        return LightProgram(
+            [
+                Color4D(t, r, g, b)
+                for t, (r, g, b) in zip(times.tolist(), colors.tolist())
+            ]
+        )
+
+    def trajectory_of(
+        self, index: int, *, simplify: bool = False, tolerance: Optional[float] = None
+    ) -> Trajectory:
+        """Constructs the trajectory of the drone with the given index.
+
+        Parameters:
+            index: the index of the drone
+            simplify: whether to remove samples that are identical to their
+                predecessors and successors. The result is the same as the
+                result of `Trajectory.simplify_in_place()`, but the redundant
+                points are removed before they are converted into Python
+                objects.
+            tolerance: when not `None`, samples that are closer than the given
+                spatial tolerance to the trajectory formed by the remaining
+                samples are also removed, using the same algorithm as
+                `Trajectory.simplify_in_place()` with a tolerance. Implies
+                `simplify`.
+        """
+        if self.positions is None:
+            raise RuntimeError("positions were not sampled")
+
+        times = self.times[: self._length]
+        positions = self.positions[: self._length, index]
+
+        if (simplify or tolerance is not None) and len(positions) > 2:
+            # Keep the first and the last sample of each run of identical
+            # positions
+            differs_from_prev = ones(len(positions) + 1, dtype=bool)
+            differs_from_prev[1:-1] = (positions[1:] != positions[:-1]).any(axis=1)
+            to_keep = differs_from_prev[:-1] | differs_from_prev[1:]
+            times = times[to_keep]
+            positions = positions[to_keep]
+
+        if tolerance is not None and len(positions) > 2:
+            points = column_stack((times, positions))
+            to_keep = simplify_trajectory_mask(points, tolerance)
+            times = times[to_keep]
+            positions = positions[to_keep]
+
+        return Trajectory(
+            [
+                Point4D(t, x, y, z)
+                for t, (x, y, z) in zip(times.tolist(), positions.tolist())
+            ]
+        )
+
+    def yaw_setpoints_of(
+        self, index: int, *, simplify: bool = False
+    ) -> YawSetpointList:
+        """Constructs the yaw setpoint list of the drone with the given index.
+
+        The yaw angles are unwrapped such that consecutive angles never differ
+        by more than 180 degrees.
+
+        Parameters:
+            index: the index of the drone
+            simplify: whether to simplify the yaw setpoint list
+        """
+        if self.yaw is None:
+            raise RuntimeError("yaw angles were not sampled")
+
+        times = self.times[: self._length].tolist()
+        angles = self.yaw[: self._length, index].tolist()
+
+        result = YawSetpointList(
+            [YawSetpoint(t, angle) for t, angle in zip(times, angles)]
+        )
+        result.unwrap()
+        return result.simplify() if simplify else result
+
+
+def _head(values: Optional[NDArray], length: int) -> Optional[NDArray]:
+    return None if values is None else values[:length]
+
+
+def _select(
+    values: Optional[NDArray], length: int, frames: ArrayLike
+) -> Optional[NDArray]:
+    return None if values is None else values[:length][frames]
@@ -5,6 +5,9 @@ from operator import attrgetter
 from struct import Struct
 from typing import List, Optional, Sequence, TypeVar
 
+from sbstudio.math.delta_encoding import encode_quantized_deltas
+from sbstudio.math.simplification import simplify_trajectory_mask
+
 from .point import Point3D, Point4D
 
 __all__ = ("Trajectory",)
@@ -98,6 +101,22 @@ class Trajectory:
                 "points": b64encode(floats.tobytes()).decode("ascii"),
                 "version": 2,
             }
+        elif version == 3:
+            # Representation similar to version 2, but the timestamps and the
+            # coordinates are quantized to the given number of decimal digits
+            # and the differences of consecutive points are encoded as
+            # zig-zag variable-length integers. This is several times smaller
+            # than version 2 and compresses a lot better
+            points = array(
+                [point.as_tuple() for point in self.points], dtype=float
+            ).reshape(-1, 4)
+            return {
+                "points": b64encode(
+                    encode_quantized_deltas(points, ndigits=ndigits)
+                ).decode("ascii"),
+                "ndigits": ndigits,
+                "version": 3,
+            }
         else:
             raise ValueError(f"Unknown version {version} for trajectory representation")
 
@@ -134,13 +153,28 @@ class Trajectory:
             point.t += delta
         return self
 
-    def simplify_in_place(self: C) -> C:
-        """Simplifies the trajectory in-place by removing points that are
-        identical to their predecessors and successors.
+    def simplify_in_place(self: C, tolerance: Optional[float] = None) -> C:
+        """Simplifies the trajectory in-place.
+
+        Parameters:
+            tolerance: when `None`, only points that are identical to their
+                predecessors and successors are removed. Otherwise, the
+                trajectory is simplified with the Ramer-Douglas-Peucker
+                algorithm, removing all points that are closer than the given
+                spatial tolerance to the position interpolated from the
+                remaining points at the same time instant.
         """
         if not self.points:
             return self
 
+        if tolerance is not None:
+            points = array([point.as_tuple() for point in self.points])
+            mask = simplify_trajectory_mask(points, tolerance)
+            self.points = [
+                point for point, keep in zip(self.points, mask.tolist()) if keep
+            ]
+            return self
+
         first_point = self.points[0]
         new_points: List[Point4D] = []
 
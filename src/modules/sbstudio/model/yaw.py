@@ -1,4 +1,6 @@
+from base64 import b64encode
 from dataclasses import dataclass
+from numpy import array
 from operator import attrgetter
 from typing import (
     Sequence,
@@ -41,26 +43,44 @@ class YawSetpointList:
             raise ValueError("New setpoint must come after existing setpoints in time")
         self.setpoints.append(setpoint)
 
-    def as_dict(self, ndigits: int = 3):
+    def as_dict(self, ndigits: int = 3, *, version: int = 1):
         """Create a Skybrush-compatible dictionary representation of this
         instance.
 
         Parameters:
             ndigits: round floats to this precision
+            version: version of the representation to generate
 
         Return:
             dictionary of this instance, to be converted to JSON later
         """
-        return {
-            "setpoints": [
-                [
-                    round(setpoint.time, ndigits=ndigits),
-                    round(setpoint.angle, ndigits=ndigits),
-                ]
-                for setpoint in self.setpoints
-            ],
-            "version": 1,
-        }
+        if version == 1:
+            # Standard representation
+            return {
+                "setpoints": [
+                    [
+                        round(setpoint.time, ndigits=ndigits),
+                        round(setpoint.angle, ndigits=ndigits),
+                    ]
+                    for setpoint in self.setpoints
+                ],
+                "version": 1,
+            }
+        elif version == 2:
+            # Representation similar to version 1 but in a binary form for
+            # reducing bandwidth usage: little-endian float32 time-angle pairs
+            floats = array(
+                [(setpoint.time, setpoint.angle) for setpoint in self.setpoints],
+                dtype="<f4",
+            )
+            return {
+                "setpoints": b64encode(floats.tobytes()).decode("ascii"),
+                "version": 2,
+            }
+        else:
+            raise ValueError(
+                f"Unknown version {version} for yaw setpoint list representation"
+            )
 
     def shift_in_place(
         self: C,
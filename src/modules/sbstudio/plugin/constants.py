@@ -46,6 +46,11 @@ DEFAULT_INDOOR_DRONE_RADIUS = 0.1
 DEFAULT_OUTDOOR_DRONE_RADIUS = 0.5
 """Default outdoor drone radius"""
 
+DEFAULT_TRAJECTORY_TOLERANCE = 0.01
+"""Default spatial tolerance of the simplification of exported trajectories in
+the export operators that let the user configure it, in meters
+"""
+
 LATEST_SKYBRUSH_PLUGIN_VERSION = 2
 """The latest (current) plugin version."""
 
@@ -4,8 +4,6 @@ import types
 import bpy
 
 from collections.abc import Callable, Iterable, Sequence
-from functools import partial
-from operator import itemgetter
 from typing import Any, cast, Optional
 from uuid import uuid4
 
@@ -31,9 +29,24 @@ from bpy.types import (
 )
 from mathutils import Vector
 from mathutils.bvhtree import BVHTree
+from numpy import (
+    array,
+    empty,
+    float32,
+    float64,
+    int32,
+    ones,
+)
+from numpy.typing import NDArray
 
-from sbstudio.math.colors import blend_in_place, BlendMode
+from sbstudio.math.colors import blend_array_in_place, BlendMode
+from sbstudio.math.intervals import IntervalIndex
 from sbstudio.math.rng import RandomSequence
+from sbstudio.model.light_effects import (
+    LightEffectDescriptor,
+    LightEffectMesh,
+    test_containment_of_points_in_triangles,
+)
 from sbstudio.model.plane import Plane
 from sbstudio.model.types import Coordinate3D, MutableRGBAColor
 from sbstudio.plugin.constants import DEFAULT_LIGHT_EFFECT_DURATION
@@ -42,11 +55,21 @@ from sbstudio.plugin.model.pixel_cache import PixelCache
 from sbstudio.plugin.model.storyboard import get_storyboard, StoryboardEntryOrTransition
 from sbstudio.plugin.utils import remove_if_unused, with_context
 from sbstudio.plugin.utils.collections import pick_unique_name
-from sbstudio.plugin.utils.color_ramp import update_color_ramp_from
+from sbstudio.plugin.utils.color_ramp import (
+    get_color_ramp_lookup_table,
+    invalidate_color_ramp_lookup_tables,
+    update_color_ramp_from,
+)
 from sbstudio.plugin.utils.evaluator import get_position_of_object
-from sbstudio.plugin.utils.image import convert_from_srgb_to_linear
+from sbstudio.plugin.utils.image import convert_from_srgb_to_linear_in_place
+from sbstudio.plugin.utils.image_frames import (
+    close_image_frame_readers,
+    get_image_frame_reader,
+    get_image_user_frame,
+    is_reading_image_frames_from_disk,
+)
 from sbstudio.plugin.utils.texture import texture_as_dict, update_texture_from_dict
-from sbstudio.utils import constant, distance_sq_of, load_module, negate
+from sbstudio.utils import load_function, load_module
 
 from .mixins import ListMixin
 
@@ -64,21 +87,6 @@ def object_has_mesh_data(self, obj) -> bool:
 CONTAINMENT_TEST_AXES = (Vector((1, 0, 0)), Vector((0, 1, 0)), Vector((0, 0, 1)))
 """Pre-constructed vectors for a quick containment test using raycasting and BVH-trees"""
 
-OUTPUT_TYPE_TO_AXIS_SORT_KEY = {
-    "GRADIENT_XYZ": (0, 1, 2),
-    "GRADIENT_XZY": (0, 2, 1),
-    "GRADIENT_YXZ": (1, 0, 2),
-    "GRADIENT_YZX": (1, 2, 0),
-    "GRADIENT_ZXY": (2, 0, 1),
-    "GRADIENT_ZYX": (2, 1, 0),
-    "default": (0, 0, 0),
-}
-"""Axis mapping for the gradient-based output types"""
-
-OUTPUT_TYPE_TO_AXIS_SORT_KEY = {
-    key: itemgetter(*value) for key, value in OUTPUT_TYPE_TO_AXIS_SORT_KEY.items()
-}
-
 OUTPUT_ITEMS = [
     ("FIRST_COLOR", "First color", "", 1),
     ("LAST_COLOR", "Last color", "", 2),
@@ -105,14 +113,6 @@ def effect_type_supports_randomization(type: str) -> bool:
     return type == "COLOR_RAMP" or type == "IMAGE"
 
 
-def output_type_supports_mapping_mode(type: str) -> bool:
-    """Returns whether the light effect output type given in the argument may
-    have a mapping mode that defines how the output values are mapped to the
-    [0; 1] range of the color ramp or image.
-    """
-    return type == "DISTANCE" or type.startswith("GRADIENT_")
-
-
 def test_containment(bvh_tree: Optional[BVHTree], point: Coordinate3D) -> bool:
     """Given a point and a BVH-tree, tests whether the point is _probably_
     within the mesh represented by the BVH-tree.
@@ -149,9 +149,6 @@ def test_is_in_front_of(plane: Optional[Plane], point: Coordinate3D) -> bool:
         return True
 
 
-_always_true = constant(True)
-
-
 def get_color_function_names(self, context: Context) -> list[tuple[str, str, str]]:
     names: list[str]
 
@@ -224,10 +221,24 @@ def texture_updated(self: LightEffect, context):
     self.invalidate_color_image()
 
 
+def timing_updated(self: LightEffect, context):
+    invalidate_interval_indices()
+
+
 _pixel_cache = PixelCache()
 """Global cache for the pixels of images in image-based light effects."""
 
 
+_mesh_triangle_cache: dict[
+    int, tuple[tuple[Any, ...], Optional[NDArray], Optional[NDArray]]
+] = {}
+"""Cached triangles of the meshes used by light effects in world coordinates,
+keyed by the pointers of the mesh objects. Each entry stores the fingerprint of
+the mesh that the triangles were calculated from, the triangles themselves and
+the bounding box of the mesh.
+"""
+
+
 def invalidate_pixel_cache(static: bool = True, dynamic: bool = True) -> None:
     """Invalidates the cached pixel-based representations. Called when a new
     file is opened in Blender.
@@ -235,10 +246,66 @@ def invalidate_pixel_cache(static: bool = True, dynamic: bool = True) -> None:
     global _pixel_cache
     if static:
         _pixel_cache.clear()
+        close_image_frame_readers()
+        invalidate_color_ramp_lookup_tables()
+        _mesh_triangle_cache.clear()
     elif dynamic:
         _pixel_cache.clear_dynamic()
 
 
+def invalidate_mesh_triangle_cache() -> None:
+    """Invalidates the cached triangles of the meshes used by light effects.
+    Called when the geometry of an object changes in the scene, e.g., when a
+    mesh is edited.
+    """
+    _mesh_triangle_cache.clear()
+
+
+_interval_indices: dict[int, tuple[bytes, IntervalIndex]] = {}
+"""Cached indices of the frame intervals of the light effects in light effect
+collections, keyed by the pointers of the collections. Each entry also stores
+the start frames and durations of the light effects in the collection when the
+index was built, so the index is rebuilt if any of them changes.
+"""
+
+
+def invalidate_interval_indices() -> None:
+    """Invalidates the cached indices of the frame intervals of light effects.
+    Called when light effects are retimed or reordered, and when the state of
+    the file changes outside our control (undo, redo or opening a new file).
+    """
+    _interval_indices.clear()
+
+
+_snapshots: dict[int, tuple[int, LightEffectDescriptor]] = {}
+"""Snapshots of light effects taken by `LightEffect.apply_on_colors()`, keyed
+by the pointers of the light effects. Each entry also stores the frame that the
+snapshot belongs to so the snapshot can be reused when the light effects are
+re-evaluated in the same frame.
+"""
+
+
+def invalidate_light_effect_snapshots() -> None:
+    """Invalidates the cached snapshots of light effects. Called when the scene
+    changes in a way that may affect the light effects (see
+    `may_affect_light_effects()`), and when the state of the file changes
+    outside our control (undo, redo or opening a new file).
+    """
+    _snapshots.clear()
+
+
+def may_affect_light_effects(update) -> bool:
+    """Returns whether the given depsgraph update may change the colors of the
+    drones. Shading-only updates of objects are ignored as these are caused
+    by the light effects themselves when they set the colors of the drones.
+    """
+    return not (
+        isinstance(update.id, bpy.types.Object)
+        and not update.is_updated_transform
+        and not update.is_updated_geometry
+    )
+
+
 def _storyboard_entry_or_transition_selection_update(
     self: LightEffect, context: Optional[Context] = None
 ):
@@ -297,6 +364,7 @@ class LightEffect(PropertyGroup):
         description="Frame when this light effect should start in the show",
         default=0,
         options=set(),
+        update=timing_updated,
     )
     duration = IntProperty(
         name="Duration",
@@ -304,6 +372,7 @@ class LightEffect(PropertyGroup):
         min=1,
         default=1,
         options=set(),
+        update=timing_updated,
     )
     frame_end = IntProperty(
         name="End Frame",
@@ -463,6 +532,12 @@ class LightEffect(PropertyGroup):
         """Applies this effect to a given list of colors, each belonging to a
         given spatial position in the given frame.
 
+        The effect is evaluated for all the drones at once on a snapshot of
+        the effect (see `snapshot()`), and the new colors are then blended
+        onto the existing colors in a single step. The snapshot is reused
+        while the effect is evaluated in the same frame, until it is
+        invalidated with `invalidate_light_effect_snapshots()`.
+
         Parameters:
             colors: the colors to modify in-place
             positions: the spatial positions of the drones having the given
@@ -474,268 +549,34 @@ class LightEffect(PropertyGroup):
                 on the color ramp or a principal axis of the image if
                 randomization is turned on
         """
-
-        def get_output_based_on_output_type(
-            output_type: str,
-            mapping_mode: str,
-            output_function,
-        ) -> tuple[Optional[list[Optional[float]]], Optional[float]]:
-            """Get the float output(s) for color ramp or image indexing based on the output type.
-
-            Args:
-                output_type: the output type used for indexing
-                mapping_mode: mapping mode corresponding to the output type
-
-            Returns:
-                individual and common outputs
-            """
-            outputs: Optional[list[Optional[float]]] = None
-            common_output: Optional[float] = None
-            order: Optional[list[int]] = None
-
-            if output_type == "FIRST_COLOR":
-                common_output = 0.0
-            elif output_type == "LAST_COLOR":
-                common_output = 1.0
-            elif output_type == "TEMPORAL":
-                common_output = time_fraction
-            elif output_type_supports_mapping_mode(output_type):
-                # There are two options here:
-                # 1. Legacy, non-proportional mode. We sort the drones based on the
-                #    sort key derived above and then space them out equally on the
-                #    color ramp or image axis.
-                # 2. Proportional mode. Same as above, but we assign drones to
-                #    positions on the color ramp or image axis in a way that their
-                #    distances on the color ramp or image axis are proportional to
-                #    the differences in their sort keys. Note that this needs a
-                #    _scalar_ sorting key so we ignore all but the principal axis
-                #    for gradient output types.
-                proportional = mapping_mode == "PROPORTIONAL"
-
-                if output_type == "DISTANCE":
-                    if self.mesh:
-                        position_of_mesh = get_position_of_object(self.mesh)
-                        sort_key = lambda index: distance_sq_of(
-                            positions[index], position_of_mesh
-                        )
-                    else:
-                        sort_key = None
-
-                    # sort_key is guaranteed to return a scalar here
-                else:
-                    query_axes = (
-                        OUTPUT_TYPE_TO_AXIS_SORT_KEY.get(output_type)
-                        or OUTPUT_TYPE_TO_AXIS_SORT_KEY["default"]
-                    )
-                    if proportional:
-                        # In proportional mode, we are using the primary axis only
-                        # because we need a scalar
-                        sort_key = lambda index: query_axes(positions[index])[0]
-                    else:
-                        # In non-proportional mode, we are sorting along multiple
-                        # axes
-                        sort_key = lambda index: query_axes(positions[index])
-
-                outputs = [1.0] * num_positions  # type: ignore
-                order = list(range(num_positions))
-                if num_positions > 1:
-                    if proportional and sort_key is not None:
-                        # Proportional mode -- calculate the sort key for each item,
-                        # and distribute them along the color axis proportionally
-                        # to the differences between the numeric values of the sort
-                        # keys
-                        evaluated_sort_keys = [sort_key(i) for i in order]
-                        min_value, max_value = (
-                            min(evaluated_sort_keys),
-                            max(evaluated_sort_keys),
-                        )
-                        diff = max_value - min_value
-                        if diff > 0:
-                            outputs = [
-                                (value - min_value) / diff
-                                for value in evaluated_sort_keys
-                            ]
-                    else:
-                        if sort_key is not None:
-                            order.sort(key=sort_key)
-
-                        assert outputs is not None
-                        for u, v in enumerate(order):
-                            outputs[v] = u / (num_positions - 1)
-
-            elif output_type == "INDEXED_BY_DRONES":
-                # Gradient based on drone index
-                if num_positions > 1:
-                    np_m1 = num_positions - 1
-                    outputs = [index / np_m1 for index in range(num_positions)]
-                else:
-                    common_output = 1.0
-
-            elif output_type == "INDEXED_BY_FORMATION":
-                # Gradient based on formation index
-                if mapping is not None:
-                    assert num_positions == len(mapping)
-
-                    # TODO: this now works only if the number of valid entries in the mapping
-                    # is consistent with the number of drones in the given formation;
-                    # e.g., it will not work with two formations of half size at the same time
-                    # for this case, single-formation specific mapping would be needed
-
-                    # reduce mapping of all positions to rank, in case formation size
-                    # is smaller than the number of drones
-                    if None in mapping:
-                        sorted_valid_mapping = sorted(
-                            x for x in mapping if x is not None
-                        )
-                        np_m1 = max(len(sorted_valid_mapping) - 1, 1)
-                        outputs = [
-                            None if x is None else sorted_valid_mapping.index(x) / np_m1
-                            for x in mapping
-                        ]
-                    # otherwise just normalize full mapping to [0, 1]
-                    else:
-                        np_m1 = max(num_positions - 1, 1)
-                        outputs = [None if x is None else x / np_m1 for x in mapping]
-                else:
-                    # if there is no mapping at all, we do not change color of drones
-                    outputs = [None] * num_positions  # type: ignore
-
-            elif output_type == "CUSTOM":
-                absolute_path = abspath(output_function.path)
-                module = load_module(absolute_path) if absolute_path else None
-                if output_function.name:
-                    fn = getattr(module, output_function.name)
-                    outputs = [
-                        fn(
-                            frame=frame,
-                            time_fraction=time_fraction,
-                            drone_index=index,
-                            formation_index=(
-                                mapping[index] if mapping is not None else None
-                            ),
-                            position=positions[index],
-                            drone_count=num_positions,
-                        )
-                        for index in range(num_positions)
-                    ]
-                else:
-                    common_output = 1.0
-
-            else:
-                # Should not get here
-                common_output = 1.0
-
-            return outputs, common_output
-
         # Do some quick checks to decide whether we need to bother at all
         if not self.enabled or not self.contains_frame(frame):
             return
 
-        time_fraction = (frame - self.frame_start) / max(self.duration - 1, 1)
-        num_positions = len(positions)
-
-        color_ramp = self.color_ramp
-        color_image = self.color_image
-        color_function_ref = self.color_function_ref
-        new_color = [0.0] * 4
+        if not len(positions):
+            return
 
-        outputs_x, common_output_x = get_output_based_on_output_type(
-            self.output, self.output_mapping_mode, self.output_function
+        result = self._get_snapshot_for_frame(frame).evaluate(
+            positions,
+            mapping,
+            frame=frame,
+            random_seq=random_seq,
+            containment_test=self._test_containment_of_points,
         )
-        if color_image is not None:
-            outputs_y, common_output_y = get_output_based_on_output_type(
-                self.output_y, self.output_mapping_mode_y, self.output_function_y
-            )
-
-        # Get the additional predicate required to evaluate whether the effect
-        # will be applied at a given position
-        condition = self._get_spatial_effect_predicate()
-
-        for index, position in enumerate(positions):
-            # Take the base color to modify
-            color = colors[index]
-
-            # Calculate the output value of the effect that goes through the color
-            # ramp or image mapper
-            if common_output_x is not None:
-                output_x = common_output_x
-            else:
-                assert outputs_x is not None
-                # if this specific output is disabled, we
-                # skip the effect
-                if outputs_x[index] is None:
-                    continue
-                output_x = outputs_x[index]
-            assert isinstance(output_x, float)
-
-            if color_image is not None:
-                if common_output_y is not None:
-                    output_y = common_output_y
-                else:
-                    assert outputs_y is not None
-                    # if this specific output is disabled, we
-                    # skip the effect
-                    if outputs_y[index] is None:
-                        continue
-                    output_y = outputs_y[index]
-                assert isinstance(output_y, float)
-
-            # Randomize the output value if needed
-            if self.randomness != 0:
-                offset_x = (random_seq.get_float(index) - 0.5) * self.randomness
-                output_x = (offset_x + output_x) % 1.0
-                if color_image is not None:
-                    offset_y = (random_seq.get_float(index) - 0.5) * self.randomness
-                    output_y = (offset_y + output_y) % 1.0
-
-            # Calculate the influence of the effect, depending on the fade-in
-            # and fade-out durations and the optional mesh
-            alpha = max(
-                min(self._evaluate_influence_at(position, frame, condition), 1.0), 0.0
-            )
-
-            if color_function_ref is not None:
-                try:
-                    new_color[:] = color_function_ref(
-                        frame=frame,
-                        time_fraction=time_fraction,
-                        drone_index=index,
-                        formation_index=(
-                            mapping[index] if mapping is not None else None
-                        ),
-                        position=position,
-                        drone_count=num_positions,
-                    )
-                except Exception as exc:
-                    raise RuntimeError("ERROR_COLOR_FUNCTION") from exc
-            elif color_image is not None:
-                width, height = color_image.size
-                pixels = self.get_image_pixels()
-
-                x = int((width - 1) * output_x)
-                y = int((height - 1) * output_y)
-                offset = (x + y * width) * 4
-                pixel_color = pixels[offset : offset + 4]
-
-                # This check is needed to cater for the cases when the calculated
-                # pixel coordinate is out of the bounds of the image, in which
-                # case get_pixel() returns an empty list or a short list
-                if len(pixel_color) == len(new_color):
-                    # If the conversion to linear space ever becomes a bottleneck,
-                    # we can convert the image in advance when it is stored into
-                    # the pixel cache if we can vectorize the operation somehow
-                    # or offload it to C.
-                    new_color[:] = convert_from_srgb_to_linear(pixel_color)  # type: ignore
-            elif color_ramp:
-                new_color[:] = color_ramp.evaluate(output_x)
-            else:
-                # should not happen
-                new_color[:] = (1.0, 1.0, 1.0, 1.0)
-
-            new_color[3] *= alpha
+        if result is None:
+            return
 
-            # Apply the new color with alpha blending
-            blend_in_place(new_color, color, BlendMode[self.blend_mode])  # type: ignore
+        # Apply the new colors with alpha blending
+        indices, new_colors, alpha = result
+        backdrop = array([colors[index] for index in indices.tolist()], dtype=float64)
+        blend_array_in_place(
+            new_colors,
+            backdrop,
+            BlendMode[self.blend_mode],  # type: ignore
+            alpha,
+        )
+        for index, color in zip(indices.tolist(), backdrop.tolist()):
+            colors[index][:] = color
 
     def as_dict(self):
         """Creates a dictionary representation of the light effect."""
@@ -802,8 +643,7 @@ class LightEffect(PropertyGroup):
         if self.type != "FUNCTION" or not self.color_function:
             return None
         absolute_path = abspath(self.color_function.path)
-        module = load_module(absolute_path)
-        return getattr(module, self.color_function.name, None)
+        return load_function(absolute_path, self.color_function.name)
 
     def contains_frame(self, frame: int) -> bool:
         """Returns whether the light effect contains the given frame.
@@ -855,17 +695,43 @@ class LightEffect(PropertyGroup):
         else:
             return 0
 
-    def get_image_pixels(self) -> Sequence[float]:
+    def get_image_pixels(self, frame: Optional[int] = None) -> NDArray:
         """Returns the pixel-level representation of the color image of the light
         effect, caching the result for future use.
+
+        Frames of image sequences and movies are read from disk if possible
+        during exports and bakes, so they do not depend on Blender refreshing
+        the image in a UI redraw.
+
+        Parameters:
+            frame: the frame of the scene that the pixels should belong to;
+                `None` means the current frame. Relevant only for animated
+                images.
+
+        Returns:
+            the pixels of the image as a float32 array of shape ``(N, 4)``,
+            already converted to linear space. The array is shared with the
+            cache so it must not be modified.
         """
         global _pixel_cache
         pixels = _pixel_cache.get(self.id)
-        if pixels is None and self.color_image is not None:
-            pixels = self.color_image.pixels[:]
-            _pixel_cache.add(self.id, pixels, is_static=not self.is_animated)
+        if pixels is not None:
+            return pixels
 
-        return pixels or ()
+        color_image = self.color_image
+        if color_image is None:
+            return empty((0, 4), dtype=float32)
+
+        data = self._read_color_image_frame(frame) if self.is_animated else None
+        if data is None:
+            data = empty(len(color_image.pixels), dtype=float32)
+            color_image.pixels.foreach_get(data)
+
+        # Copy the pixels because the frame readers may return the same array
+        # again later
+        pixels = array(data, dtype=float32).reshape(-1, 4)
+        convert_from_srgb_to_linear_in_place(pixels)
+        return _pixel_cache.add(self.id, pixels, is_static=not self.is_animated)
 
     @property
     def id(self) -> str:
@@ -882,6 +748,20 @@ class LightEffect(PropertyGroup):
         """
         return self.color_image is not None and self.color_image.frame_duration > 1
 
+    @property
+    def needs_redraw(self) -> bool:
+        """Returns whether Blender needs to redraw its UI after every frame
+        change during exports and bakes for the pixels of the color image of
+        this light effect to be up-to-date. This is the case for animated
+        images whose frames cannot be read from disk directly.
+        """
+        color_image = self.color_image
+        return (
+            color_image is not None
+            and color_image.frame_duration > 1
+            and get_image_frame_reader(color_image, self.texture.image_user) is None
+        )
+
     def invalidate_color_image(self) -> None:
         """Invalidates the cached pixel-level representation of the color image
         of the light effect.
@@ -896,6 +776,80 @@ class LightEffect(PropertyGroup):
         except KeyError:
             pass  # this is OK
 
+    def snapshot(
+        self, frame: Optional[int] = None, *, with_triangles: bool = False
+    ) -> LightEffectDescriptor:
+        """Takes a snapshot of the properties of the light effect that can be
+        evaluated without Blender, e.g., in a worker process.
+
+        Parameters:
+            frame: the frame of the scene that the snapshot should belong to;
+                `None` means the current frame. Relevant only for animated
+                images.
+            with_triangles: whether to include the triangles of the mesh of
+                the effect in the snapshot if the effect is limited to the
+                inside of the mesh. When this is `False`, the containment test
+                has to be supplied to `LightEffectDescriptor.evaluate()`
+                separately.
+
+        Returns:
+            the snapshot of the light effect. Arrays in the snapshot are shared
+            with the caches of the light effects so they must not be modified.
+        """
+        color_ramp = self.color_ramp
+        color_image = self.color_image
+
+        if self.type == "FUNCTION" and self.color_function:
+            color_function = (
+                abspath(self.color_function.path),
+                self.color_function.name,
+            )
+        else:
+            color_function = None
+
+        if self.mesh:
+            if with_triangles and self.target == "INSIDE_MESH":
+                triangles, bounds = self._get_triangles_from_mesh()
+            else:
+                triangles, bounds = None, None
+
+            plane = self._get_plane_from_mesh() if self.target == "FRONT_SIDE" else None
+            mesh = LightEffectMesh(
+                position=get_position_of_object(self.mesh),
+                plane=Plane(tuple(plane.normal), plane.offset) if plane else None,
+                triangles=triangles,
+                bounds=bounds,
+            )
+        else:
+            mesh = None
+
+        return LightEffectDescriptor(
+            frame_start=self.frame_start,
+            duration=self.duration,
+            influence=self.influence,
+            fade_in_duration=self.fade_in_duration,
+            fade_out_duration=self.fade_out_duration,
+            output=self.output,
+            output_mapping_mode=self.output_mapping_mode,
+            output_function=_get_function_reference(self.output_function)
+            if self.output == "CUSTOM"
+            else None,
+            output_y=self.output_y,
+            output_mapping_mode_y=self.output_mapping_mode_y,
+            output_function_y=_get_function_reference(self.output_function_y)
+            if self.output_y == "CUSTOM"
+            else None,
+            randomness=self.randomness,
+            blend_mode=BlendMode[self.blend_mode],  # type: ignore
+            target=self.target,
+            invert_target=self.invert_target,
+            color_ramp=get_color_ramp_lookup_table(color_ramp) if color_ramp else None,
+            image=self.get_image_pixels(frame) if color_image is not None else None,
+            image_size=tuple(color_image.size) if color_image is not None else (0, 0),
+            color_function=color_function,
+            mesh=mesh,
+        )
+
     def update_from(self, other: "LightEffect") -> None:
         """Updates the properties of this light effect from another one,
         _except_ its name.
@@ -1023,37 +977,28 @@ class LightEffect(PropertyGroup):
             )
             self.frame_end = self.storyboard_entry_or_transition.frame_end + end_offset
 
-    def _evaluate_influence_at(
-        self, position, frame: int, condition: Optional[Callable[[Coordinate3D], bool]]
-    ) -> float:
-        """Eveluates the effective influence of the effect on the given position
-        in space and at the given frame.
+    def _read_color_image_frame(self, frame: Optional[int] = None) -> Optional[NDArray]:
+        """Reads the pixels of the frame of the animated color image of the
+        light effect that belongs to the given frame of the scene straight from
+        disk.
 
-        Parameters:
-            position: the position to evaluate the influence at
-            frame: the frame count
-            condition: additional condition that must evaluate to true when called
-                with the position; otherwise the effect will not be applied at all
+        Returns:
+            the pixels of the frame or `None` if they cannot be read from disk
+            or we are not exporting or baking the show
         """
-        # Apply mesh containment constraint
-        if condition and not condition(position):
-            return 0.0
-
-        influence = self.influence
+        color_image = self.color_image
+        if color_image is None or not is_reading_image_frames_from_disk():
+            return None
 
-        # Apply fade-in
-        if self.fade_in_duration > 0:
-            diff = frame - self.frame_start + 1
-            if diff < self.fade_in_duration:
-                influence *= diff / self.fade_in_duration
+        image_user = self.texture.image_user
+        reader = get_image_frame_reader(color_image, image_user)
+        if reader is None:
+            return None
 
-        # Apply fade_out
-        if self.fade_out_duration > 0:
-            diff = self.frame_end - frame
-            if diff < self.fade_out_duration:
-                influence *= diff / self.fade_out_duration
+        if frame is None:
+            frame = bpy.context.scene.frame_current
 
-        return influence
+        return reader.read(get_image_user_frame(image_user, frame))
 
     def _get_bvh_tree_from_mesh(self) -> Optional[BVHTree]:
         """Returns a BVH-tree data structure from the mesh associated to this
@@ -1081,6 +1026,100 @@ class LightEffect(PropertyGroup):
                     tree = BVHTree.FromBMesh(b_mesh)
             return tree
 
+    def _get_snapshot_for_frame(self, frame: int) -> LightEffectDescriptor:
+        """Returns a snapshot of the light effect in the given frame, reusing
+        the last snapshot of the light effect if it was taken in the same frame
+        and the snapshots were not invalidated since then.
+        """
+        key = self.as_pointer()
+        item = _snapshots.get(key)
+        if item is None or item[0] != frame:
+            item = _snapshots[key] = frame, self.snapshot(frame)
+        return item[1]
+
+    def _get_mesh_geometry(self) -> Optional[tuple[Mesh, tuple[Any, ...]]]:
+        """Returns the mesh data associated to this light effect, along with a
+        fingerprint of the geometry and the transformation of the mesh that
+        can be used as a cache key.
+
+        The fingerprint is cheap to calculate as it does not depend on the
+        coordinates of the vertices. Meshes that may be deformed over time by
+        modifiers or animated shape keys are fingerprinted with the current
+        frame as well; edits of the mesh are handled by invalidating the
+        caches with `invalidate_mesh_triangle_cache()` instead.
+
+        Returns:
+            `None` if the light effect has no associated mesh, otherwise the
+            evaluated mesh data (or the mesh data of the object itself if the
+            mesh is not in the evaluated depsgraph) and the fingerprint
+        """
+        if not self.mesh or not self.mesh.data:
+            return None
+
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        mesh = self.mesh
+
+        # Use the evaluated mesh if the object is in the evaluated depsgraph;
+        # otherwise (maybe it is hidden?) use self.mesh directly
+        obj = depsgraph.objects.get(mesh.name)
+        evaluated = obj is not None and obj.data is not None
+        mesh_data = cast(Mesh, obj.data if evaluated else mesh.data)
+
+        fingerprint = (
+            mesh.data.as_pointer(),
+            mesh_data.as_pointer(),
+            len(mesh_data.vertices),
+            len(mesh_data.edges),
+            len(mesh_data.polygons),
+            tuple(value for row in mesh.matrix_world for value in row),
+            bpy.context.scene.frame_current if _is_deformed_over_time(mesh) else None,
+        )
+        return mesh_data, fingerprint
+
+    def _get_triangles_from_mesh(
+        self,
+    ) -> tuple[Optional[NDArray], Optional[NDArray]]:
+        """Returns the triangles of the mesh associated to this light effect in
+        world coordinates, along with the bounding box of the mesh. This is
+        the counterpart of `_get_bvh_tree_from_mesh()` for snapshots that are
+        evaluated without Blender.
+
+        Triangles are cached and they are recalculated only if the geometry or
+        the transformation of the mesh changes; see `_get_mesh_geometry()`.
+
+        Returns:
+            the vertices of the triangles as an array of shape ``(T, 3, 3)``
+            and the bounding box of the mesh as an array of shape ``(2, 3)``;
+            the triangles are `None` if the light effect has no associated
+            mesh and the bounding box is `None` if the mesh has no vertices
+        """
+        geometry = self._get_mesh_geometry()
+        if geometry is None:
+            return None, None
+
+        mesh_data, fingerprint = geometry
+
+        key = self.mesh.as_pointer()
+        entry = _mesh_triangle_cache.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1], entry[2]
+
+        vertices = mesh_data.vertices
+        coords = empty(len(vertices) * 3, dtype=float32)
+        vertices.foreach_get("co", coords)
+        matrix = array(self.mesh.matrix_world, dtype=float64)
+        coords = coords.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+
+        mesh_data.calc_loop_triangles()
+        loop_triangles = mesh_data.loop_triangles
+        vertex_indices = empty(len(loop_triangles) * 3, dtype=int32)
+        loop_triangles.foreach_get("vertices", vertex_indices)
+        triangles = coords[vertex_indices].reshape(-1, 3, 3)
+
+        bounds = _get_bounds_of_points(coords)
+        _mesh_triangle_cache[key] = fingerprint, triangles, bounds
+        return triangles, bounds
+
     def _get_plane_from_mesh(self) -> Optional[Plane]:
         """Returns a plane that is an infinite expansion of the first face of the
         mesh associated to this light effect, or `None` if the light effect has
@@ -1098,20 +1137,22 @@ class LightEffect(PropertyGroup):
                     # probably all-zero normal vector
                     pass
 
-    def _get_spatial_effect_predicate(self) -> Optional[Callable[[Coordinate3D], bool]]:
-        if self.target == "INSIDE_MESH":
-            bvh_tree = self._get_bvh_tree_from_mesh()
-            func = partial(test_containment, bvh_tree)
-        elif self.target == "FRONT_SIDE":
-            plane = self._get_plane_from_mesh()
-            func = partial(test_is_in_front_of, plane)
-        else:
-            func = None
+    def _test_containment_of_points(self, coords: NDArray) -> NDArray:
+        """Tests which of the given points are _probably_ inside the mesh
+        associated to this light effect, casting the rays against the cached
+        triangles of the mesh for all the points at once.
 
-        if self.invert_target:
-            func = negate(func or _always_true)
+        Parameters:
+            coords: the points to test, as an array of shape ``(N, 3)``
 
-        return func
+        Returns:
+            boolean array that tells which points are within the mesh; all
+            `True` if the light effect has no associated mesh
+        """
+        triangles, bounds = self._get_triangles_from_mesh()
+        if triangles is None:
+            return ones(len(coords), dtype=bool)
+        return test_containment_of_points_in_triangles(triangles, coords, bounds)
 
     def _create_texture(self) -> ImageTexture:
         """Creates the texture associated to the light effect."""
@@ -1140,6 +1181,43 @@ class LightEffect(PropertyGroup):
         remove_if_unused(self.texture, from_=bpy.data.textures)
 
 
+def _get_bounds_of_points(coords: NDArray) -> Optional[NDArray]:
+    """Returns the bounding box of the given points as an array of shape
+    ``(2, 3)``, inflated a bit to account for rounding errors, or `None` if
+    there are no points.
+    """
+    if not len(coords):
+        return None
+
+    bounds = array([coords.min(axis=0), coords.max(axis=0)])
+    bounds += array([[-1e-5], [1e-5]])
+    return bounds
+
+
+def _get_function_reference(function: ColorFunctionProperties) -> tuple[str, str]:
+    """Returns the absolute path of the module and the name of the given custom
+    function for light effect snapshots.
+    """
+    return abspath(function.path), function.name
+
+
+def _is_deformed_over_time(obj: Object) -> bool:
+    """Returns whether the geometry of the given mesh object may change from
+    frame to frame without an edit, i.e. whether it has modifiers or animated
+    shape keys or mesh data. Transformations of the object are not considered
+    here.
+    """
+    if obj.modifiers:
+        return True
+
+    data = cast(Mesh, obj.data)
+    if data.animation_data:
+        return True
+
+    shape_keys = data.shape_keys
+    return shape_keys is not None and shape_keys.animation_data is not None
+
+
 class LightEffectCollection(PropertyGroup, ListMixin):
     """Blender property group representing the list of light effects to apply
     on the drones in the drone show.
@@ -1260,6 +1338,7 @@ class LightEffectCollection(PropertyGroup, ListMixin):
 
         entry.update_from(entry_to_duplicate)
         self.entries.move(len(self.entries) - 1, index + 1)
+        invalidate_interval_indices()
 
         if select:
             self.active_entry_index = index + 1
@@ -1299,14 +1378,62 @@ class LightEffectCollection(PropertyGroup, ListMixin):
 
     def iter_active_effects_in_frame(self, frame: int) -> Iterable[LightEffect]:
         """Iterates over all effects that are active in the given frame."""
-        # TODO(ntamas): use an interval tree if this becomes a performance
-        # bottleneck
-        for entry in self.entries:
-            if entry.enabled and entry.influence > 0 and entry.contains_frame(frame):
+        entries = self.entries
+        for index in self._get_interval_index().query(frame):
+            entry = entries[index]
+            if entry.enabled and entry.influence > 0:
+                yield entry
+
+    def iter_active_effects_in_frame_range(
+        self, start: int, end: int
+    ) -> Iterable[LightEffect]:
+        """Iterates over all effects that are active in at least one frame of
+        the given frame range.
+
+        Parameters:
+            start: the first frame of the range
+            end: the last frame of the range (inclusive)
+        """
+        entries = self.entries
+        for index in self._get_interval_index().query_range(start, end + 1):
+            entry = entries[index]
+            if entry.enabled and entry.influence > 0:
                 yield entry
 
+    def _get_interval_index(self) -> IntervalIndex:
+        """Returns the index of the frame intervals of the light effects in
+        this collection, building it if needed.
+        """
+        entries = self.entries
+        num_entries = len(entries)
+
+        frame_starts = empty(num_entries, dtype=int32)
+        entries.foreach_get("frame_start", frame_starts)
+        durations = empty(num_entries, dtype=int32)
+        entries.foreach_get("duration", durations)
+        signature = frame_starts.tobytes() + durations.tobytes()
+
+        key = self.as_pointer()
+        item = _interval_indices.get(key)
+        if item is None or item[0] != signature:
+            index = IntervalIndex(
+                zip(frame_starts.tolist(), (frame_starts + durations).tolist())
+            )
+            item = _interval_indices[key] = signature, index
+
+        return item[1]
+
+    def _on_active_entry_moving_down(self, this_entry, next_entry) -> bool:
+        invalidate_interval_indices()
+        return True
+
+    def _on_active_entry_moving_up(self, this_entry, prev_entry) -> bool:
+        invalidate_interval_indices()
+        return True
+
     def _on_removing_entry(self, entry) -> bool:
         entry._remove_texture()
+        invalidate_interval_indices()
         return True
 
     def update_from_storyboard(self, context: Context) -> None:
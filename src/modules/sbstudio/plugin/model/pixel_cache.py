@@ -1,10 +1,17 @@
+from collections import OrderedDict
 from collections.abc import Mapping
-from typing import Iterator, Sequence
+from numpy import asarray, float32
+from numpy.typing import ArrayLike, NDArray
+from typing import Iterator, Optional
 
 __all__ = ("PixelCache",)
 
 
-class PixelCache(Mapping[str, list[float]]):
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+"""Default size limit of the pixel cache, in bytes."""
+
+
+class PixelCache(Mapping[str, NDArray]):
     """Mapping that associates string keys (e.g. light effect UUIDs) to pixel
     data.
 
@@ -21,55 +28,138 @@ class PixelCache(Mapping[str, list[float]]):
 
     The workaround is to construct a UUID for each light effect and then use
     this cache, keyed by the UUIDs, and cleaning it up periodically.
+
+    Pixels are stored as float32 arrays of shape ``(N, 4)``, one row per
+    pixel. The total size of the cached arrays is kept below a byte limit by
+    evicting the least recently used non-static entries; static entries are
+    never evicted, only cleared explicitly.
     """
 
-    _items: dict[str, tuple[float, ...]]
-    """The cached pixels, keyed by the UUIDs of the light effects."""
+    max_size: int
+    """Maximum total size of the cached pixels, in bytes. The cache may exceed
+    this limit only if the static entries alone do not fit.
+    """
+
+    hits: int = 0
+    """Number of lookups with `get()` that found the requested entry."""
+
+    misses: int = 0
+    """Number of lookups with `get()` that did not find the requested entry."""
+
+    _items: OrderedDict[str, NDArray]
+    """The cached pixels, keyed by the UUIDs of the light effects, in the order
+    of their last use.
+    """
 
     _dynamic_keys: set[str]
     """Set of keys that are not static (i.e. they are invalidated when the
     current frame changes).
     """
 
-    def __init__(self):
-        """Constructor."""
+    _size: int
+    """Total size of the cached pixels, in bytes."""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        """Constructor.
+
+        Args:
+            max_size: maximum total size of the cached pixels, in bytes
+        """
+        self.max_size = max_size
         self._dynamic_keys = set()
-        self._items = {}
+        self._items = OrderedDict()
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached pixels, in bytes."""
+        return self._size
 
-    def add(self, key: str, value: Sequence[float], *, is_static: bool = False):
+    def add(self, key: str, value: ArrayLike, *, is_static: bool = False) -> NDArray:
         """Adds a cached pixel-level representation of an image to the cache
         with the given key.
 
         Args:
             key: the key of the entry to add
-            value: the cached pixel-level representation
+            value: the cached pixel-level representation; it is converted to
+                a float32 array with four columns if needed
             is_static: whether the image is assumed to be static (i.e. the same
                 in every frame). Images not marked as static are invalidated
                 when Blender changes its current frame.
+
+        Returns:
+            the array that was stored in the cache
         """
-        self._items[key] = tuple(value)
+        pixels = asarray(value, dtype=float32).reshape(-1, 4)
+
+        self._discard(key)
+        self._items[key] = pixels
+        self._size += pixels.nbytes
         if is_static:
             self._dynamic_keys.discard(key)
         else:
             self._dynamic_keys.add(key)
 
+        self._evict(keep=key)
+        return pixels
+
     def clear(self):
         """Clears all cached pixel-level representations of images."""
         self._items.clear()
+        self._dynamic_keys.clear()
+        self._size = 0
 
     def clear_dynamic(self):
         """Removes all cached pixel-level representations of images that are
         not static (i.e. they change when the current frame changes).
         """
         for key in self._dynamic_keys:
-            del self._items[key]
+            self._size -= self._items.pop(key).nbytes
         self._dynamic_keys.clear()
 
+    def get(self, key: str, default: Optional[NDArray] = None) -> Optional[NDArray]:
+        """Returns the cached pixels with the given key and marks the entry as
+        recently used, or returns the default value if there is no such entry.
+
+        Lookups with this method are counted in the hit / miss statistics of
+        the cache.
+        """
+        pixels = self._items.get(key)
+        if pixels is None:
+            self.misses += 1
+            return default
+        else:
+            self.hits += 1
+            self._items.move_to_end(key)
+            return pixels
+
     def remove(self, key: str) -> None:
-        del self._items[key]
+        self._size -= self._items.pop(key).nbytes
         self._dynamic_keys.discard(key)
 
-    def __getitem__(self, key: str) -> Sequence[float]:
+    def reset_stats(self) -> None:
+        """Resets the hit / miss statistics of the cache."""
+        self.hits = self.misses = 0
+
+    def _discard(self, key: str) -> None:
+        """Removes the entry with the given key if it exists."""
+        if key in self._items:
+            self.remove(key)
+
+    def _evict(self, keep: str) -> None:
+        """Evicts the least recently used non-static entries until the cache
+        fits its size limit again, except the entry with the given key.
+        """
+        if self._size <= self.max_size:
+            return
+
+        for key in list(self._items):
+            if key in self._dynamic_keys and key != keep:
+                self.remove(key)
+                if self._size <= self.max_size:
+                    break
+
+    def __getitem__(self, key: str) -> NDArray:
         return self._items[key]
 
     def __iter__(self) -> Iterator[str]:
@@ -77,5 +167,3 @@ class PixelCache(Mapping[str, list[float]]):
 
     def __len__(self) -> int:
         return len(self._items)
-
-    # TODO(ntamas): periodical cleanup!
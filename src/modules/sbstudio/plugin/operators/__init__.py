@@ -7,6 +7,10 @@ from .add_markers_from_zipped_csv import AddMarkersFromZippedCSVOperator
 from .add_markers_from_zipped_dss import AddMarkersFromZippedDSSOperator
 from .append_formation_to_storyboard import AppendFormationToStoryboardOperator
 from .apply_color import ApplyColorsToSelectedDronesOperator
+from .bake_light_effects import (
+    BakeLightEffectsOperator,
+    ClearLightEffectBakeOperator,
+)
 from .create_formation import CreateFormationOperator
 from .create_light_effect import CreateLightEffectOperator
 from .create_new_schedule_override_entry import CreateNewScheduleOverrideEntryOperator
@@ -22,6 +26,7 @@ from .export_to_dss import DSSPathExportOperator, DSSPath3ExportOperator
 from .export_to_evsky import EVSKYExportOperator
 from .export_to_drotek import DrotekExportOperator
 from .export_to_litebee import LitebeeExportOperator
+from .export_to_multiple_formats import SkybrushBatchExportOperator
 from .export_to_skyc import SkybrushExportOperator
 from .export_to_skyc_and_pdf import SkybrushSKYCAndPDFExportOperator
 from .export_to_vviz import VVIZExportOperator
@@ -79,6 +84,8 @@ __all__ = (
     "AddMarkersFromZippedDSSOperator",
     "AppendFormationToStoryboardOperator",
     "ApplyColorsToSelectedDronesOperator",
+    "BakeLightEffectsOperator",
+    "ClearLightEffectBakeOperator",
     "CreateFormationOperator",
     "CreateLightEffectOperator",
     "CreateNewScheduleOverrideEntryOperator",
@@ -120,6 +127,7 @@ __all__ = (
     "SetStoryboardEntryEndFrameOperator",
     "SetStoryboardEntryStartFrameOperator",
     "SetServerURLOperator",
+    "SkybrushBatchExportOperator",
     "SkybrushCSVExportOperator",
     "SkybrushExportOperator",
     "SkybrushPDFExportOperator",
@@ -0,0 +1,60 @@
+from bpy.props import BoolProperty
+
+from sbstudio.plugin.utils.light_effect_bake import (
+    bake_light_effects,
+    clear_light_effect_bake,
+    has_light_effect_bake,
+)
+
+from .base import LightEffectOperator
+
+__all__ = ("BakeLightEffectsOperator", "ClearLightEffectBakeOperator")
+
+
+class BakeLightEffectsOperator(LightEffectOperator):
+    """Blender operator that bakes the colors produced by the light effects
+    in the frame range of the scene.
+    """
+
+    bl_idname = "skybrush.bake_light_effects"
+    bl_label = "Bake Light Effects"
+    bl_description = (
+        "Evaluates the light effects in every frame of the scene and stores the "
+        "resulting colors so scrubbing and exporting the show can use them "
+        "directly. Only outdated frames are evaluated again"
+    )
+
+    use_multiprocessing = BoolProperty(
+        name="Use multiprocessing",
+        description=(
+            "Evaluate the light effects in parallel in worker processes, "
+            "using all the CPU cores"
+        ),
+        default=True,
+    )
+
+    def execute_on_light_effect_collection(self, light_effects, context):
+        bake = bake_light_effects(
+            max_workers=None if self.use_multiprocessing else 1, context=context
+        )
+        self.report(
+            {"INFO"},
+            f"Baked {len(bake.valid)} frames of {len(bake.names)} drones",
+        )
+        return {"FINISHED"}
+
+
+class ClearLightEffectBakeOperator(LightEffectOperator):
+    """Blender operator that removes the baked colors of the light effects."""
+
+    bl_idname = "skybrush.clear_light_effect_bake"
+    bl_label = "Clear Light Effect Bake"
+    bl_description = "Removes the baked colors of the light effects"
+
+    @classmethod
+    def poll(cls, context):
+        return LightEffectOperator.poll(context) and has_light_effect_bake()
+
+    def execute_on_light_effect_collection(self, light_effects, context):
+        clear_light_effect_bake()
+        return {"FINISHED"}
@@ -22,7 +22,10 @@ from sbstudio.plugin.actions import (
     ensure_action_exists_for_object,
     find_f_curve_for_data_path_and_index,
 )
-from sbstudio.plugin.errors import StoryboardValidationError
+from sbstudio.plugin.errors import (
+    SkybrushStudioExportWarning,
+    StoryboardValidationError,
+)
 from sbstudio.plugin.model.formation import (
     add_points_to_formation,
     get_markers_from_formation,
@@ -128,7 +131,8 @@ class StoryboardEntryOperator(Operator):
 
 class ExportOperator(Operator, ExportHelper):
     """Operator mixin for operators that export the scene in some format using
-    the Skybrush Studio API.
+    the Skybrush Studio API, or locally for formats that do not need the
+    server.
     """
 
     # whether to output all objects or only selected ones
@@ -170,7 +174,7 @@ class ExportOperator(Operator, ExportHelper):
 
     def execute(self, context: Context):
         from sbstudio.plugin.api import call_api_from_blender_operator
-        from .utils import export_show_to_file_using_api
+        from .utils import export_show_to_file_using_api, is_rendered_locally
 
         filepath = bpy.path.ensure_ext(self.filepath, self.filename_ext)
 
@@ -185,15 +189,33 @@ class ExportOperator(Operator, ExportHelper):
             **self.get_settings(),
         }
 
-        try:
-            with call_api_from_blender_operator(self, self.get_operator_name()) as api:
-                export_show_to_file_using_api(
-                    api, context, settings, filepath, self.get_format()
+        format = self.get_format()
+        if is_rendered_locally(format):
+            try:
+                report = export_show_to_file_using_api(
+                    None, context, settings, filepath, format
                 )
-        except Exception:
-            return {"CANCELLED"}
+            except SkybrushStudioExportWarning as ex:
+                self.report({"WARNING"}, str(ex))
+                return {"CANCELLED"}
+            except Exception as ex:
+                log.exception(f"Unhandled exception in {self.get_operator_name()}")
+                self.report(
+                    {"ERROR"}, f"Error while running {self.get_operator_name()}: {ex}"
+                )
+                return {"CANCELLED"}
+        else:
+            try:
+                with call_api_from_blender_operator(
+                    self, self.get_operator_name()
+                ) as api:
+                    report = export_show_to_file_using_api(
+                        api, context, settings, filepath, format
+                    )
+            except Exception:
+                return {"CANCELLED"}
 
-        self.report({"INFO"}, "Export successful")
+        self.report({"INFO"}, f"Export successful: {report.format()}")
         return {"FINISHED"}
 
     def get_format(self) -> FileFormat:
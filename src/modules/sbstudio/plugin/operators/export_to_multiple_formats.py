@@ -0,0 +1,267 @@
+import bpy
+import logging
+import os
+
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty
+from bpy.types import Context
+from pathlib import Path
+from typing import Any
+
+from sbstudio.model.file_formats import FileFormat
+from sbstudio.plugin.errors import SkybrushStudioExportWarning
+from sbstudio.plugin.constants import DEFAULT_TRAJECTORY_TOLERANCE
+
+from .base import ExportOperator
+
+__all__ = ("SkybrushBatchExportOperator",)
+
+
+log = logging.getLogger(__name__)
+
+
+_EXTENSIONS: dict[FileFormat, str] = {
+    FileFormat.SKYC: ".skyc",
+    FileFormat.CSV: ".zip",
+    FileFormat.PDF: ".pdf",
+    FileFormat.DSS: ".zip",
+    FileFormat.DSS3: ".zip",
+    FileFormat.DAC: ".zip",
+    FileFormat.DROTEK: ".json",
+    FileFormat.EVSKY: ".zip",
+    FileFormat.LITEBEE: ".bin",
+    FileFormat.DDSF: ".ddsf",
+    FileFormat.VVIZ: ".vviz",
+}
+"""File extensions of the formats that the batch exporter can produce."""
+
+
+#############################################################################
+# Operator that allows the user to export the show into multiple formats
+#############################################################################
+
+
+class SkybrushBatchExportOperator(ExportOperator):
+    """Export object trajectories and light animation into multiple formats at
+    once, sampling the show only once.
+
+    The operator also works in background mode, e.g.::
+
+        blender -b show.blend --python-expr "import bpy; bpy.ops.export_scene.skybrush_batch(filepath='/tmp/show', formats={'SKYC', 'CSV', 'PDF'})"
+
+    The file path is used as a common stem for the output files; each format
+    gets its own extension. Formats that share the same extension get the name
+    of the format appended to the stem as well (e.g., ``show_csv.zip``).
+    """
+
+    bl_idname = "export_scene.skybrush_batch"
+    bl_label = "Export to Multiple Formats"
+    bl_options = {"REGISTER"}
+
+    # The extension depends on the formats; the file path is only a stem
+    filename_ext = ""
+    check_extension = None
+
+    # the formats to export into
+    formats = EnumProperty(
+        name="Formats",
+        items=[
+            (FileFormat.SKYC.name, "Skybrush .skyc", "Skybrush compiled show"),
+            (FileFormat.CSV.name, "Skybrush .csv", "Zipped Skybrush CSV files"),
+            (FileFormat.PDF.name, "Validation .pdf", "Validation plots"),
+            (FileFormat.DSS.name, "DSS PATH", "DSS PATH format"),
+            (FileFormat.DSS3.name, "DSS PATH3", "DSS PATH3 format"),
+            (FileFormat.DAC.name, "HG .dac", "HG .dac format"),
+            (FileFormat.DROTEK.name, "Drotek .json", "Drotek format"),
+            (FileFormat.EVSKY.name, "EVSKY .essp", "EVSKY format"),
+            (FileFormat.LITEBEE.name, "Litebee .bin", "Litebee format"),
+            (FileFormat.DDSF.name, "Depence .ddsf", "Depence format"),
+            (FileFormat.VVIZ.name, "Finale 3D .vviz", "Finale 3D format"),
+        ],
+        options={"ENUM_FLAG"},
+        default={FileFormat.SKYC.name},
+        description="The formats to export the show into",
+    )
+
+    # output trajectory frame rate
+    output_fps = IntProperty(
+        name="Trajectory FPS",
+        default=4,
+        description="Number of samples to take from trajectories per second",
+    )
+
+    # output light program frame rate
+    light_output_fps = IntProperty(
+        name="Light FPS",
+        default=4,
+        description="Number of samples to take from light programs per second",
+    )
+
+    # spatial tolerance of trajectory simplification
+    trajectory_tolerance = FloatProperty(
+        name="Trajectory tolerance",
+        default=DEFAULT_TRAJECTORY_TOLERANCE,
+        min=0.0,
+        soft_max=0.1,
+        unit="LENGTH",
+        description=(
+            "Maximum allowed deviation of the exported trajectories from the "
+            "sampled ones. Samples that can be interpolated from their "
+            "neighbors within this tolerance are omitted. Zero keeps every "
+            "sample that differs from its neighbors"
+        ),
+    )
+
+    # compact trajectory encoding enable/disable
+    use_compact_trajectories = BoolProperty(
+        name="Compact trajectories",
+        description=(
+            "Send trajectories to the server quantized to 1 mm and delta-encoded, "
+            "which makes the upload several times smaller. Requires a recent server"
+        ),
+        default=False,
+    )
+
+    # pyro control enable/disable
+    use_pyro_control = BoolProperty(
+        name="Export pyro (PRO)",
+        description="Specifies whether the pyro program of each drone should be included in the show",
+        default=False,
+    )
+
+    # yaw control enable/disable
+    use_yaw_control = BoolProperty(
+        name="Export yaw (PRO)",
+        description="Specifies whether the yaw angle of each drone should be controlled during the show",
+        default=False,
+    )
+
+    # camera export enable/disable
+    export_cameras = BoolProperty(
+        name="Export cameras",
+        description="Specifies whether cameras defined in Blender should be exported into the show file",
+        default=False,
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = True
+
+        layout.prop(self, "formats")
+
+        layout.separator()
+
+        layout.prop(self, "export_selected")
+        layout.prop(self, "frame_range")
+        layout.prop(self, "redraw")
+        layout.prop(self, "output_fps")
+        layout.prop(self, "light_output_fps")
+        layout.prop(self, "trajectory_tolerance")
+        layout.prop(self, "use_compact_trajectories")
+
+        layout.separator()
+
+        column = layout.column(align=True)
+        column.prop(self, "export_cameras")
+        column.prop(self, "use_pyro_control")
+        column.prop(self, "use_yaw_control")
+
+    def execute(self, context: Context):
+        from sbstudio.plugin.api import call_api_from_blender_operator
+        from .utils import export_show_to_files_using_api, is_rendered_locally
+
+        formats = [format for format in _EXTENSIONS if format.name in set(self.formats)]
+        if not formats:
+            self.report({"ERROR_INVALID_INPUT"}, "No formats were selected")
+            return {"CANCELLED"}
+
+        stem = self._get_filepath_stem()
+        if not os.path.basename(stem):
+            self.report({"ERROR_INVALID_INPUT"}, "Filename must not be empty")
+            return {"CANCELLED"}
+
+        targets = _get_targets(stem, formats)
+        settings = {
+            "export_selected": self.export_selected,
+            "frame_range": self.frame_range,
+            "redraw": self._get_redraw_setting(),
+            **self.get_settings(),
+        }
+
+        if all(is_rendered_locally(format) for format in formats):
+            try:
+                reports = export_show_to_files_using_api(
+                    None, context, settings, targets
+                )
+            except SkybrushStudioExportWarning as ex:
+                self.report({"WARNING"}, str(ex))
+                return {"CANCELLED"}
+            except Exception as ex:
+                log.exception(f"Unhandled exception in {self.get_operator_name()}")
+                self.report(
+                    {"ERROR"}, f"Error while running {self.get_operator_name()}: {ex}"
+                )
+                return {"CANCELLED"}
+        else:
+            try:
+                with call_api_from_blender_operator(
+                    self, self.get_operator_name()
+                ) as api:
+                    reports = export_show_to_files_using_api(
+                        api, context, settings, targets
+                    )
+            except Exception:
+                return {"CANCELLED"}
+
+        for (filepath, _), report in zip(targets, reports):
+            log.info(f"Exported {filepath}: {report.format()}")
+
+        self.report({"INFO"}, f"Export successful: {len(targets)} files written")
+        return {"FINISHED"}
+
+    def get_operator_name(self) -> str:
+        return "batch exporter"
+
+    def get_settings(self) -> dict[str, Any]:
+        return {
+            "output_fps": self.output_fps,
+            "light_output_fps": self.light_output_fps,
+            "trajectory_tolerance": self.trajectory_tolerance,
+            "trajectory_version": 3 if self.use_compact_trajectories else 2,
+            "use_pyro_control": self.use_pyro_control,
+            "use_yaw_control": self.use_yaw_control,
+            "export_cameras": self.export_cameras,
+        }
+
+    def invoke(self, context: Context, event):
+        if not self.filepath:
+            filepath = bpy.data.filepath or "Untitled"
+            self.filepath, _ = os.path.splitext(filepath)
+
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def _get_filepath_stem(self) -> str:
+        """Returns the file path selected by the user without the extension
+        of any of the supported formats.
+        """
+        filepath = bpy.path.abspath(self.filepath)
+        stem, ext = os.path.splitext(filepath)
+        return stem if ext.lower() in _EXTENSIONS.values() else filepath
+
+
+def _get_targets(stem: str, formats: list[FileFormat]) -> list[tuple[Path, FileFormat]]:
+    """Returns the output paths of the given formats when exporting with the
+    given common file path stem.
+    """
+    extensions = [_EXTENSIONS[format] for format in formats]
+    return [
+        (
+            Path(
+                f"{stem}{ext}"
+                if extensions.count(ext) == 1
+                else f"{stem}_{format.value}{ext}"
+            ),
+            format,
+        )
+        for format, ext in zip(formats, extensions)
+    ]
@@ -1,8 +1,9 @@
 from typing import Any
 
-from bpy.props import BoolProperty, IntProperty, StringProperty
+from bpy.props import BoolProperty, FloatProperty, IntProperty, StringProperty
 
 from sbstudio.model.file_formats import FileFormat
+from sbstudio.plugin.constants import DEFAULT_TRAJECTORY_TOLERANCE
 
 from .base import ExportOperator
 
@@ -39,6 +40,31 @@ class SkybrushExportOperator(ExportOperator):
         description="Number of samples to take from light programs per second",
     )
 
+    # spatial tolerance of trajectory simplification
+    trajectory_tolerance = FloatProperty(
+        name="Trajectory tolerance",
+        default=DEFAULT_TRAJECTORY_TOLERANCE,
+        min=0.0,
+        soft_max=0.1,
+        unit="LENGTH",
+        description=(
+            "Maximum allowed deviation of the exported trajectories from the "
+            "sampled ones. Samples that can be interpolated from their "
+            "neighbors within this tolerance are omitted. Zero keeps every "
+            "sample that differs from its neighbors"
+        ),
+    )
+
+    # compact trajectory encoding enable/disable
+    use_compact_trajectories = BoolProperty(
+        name="Compact trajectories",
+        description=(
+            "Send trajectories to the server quantized to 1 mm and delta-encoded, "
+            "which makes the upload several times smaller. Requires a recent server"
+        ),
+        default=False,
+    )
+
     # pyro control enable/disable
     use_pyro_control = BoolProperty(
         name="Export pyro (PRO)",
@@ -69,6 +95,8 @@ class SkybrushExportOperator(ExportOperator):
         layout.prop(self, "redraw")
         layout.prop(self, "output_fps")
         layout.prop(self, "light_output_fps")
+        layout.prop(self, "trajectory_tolerance")
+        layout.prop(self, "use_compact_trajectories")
 
         layout.separator()
 
@@ -87,6 +115,8 @@ class SkybrushExportOperator(ExportOperator):
         return {
             "output_fps": self.output_fps,
             "light_output_fps": self.light_output_fps,
+            "trajectory_tolerance": self.trajectory_tolerance,
+            "trajectory_version": 3 if self.use_compact_trajectories else 2,
             "use_pyro_control": self.use_pyro_control,
             "use_yaw_control": self.use_yaw_control,
             "export_cameras": self.export_cameras,
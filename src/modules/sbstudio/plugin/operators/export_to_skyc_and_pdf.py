@@ -1,8 +1,9 @@
 from typing import Any
 
-from bpy.props import BoolProperty, IntProperty, StringProperty
+from bpy.props import BoolProperty, FloatProperty, IntProperty, StringProperty
 
 from sbstudio.model.file_formats import FileFormat
+from sbstudio.plugin.constants import DEFAULT_TRAJECTORY_TOLERANCE
 
 from .base import ExportOperator
 
@@ -40,6 +41,21 @@ class SkybrushSKYCAndPDFExportOperator(ExportOperator):
         description="Number of samples to take from light programs per second",
     )
 
+    # spatial tolerance of trajectory simplification
+    trajectory_tolerance = FloatProperty(
+        name="Trajectory tolerance",
+        default=DEFAULT_TRAJECTORY_TOLERANCE,
+        min=0.0,
+        soft_max=0.1,
+        unit="LENGTH",
+        description=(
+            "Maximum allowed deviation of the exported trajectories from the "
+            "sampled ones. Samples that can be interpolated from their "
+            "neighbors within this tolerance are omitted. Zero keeps every "
+            "sample that differs from its neighbors"
+        ),
+    )
+
     use_pyro_control = BoolProperty(
         name="Export pyro (PRO)",
         description="Specifies whether the pyro program of each drone should be included in the show",
@@ -116,6 +132,7 @@ class SkybrushSKYCAndPDFExportOperator(ExportOperator):
         layout.prop(self, "redraw")
         layout.prop(self, "output_fps")
         layout.prop(self, "light_output_fps")
+        layout.prop(self, "trajectory_tolerance")
 
         column = layout.column(align=True)
         column.label(text="SKYC export features:")
@@ -152,6 +169,7 @@ class SkybrushSKYCAndPDFExportOperator(ExportOperator):
         return {
             "output_fps": self.output_fps,
             "light_output_fps": self.light_output_fps,
+            "trajectory_tolerance": self.trajectory_tolerance,
             "use_pyro_control": self.use_pyro_control,
             "use_yaw_control": self.use_yaw_control,
             "export_cameras": self.export_cameras,
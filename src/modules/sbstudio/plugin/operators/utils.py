@@ -5,18 +5,26 @@ import logging
 from bpy.path import basename
 from bpy.types import Context
 
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from itertools import groupby
 from math import degrees
 from natsort import natsorted
 from operator import attrgetter
 from pathlib import Path
-from typing import Any, Callable, Optional, cast
+from time import perf_counter
+from typing import Any, Callable, Optional, Sequence, cast
 
 from sbstudio.api.base import SkybrushStudioAPI
+from sbstudio.csv_export import render_csv_zip
+from sbstudio.model.cameras import Camera
+from sbstudio.model.export_report import ExportReport
 from sbstudio.model.file_formats import FileFormat
 from sbstudio.model.light_program import LightProgram
 from sbstudio.model.location import ShowLocation
+from sbstudio.model.pyro_markers import PyroMarkers
 from sbstudio.model.safety_check import SafetyCheckParams
+from sbstudio.model.time_markers import TimeMarkers
 from sbstudio.model.trajectory import Trajectory
 from sbstudio.model.yaw import YawSetpointList
 from sbstudio.plugin.model.storyboard import (
@@ -27,27 +35,26 @@ from sbstudio.plugin.model.storyboard import (
 from sbstudio.plugin.constants import Collections
 from sbstudio.plugin.errors import SkybrushStudioExportWarning
 from sbstudio.plugin.props.frame_range import resolve_frame_range
-from sbstudio.plugin.tasks.light_effects import suspended_light_effects
 from sbstudio.plugin.tasks.safety_check import suspended_safety_checks
 from sbstudio.plugin.utils import with_context
 from sbstudio.plugin.utils.cameras import get_cameras_from_context
 from sbstudio.plugin.utils.gps_coordinates import parse_latitude, parse_longitude
 from sbstudio.plugin.utils.progress import FrameProgressReport
 from sbstudio.plugin.utils.pyro_markers import get_pyro_markers_of_object
-from sbstudio.plugin.utils.sampling import (
-    frame_range,
-    sample_colors_of_objects,
-    sample_positions_of_objects,
-    sample_positions_and_colors_of_objects,
-    sample_positions_and_yaw_of_objects,
-    sample_positions_colors_and_yaw_of_objects,
+from sbstudio.plugin.utils.sample_cache import (
+    ExportSampleCache,
+    get_export_sample_cache,
+    sample_show_into_buffers,
 )
+from sbstudio.plugin.utils.sampling import frame_range
 from sbstudio.plugin.utils.time_markers import get_time_markers_from_context
 from sbstudio.utils import get_ends
 
 __all__ = (
     "get_drones_to_export",
     "export_show_to_file_using_api",
+    "export_show_to_files_using_api",
+    "is_rendered_locally",
 )
 
 
@@ -58,6 +65,10 @@ class _default_settings:
     output_fps: int = 4
     light_output_fps: int = 4
     redraw: Optional[bool] = None
+    use_sample_cache: bool = True
+    trajectory_tolerance: Optional[float] = None
+    trajectory_version: int = 2
+    save_export_report: bool = True
 
 
 ################################################################################
@@ -158,6 +169,14 @@ def _get_segments(context: Optional[Context] = None) -> dict[str, tuple[float, f
     return result
 
 
+def _get_sample_cache(settings: dict[str, Any]) -> Optional[ExportSampleCache]:
+    """Returns the sample cache to use for the export with the given settings,
+    or `None` if the show should be sampled without caching.
+    """
+    use_cache = settings.get("use_sample_cache", _default_settings.use_sample_cache)
+    return get_export_sample_cache() if use_cache else None
+
+
 @with_context
 def _get_trajectories_and_lights(
     drones,
@@ -166,6 +185,7 @@ def _get_trajectories_and_lights(
     *,
     context: Optional[Context] = None,
     progress: Optional[Callable[[FrameProgressReport], None]] = None,
+    report: Optional[ExportReport] = None,
 ) -> tuple[dict[str, Trajectory], dict[str, LightProgram]]:
     """Get trajectories and LED lights of all selected/picked objects.
 
@@ -174,6 +194,8 @@ def _get_trajectories_and_lights(
         drones: the list of drones to export
         settings: export settings
         bounds: the frame range used for exporting
+        report: optional report where the time spent in sampling and
+            simplification should be recorded
 
     Returns:
         dictionary of Trajectory and LightProgram objects indexed by object names
@@ -181,83 +203,61 @@ def _get_trajectories_and_lights(
     trajectory_fps = settings.get("output_fps", _default_settings.output_fps)
     light_fps = settings.get("light_output_fps", _default_settings.light_output_fps)
     redraw = settings.get("redraw", _default_settings.redraw)
+    tolerance = (
+        settings.get("trajectory_tolerance", _default_settings.trajectory_tolerance)
+        or None
+    )
 
     if redraw is None:
-        # Redraw the scene if we have at least one video-based light effect but
-        # do not redraw otherwise
+        # Redraw the scene if we have at least one video-based light effect
+        # in the exported range whose frames cannot be read from disk but do
+        # not redraw otherwise
         assert context is not None
+        light_effects = context.scene.skybrush.light_effects
         redraw = any(
-            effect.is_animated
-            for effect in context.scene.skybrush.light_effects.entries
+            effect.needs_redraw
+            for effect in light_effects.iter_active_effects_in_frame_range(*bounds)
         )
 
-    trajectories: dict[str, Trajectory]
-    lights: dict[str, LightProgram]
+    if report is None:
+        report = ExportReport()
 
-    if trajectory_fps == light_fps:
-        # This is easy, we can iterate over the show once
-        range = frame_range(
-            bounds[0],
-            bounds[1],
-            fps=trajectory_fps,
-            context=context,
-            operation="Sampling trajectories and lights",
-            progress=progress,
-        )
+    position_frames = list(
+        frame_range(bounds[0], bounds[1], fps=trajectory_fps, context=context)
+    )
+    color_frames = list(
+        frame_range(bounds[0], bounds[1], fps=light_fps, context=context)
+    )
+    num_frames = len(set(position_frames).union(color_frames))
+
+    with report.measure("sampling", objects=len(drones), frames=num_frames):
         with suspended_safety_checks():
-            result = sample_positions_and_colors_of_objects(
+            position_samples, color_samples = sample_show_into_buffers(
                 drones,
-                range,
-                context=context,
-                by_name=True,
+                position_frames,
+                color_frames,
                 redraw=redraw,
-                simplify=True,
-            )
-
-        trajectories = {}
-        lights = {}
-
-        for key, (trajectory, light_program) in result.items():
-            trajectories[key] = trajectory
-            lights[key] = light_program
-
-    else:
-        # We need to iterate over the show twice, once for the trajectories,
-        # once for the lights
-        with suspended_safety_checks():
-            range = frame_range(
-                bounds[0],
-                bounds[1],
-                fps=trajectory_fps,
+                cache=_get_sample_cache(settings),
                 context=context,
-                operation="Sampling trajectories",
+                operation="Sampling trajectories and lights",
                 progress=progress,
             )
-            with suspended_light_effects():
-                trajectories = sample_positions_of_objects(
-                    drones,
-                    range,
-                    context=context,
-                    by_name=True,
-                    simplify=True,
-                )
 
-            range = frame_range(
-                bounds[0],
-                bounds[1],
-                fps=light_fps,
-                context=context,
-                operation="Sampling lights",
-                progress=progress,
-            )
-            lights = sample_colors_of_objects(
-                drones,
-                range,
-                context=context,
-                by_name=True,
-                redraw=redraw,
-                simplify=True,
+    with report.measure(
+        "simplification",
+        objects=len(drones),
+        frames=len(position_samples) + len(color_samples),
+    ):
+        trajectories = {
+            drone.name: position_samples.trajectory_of(
+                index, simplify=True, tolerance=tolerance
             )
+            for index, drone in enumerate(drones)
+        }
+        lights = {
+            drone.name: color_samples.light_program_of(index, simplify=True)
+            for index, drone in enumerate(drones)
+        }
 
     return trajectories, lights
 
@@ -270,6 +270,7 @@ def _get_trajectories_lights_and_yaw_setpoints(
     *,
     context: Optional[Context] = None,
     progress: Optional[Callable[[FrameProgressReport], None]] = None,
+    report: Optional[ExportReport] = None,
 ) -> tuple[dict[str, Trajectory], dict[str, LightProgram], dict[str, YawSetpointList]]:
     """Get trajectories, LED lights and yaw setpoints of all selected/picked objects.
 
@@ -278,6 +279,8 @@ def _get_trajectories_lights_and_yaw_setpoints(
         drones: the list of drones to export
         settings: export settings
         bounds: the frame range used for exporting
+        report: optional report where the time spent in sampling and
+            simplification should be recorded
 
     Returns:
         dictionary of Trajectory, LightProgram and YawSetpointList objects indexed by object names
@@ -285,120 +288,109 @@ def _get_trajectories_lights_and_yaw_setpoints(
     trajectory_fps = settings.get("output_fps", _default_settings.output_fps)
     light_fps = settings.get("light_output_fps", _default_settings.light_output_fps)
     redraw = settings.get("redraw", _default_settings.redraw)
+    tolerance = (
+        settings.get("trajectory_tolerance", _default_settings.trajectory_tolerance)
+        or None
+    )
 
     if redraw is None:
-        # Redraw the scene if we have at least one video-based light effect but
-        # do not redraw otherwise
+        # Redraw the scene if we have at least one video-based light effect
+        # in the exported range whose frames cannot be read from disk but do
+        # not redraw otherwise
         assert context is not None
+        light_effects = context.scene.skybrush.light_effects
         redraw = any(
-            effect.is_animated
-            for effect in context.scene.skybrush.light_effects.entries
+            effect.needs_redraw
+            for effect in light_effects.iter_active_effects_in_frame_range(*bounds)
         )
 
-    trajectories: dict[str, Trajectory]
-    lights: dict[str, LightProgram]
-    yaw_setpoints: dict[str, YawSetpointList]
+    if report is None:
+        report = ExportReport()
 
-    if trajectory_fps == light_fps:
-        # This is easy, we can iterate over the show once
+    position_frames = list(
+        frame_range(bounds[0], bounds[1], fps=trajectory_fps, context=context)
+    )
+    color_frames = list(
+        frame_range(bounds[0], bounds[1], fps=light_fps, context=context)
+    )
+    num_frames = len(set(position_frames).union(color_frames))
+
+    with report.measure("sampling", objects=len(drones), frames=num_frames):
         with suspended_safety_checks():
-            range = frame_range(
-                bounds[0],
-                bounds[1],
-                fps=trajectory_fps,
-                context=context,
-                operation="Sampling trajectories, lights and yaw setpoints",
-                progress=progress,
-            )
-            result = sample_positions_colors_and_yaw_of_objects(
+            position_samples, color_samples = sample_show_into_buffers(
                 drones,
-                range,
-                context=context,
-                by_name=True,
+                position_frames,
+                color_frames,
+                yaw=True,
                 redraw=redraw,
-                simplify=True,
-            )
-
-        trajectories = {}
-        lights = {}
-        yaw_setpoints = {}
-
-        for key, (trajectory, light_program, yaw_curve) in result.items():
-            trajectories[key] = trajectory
-            lights[key] = light_program
-            yaw_setpoints[key] = yaw_curve
-
-    else:
-        # We need to iterate over the show twice, once for the trajectories
-        # and yaw setpoints, once for the lights
-        with suspended_safety_checks():
-            range = frame_range(
-                bounds[0],
-                bounds[1],
-                fps=trajectory_fps,
+                cache=_get_sample_cache(settings),
                 context=context,
-                operation="Sampling trajectories and yaw setpoints",
+                operation="Sampling trajectories, lights and yaw setpoints",
                 progress=progress,
             )
-            with suspended_light_effects():
-                result = sample_positions_and_yaw_of_objects(
-                    drones,
-                    range,
-                    context=context,
-                    by_name=True,
-                    simplify=True,
-                )
-
-                trajectories = {}
-                yaw_setpoints = {}
 
-                for key, (trajectory, yaw_curve) in result.items():
-                    trajectories[key] = trajectory
-                    yaw_setpoints[key] = yaw_curve
-
-            range = frame_range(
-                bounds[0],
-                bounds[1],
-                fps=light_fps,
-                context=context,
-                operation="Sampling lights",
-                progress=progress,
-            )
-            lights = sample_colors_of_objects(
-                drones,
-                range,
-                context=context,
-                by_name=True,
-                redraw=redraw,
-                simplify=True,
+    with report.measure(
+        "simplification",
+        objects=len(drones),
+        frames=len(position_samples) + len(color_samples),
+    ):
+        trajectories = {
+            drone.name: position_samples.trajectory_of(
+                index, simplify=True, tolerance=tolerance
             )
+            for index, drone in enumerate(drones)
+        }
+        lights = {
+            drone.name: color_samples.light_program_of(index, simplify=True)
+            for index, drone in enumerate(drones)
+        }
+        yaw_setpoints = {
+            drone.name: position_samples.yaw_setpoints_of(index, simplify=True)
+            for index, drone in enumerate(drones)
+        }
 
     return trajectories, lights, yaw_setpoints
 
 
+def is_rendered_locally(format: FileFormat) -> bool:
+    """Returns whether the given file format is rendered locally by the
+    add-on, without sending the show to the Skybrush Studio server.
+    """
+    return format is FileFormat.CSV
+
+
 def _show_progress_during_export(progress: FrameProgressReport) -> None:
     print(progress.format())
 
 
 def export_show_to_file_using_api(
-    api: SkybrushStudioAPI,
+    api: Optional[SkybrushStudioAPI],
     context: Context,
     settings: dict[str, Any],
     filepath: Path,
     format: FileFormat,
-) -> None:
+) -> ExportReport:
     """Creates Skybrush-compatible output from Blender trajectories and color
     animation.
 
     This is a helper function for Skybrush export operators.
 
+    The wall-clock time, the throughput and the size of the output of each
+    stage of the export is recorded in a report that is returned to the
+    caller and also saved next to the output file as a JSON file with a
+    ``.report.json`` suffix (unless disabled in the settings).
+
     Parameters:
-        api: the Skybrush Studio API object
+        api: the Skybrush Studio API object; may be `None` for formats that
+            are rendered locally (see `is_rendered_locally()`)
         context: the main Blender context
         settings: export settings dictionary
         filepath: the output path where the export should write
         format: the format that the API should produce
 
+    Returns:
+        the timing report of the export
+
     Raises:
         SkybrushStudioExportWarning: when a local check failed and the export
             operation did not start. These are converted into warnings on the
@@ -409,6 +401,123 @@ def export_show_to_file_using_api(
 
     log.info(f"Exporting show content to {filepath}")
 
+    report = ExportReport()
+    start = perf_counter()
+
+    if api is None and not is_rendered_locally(format):
+        raise RuntimeError(f"Format {format!r} requires the Skybrush Studio API")
+
+    show = _collect_show_for_export(context, settings, report=report)
+    _render_show(api, show, settings, filepath, format, report=report)
+
+    return _finalize_export_report(report, start, settings, filepath)
+
+
+def export_show_to_files_using_api(
+    api: Optional[SkybrushStudioAPI],
+    context: Context,
+    settings: dict[str, Any],
+    targets: Sequence[tuple[Path, FileFormat]],
+    *,
+    max_workers: Optional[int] = None,
+) -> list[ExportReport]:
+    """Exports the show into multiple files and formats at once.
+
+    The show is sampled only once; the sampled trajectories, light programs
+    and other show data are then fed to the renderers of all the requested
+    formats concurrently, in a thread pool. This is a lot faster than
+    exporting the show into each format separately, and it works in
+    background mode as well; see `SkybrushBatchExportOperator` for an example.
+
+    Each output file gets its own timing report, which also contains the
+    stages of the shared sampling step. The reports are saved next to the
+    output files in the same manner as in `export_show_to_file_using_api()`.
+
+    Parameters:
+        api: the Skybrush Studio API object; may be `None` if all the formats
+            are rendered locally (see `is_rendered_locally()`)
+        context: the main Blender context
+        settings: export settings dictionary, shared by all the formats
+        targets: the output paths and the corresponding formats to produce
+        max_workers: maximum number of renderers to run concurrently; `None`
+            lets the thread pool decide
+
+    Returns:
+        the timing reports of the exports, in the same order as the targets
+
+    Raises:
+        SkybrushStudioExportWarning: when a local check failed and the export
+            operation did not start
+        SkybrushStudioAPIError: for server-side export errors. The remaining
+            renderers are allowed to finish before the error is raised.
+    """
+    if not targets:
+        return []
+
+    log.info(f"Exporting show content to {len(targets)} files")
+
+    report = ExportReport()
+    start = perf_counter()
+
+    if api is None:
+        for _, format in targets:
+            if not is_rendered_locally(format):
+                raise RuntimeError(
+                    f"Format {format!r} requires the Skybrush Studio API"
+                )
+
+    show = _collect_show_for_export(context, settings, report=report)
+
+    def render(target: tuple[Path, FileFormat]) -> ExportReport:
+        filepath, format = target
+        target_report = ExportReport(stages=[replace(stage) for stage in report.stages])
+        _render_show(api, show, settings, filepath, format, report=target_report)
+        return _finalize_export_report(target_report, start, settings, filepath)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(render, targets))
+
+
+@dataclass
+class _ShowForExport:
+    """Sampled show data that is needed by the renderers of the export
+    formats, with all the timestamps shifted such that the show starts at
+    zero.
+    """
+
+    trajectories: dict[str, Trajectory]
+    lights: dict[str, LightProgram]
+    yaw_setpoints: Optional[dict[str, YawSetpointList]]
+    pyro_programs: Optional[dict[str, PyroMarkers]]
+    show_type: str
+    show_location: Optional[ShowLocation]
+    show_segments: dict[str, tuple[float, float]]
+    time_markers: TimeMarkers
+    cameras: Optional[list[Camera]]
+    validation: SafetyCheckParams
+
+    fps: int
+    """Frame rate of the scene; frame numbers of pyro programs refer to this."""
+
+
+def _collect_show_for_export(
+    context: Context, settings: dict[str, Any], *, report: ExportReport
+) -> _ShowForExport:
+    """Samples the show and collects all the data from the Blender scene that
+    the renderers of the export formats need.
+
+    This function must be called from the main thread as it accesses the
+    Blender scene.
+
+    Parameters:
+        context: the main Blender context
+        settings: export settings dictionary
+        report: report where the time spent in the individual stages of the
+            sampling should be recorded
+
+    Raises:
+        SkybrushStudioExportWarning: when there is nothing to export
+    """
     # get framerange
     log.info(f"Getting frame range from {settings.get('frame_range')}")
     frame_range = _get_frame_range_from_export_settings(settings, context=context)
@@ -444,6 +553,7 @@ def export_show_to_file_using_api(
             frame_range,
             context=context,
             progress=_show_progress_during_export,
+            report=report,
         )
     else:
         log.info("Getting object trajectories and light programs")
@@ -456,6 +566,7 @@ def export_show_to_file_using_api(
             frame_range,
             context=context,
             progress=_show_progress_during_export,
+            report=report,
         )
         yaw_setpoints = None
 
@@ -469,9 +580,6 @@ def export_show_to_file_using_api(
     else:
         pyro_programs = None
 
-    # get automatic show title
-    show_title = str(basename(filepath).split(".")[0])
-
     # get show type and location
     scene_settings = getattr(context.scene.skybrush, "settings", None)
     show_type = (scene_settings.show_type if scene_settings else "OUTDOOR").lower()
@@ -536,20 +644,80 @@ def export_show_to_file_using_api(
             k: (v[0] + delta, v[1] + delta) for k, v in show_segments.items()
         }
 
+    return _ShowForExport(
+        trajectories=trajectories,
+        lights=lights,
+        yaw_setpoints=yaw_setpoints,
+        pyro_programs=pyro_programs,
+        show_type=show_type,
+        show_location=show_location,
+        show_segments=show_segments,
+        time_markers=time_markers,
+        cameras=cameras,
+        validation=validation,
+        fps=context.scene.render.fps,
+    )
+
+
+def _render_show(
+    api: Optional[SkybrushStudioAPI],
+    show: _ShowForExport,
+    settings: dict[str, Any],
+    filepath: Path,
+    format: FileFormat,
+    *,
+    report: ExportReport,
+) -> None:
+    """Renders a sampled show into the given file and format.
+
+    This function does not access the Blender scene so it is safe to call it
+    from worker threads.
+
+    Parameters:
+        api: the Skybrush Studio API object; may be `None` for formats that
+            are rendered locally
+        show: the sampled show to render
+        settings: export settings dictionary
+        filepath: the output path where the export should write
+        format: the format to produce
+        report: report where the time spent in the individual stages of the
+            rendering should be recorded
+    """
+    # get automatic show title
+    show_title = str(basename(str(filepath)).split(".")[0])
+
     renderer_params = {}
 
+    if is_rendered_locally(format):
+        # Skybrush CSV files are plain resampled trajectories and light programs;
+        # no need to send the show to the server for that
+        log.info("Exporting show to Skybrush .csv format")
+        with report.measure("rendering", objects=len(show.trajectories)) as stage:
+            render_csv_zip(
+                Path(filepath),
+                trajectories=show.trajectories,
+                lights=show.lights,
+                fps=settings["output_fps"],
+            )
+            stage.bytes = Path(filepath).stat().st_size
+        return
+
+    if api is None:
+        raise RuntimeError(f"Format {format!r} requires the Skybrush Studio API")
+
     # create Skybrush converter object
     if format is FileFormat.PDF:
         log.info("Exporting validation plots to .pdf")
         plots = settings.get("plots", ["stats", "pos", "vel", "drift", "nn"])
         fps = settings.get("output_fps", _default_settings.output_fps)
         api.generate_plots(
-            trajectories=trajectories,
+            trajectories=show.trajectories,
             output=filepath,
-            validation=validation,
+            validation=show.validation,
             plots=plots,
             fps=fps,
-            time_markers=time_markers,
+            time_markers=show.time_markers,
+            report=report,
         )
     else:
         if format is FileFormat.SKYC:
@@ -564,12 +732,6 @@ def export_show_to_file_using_api(
                 None,
                 {"plots": ",".join(plots), "fps": fps, "single_file": True},
             ]
-        elif format is FileFormat.CSV:
-            log.info("Exporting show to Skybrush .csv format")
-            renderer = "csv"
-            renderer_params = {
-                "fps": settings["output_fps"],
-            }
         elif format is FileFormat.DAC:
             log.info("Exporting show to HG .dac format")
             renderer = "dac"
@@ -623,19 +785,49 @@ def export_show_to_file_using_api(
 
         api.export(
             show_title=show_title,
-            show_type=show_type,
-            show_location=show_location,
-            show_segments=show_segments,
-            validation=validation,
-            trajectories=trajectories,
-            lights=lights,
-            pyro_programs=pyro_programs,
-            yaw_setpoints=yaw_setpoints,
+            show_type=show.show_type,
+            show_location=show.show_location,
+            show_segments=show.show_segments,
+            validation=show.validation,
+            trajectories=show.trajectories,
+            lights=show.lights,
+            pyro_programs=show.pyro_programs,
+            yaw_setpoints=show.yaw_setpoints,
             output=filepath,
-            time_markers=time_markers,
-            cameras=cameras,
+            time_markers=show.time_markers,
+            cameras=show.cameras,
+            pyro_fps=show.fps,
+            trajectory_version=settings.get(
+                "trajectory_version", _default_settings.trajectory_version
+            ),
             renderer=renderer,
             renderer_params=renderer_params,
+            report=report,
         )
 
-    log.info("Export finished")
+
+def _finalize_export_report(
+    report: ExportReport, start: float, settings: dict[str, Any], filepath: Path
+) -> ExportReport:
+    """Adds the total duration of the export to the given report, logs it and
+    saves it next to the exported file if needed.
+
+    Parameters:
+        report: the report of the export
+        start: the value of `perf_counter()` when the export started
+        settings: export settings dictionary
+        filepath: the output path of the export
+
+    Returns:
+        the report itself
+    """
+    report.add("total", perf_counter() - start)
+    log.info(f"Export finished: {report.format()}")
+
+    if settings.get("save_export_report", _default_settings.save_export_report):
+        try:
+            report.save(Path(f"{filepath}.report.json"))
+        except OSError as ex:
+            log.warning(f"Could not save export report: {ex}")
+
+    return report
@@ -10,6 +10,7 @@ from sbstudio.plugin.operators import (
     EVSKYExportOperator,
     LitebeeExportOperator,
     RefreshFileFormatsOperator,
+    SkybrushBatchExportOperator,
     SkybrushExportOperator,
     SkybrushCSVExportOperator,
     SkybrushPDFExportOperator,
@@ -105,6 +106,11 @@ class ExportPanel(Panel):
             layout.separator()
             needs_separator = False
 
+        layout.operator(
+            SkybrushBatchExportOperator.bl_idname, text="Export to multiple formats"
+        )
+        layout.separator()
+
         layout.operator(
             RefreshFileFormatsOperator.bl_idname, text="Refresh file formats (PRO)"
         )
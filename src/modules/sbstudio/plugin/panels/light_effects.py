@@ -1,11 +1,11 @@
 import bpy
 from bpy.types import Panel
 
-from sbstudio.plugin.model.light_effects import (
-    effect_type_supports_randomization,
-    output_type_supports_mapping_mode,
-)
+from sbstudio.model.light_effects import output_type_supports_mapping_mode
+from sbstudio.plugin.model.light_effects import effect_type_supports_randomization
 from sbstudio.plugin.operators import (
+    BakeLightEffectsOperator,
+    ClearLightEffectBakeOperator,
     CreateLightEffectOperator,
     DuplicateLightEffectOperator,
     ExportLightEffectsOperator,
@@ -51,6 +51,10 @@ class LightEffectsPanel(Panel):
         row.operator(ImportLightEffectsOperator.bl_idname, text="Import...")
         row.operator(ExportLightEffectsOperator.bl_idname, text="Export...")
 
+        row = layout.row(align=True)
+        row.operator(BakeLightEffectsOperator.bl_idname, text="Bake")
+        row.operator(ClearLightEffectBakeOperator.bl_idname, icon="X", text="")
+
         row = layout.row()
         col = row.column()
         col.template_list(
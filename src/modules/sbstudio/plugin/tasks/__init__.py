@@ -1,5 +1,6 @@
 from .base import Task
 from .initialization import InitializationTask
+from .light_effect_bake import LightEffectBakeTask
 from .light_effects import UpdateLightEffectsTask
 from .pixel_cache import InvalidatePixelCacheTask
 from .pyro_effects import PyroEffectsTask
@@ -9,6 +10,7 @@ __all__ = (
     "Task",
     "InitializationTask",
     "InvalidatePixelCacheTask",
+    "LightEffectBakeTask",
     "PyroEffectsTask",
     "SafetyCheckTask",
     "UpdateLightEffectsTask",
@@ -30,6 +30,7 @@ _handler_names = [
     "save_pre",
     "save_post",
     "undo_pre",
+    "undo_post",
     "version_update",
 ]
 
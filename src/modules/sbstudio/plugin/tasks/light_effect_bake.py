@@ -0,0 +1,59 @@
+"""Background task that loads and saves the light effect bake together with the
+.blend file and that validates the bake when the scene changes.
+"""
+
+from __future__ import annotations
+
+import bpy
+
+from typing import TYPE_CHECKING
+
+from sbstudio.plugin.model.light_effects import may_affect_light_effects
+from sbstudio.plugin.utils import debounced
+from sbstudio.plugin.utils.light_effect_bake import (
+    has_light_effect_bake,
+    invalidate_light_effect_bake,
+    load_light_effect_bake,
+    save_light_effect_bake,
+    validate_light_effect_bake,
+)
+
+from .base import Task
+
+if TYPE_CHECKING:
+    from bpy.types import Depsgraph, Scene
+
+__all__ = ("LightEffectBakeTask",)
+
+
+def load_light_effect_bake_of_file(*args):
+    load_light_effect_bake(bpy.data.filepath)
+    if has_light_effect_bake():
+        validate_light_effect_bake_later()
+
+
+def save_light_effect_bake_of_file(*args):
+    save_light_effect_bake(bpy.data.filepath)
+
+
+@debounced(delay=0.5)
+def validate_light_effect_bake_later() -> None:
+    validate_light_effect_bake()
+
+
+def invalidate_light_effect_bake_on_change(scene: Scene, depsgraph: Depsgraph):
+    if any(may_affect_light_effects(update) for update in depsgraph.updates):
+        invalidate_light_effect_bake()
+        validate_light_effect_bake_later()
+
+
+class LightEffectBakeTask(Task):
+    """Background task that loads and saves the light effect bake together with
+    the .blend file and that validates the bake when the scene changes.
+    """
+
+    functions = {
+        "depsgraph_update_post": invalidate_light_effect_bake_on_change,
+        "load_post": load_light_effect_bake_of_file,
+        "save_post": save_light_effect_bake_of_file,
+    }
@@ -12,8 +12,14 @@ from .base import Task
 
 from sbstudio.model.types import MutableRGBAColor, RGBAColor
 from sbstudio.plugin.constants import Collections
+from sbstudio.plugin.model.light_effects import (
+    invalidate_interval_indices,
+    invalidate_light_effect_snapshots,
+    may_affect_light_effects,
+)
 from sbstudio.plugin.colors import get_color_of_drone, set_color_of_drone
 from sbstudio.plugin.utils.evaluator import get_position_of_object
+from sbstudio.plugin.utils.light_effect_bake import get_light_effect_bake
 
 if TYPE_CHECKING:
     from bpy.types import Depsgraph, Scene
@@ -67,6 +73,9 @@ def update_light_effects(scene: Scene, depsgraph: Depsgraph):
         _last_frame = frame
         _base_color_cache.clear()
 
+    if _apply_baked_colors(frame):
+        return
+
     changed = False
 
     for effect in light_effects.iter_active_effects_in_frame(frame):
@@ -119,6 +128,50 @@ def update_light_effects(scene: Scene, depsgraph: Depsgraph):
             set_color_of_drone(drone, color)
 
 
+def update_light_effects_on_change(scene: Scene, depsgraph: Depsgraph):
+    if any(may_affect_light_effects(update) for update in depsgraph.updates):
+        invalidate_light_effect_snapshots()
+    update_light_effects(scene, depsgraph)
+
+
+def _apply_baked_colors(frame: int) -> bool:
+    """Sets the colors of the drones from the light effect bake if the bake is
+    up-to-date in the given frame and it contains all the drones.
+
+    Returns:
+        whether the colors were set from the bake
+    """
+    bake = get_light_effect_bake()
+    if bake is None:
+        return False
+
+    baked_colors = bake.colors_at(frame)
+    if baked_colors is None:
+        return False
+
+    drones = Collections.find_drones().objects
+    columns = bake.columns_of([drone.name for drone in drones])
+    if columns is None:
+        return False
+
+    if not _base_color_cache:
+        # Keep the base colors so we can restore them if the bake becomes
+        # outdated while we are still in the same frame
+        for drone in drones:
+            _base_color_cache[id(drone)] = list(get_color_of_drone(drone))
+
+    for drone, color in zip(drones, (baked_colors[columns] / 255).tolist()):
+        set_color_of_drone(drone, color)
+
+    return True
+
+
+def invalidate_light_effect_caches(*args):
+    # Used to ignore the positional arguments
+    invalidate_interval_indices()
+    invalidate_light_effect_snapshots()
+
+
 @contextmanager
 def suspended_light_effects() -> Iterator[None]:
     """Context manager that suspends the calculation of light effects when the
@@ -139,6 +192,9 @@ class UpdateLightEffectsTask(Task):
     """
 
     functions = {
-        "depsgraph_update_post": update_light_effects,
+        "depsgraph_update_post": update_light_effects_on_change,
         "frame_change_post": update_light_effects,
+        "load_post": invalidate_light_effect_caches,
+        "redo_post": invalidate_light_effect_caches,
+        "undo_post": invalidate_light_effect_caches,
     }
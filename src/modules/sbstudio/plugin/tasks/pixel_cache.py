@@ -1,4 +1,7 @@
-from sbstudio.plugin.model.light_effects import invalidate_pixel_cache
+from sbstudio.plugin.model.light_effects import (
+    invalidate_mesh_triangle_cache,
+    invalidate_pixel_cache,
+)
 from sbstudio.plugin.tasks.base import Task
 
 __all__ = ("InvalidatePixelCacheTask",)
@@ -13,14 +16,23 @@ def invalidate_light_effect_pixel_cache_for_dynamic_images(*args):
     invalidate_pixel_cache(static=False, dynamic=True)
 
 
+def invalidate_light_effect_caches_on_change(scene, depsgraph):
+    invalidate_pixel_cache(static=False, dynamic=True)
+
+    # Edits of a mesh do not change the fingerprint that the cached triangles
+    # of the mesh are validated with
+    if any(update.is_updated_geometry for update in depsgraph.updates):
+        invalidate_mesh_triangle_cache()
+
+
 class InvalidatePixelCacheTask(Task):
     """Background task that is invoked after every frame change and that is
     responsible for invalidating cached pixel-level representations of light
-    effect images.
+    effect images and the cached geometry of the meshes of light effects.
     """
 
     functions = {
-        "depsgraph_update_post": invalidate_light_effect_pixel_cache_for_dynamic_images,
+        "depsgraph_update_post": invalidate_light_effect_caches_on_change,
         "frame_change_post": invalidate_light_effect_pixel_cache_for_dynamic_images,
         "load_post": invalidate_light_effect_pixel_cache,
     }
@@ -1,16 +1,33 @@
 """Utility functions related to Blender color ramps."""
 
 from bpy.types import ColorRamp
+from numpy import asarray, float32, linspace
+from numpy.typing import ArrayLike, NDArray
 
 from typing import Any
 
+from sbstudio.math.colors import evaluate_lookup_table
+
 __all__ = (
     "color_ramp_as_dict",
+    "evaluate_color_ramp",
+    "get_color_ramp_lookup_table",
+    "invalidate_color_ramp_lookup_tables",
     "update_color_ramp_from",
     "update_color_ramp_from_dict",
 )
 
 
+_LOOKUP_TABLE_SIZE = 4096
+"""Number of entries in the lookup tables of color ramps."""
+
+_lookup_tables: dict[int, tuple[tuple[Any, ...], NDArray]] = {}
+"""Cached lookup tables of color ramps, keyed by the pointers of the color
+ramps. Each entry also stores the signature of the color ramp that the table
+was built from so we can detect when the color ramp changes.
+"""
+
+
 def color_ramp_as_dict(source: ColorRamp) -> dict[str, Any]:
     """Returns a dictionary representation of a color ramp.
 
@@ -100,3 +117,79 @@ def update_color_ramp_from_dict(target: ColorRamp, data: dict[str, Any]) -> None
         while num_target_elements > num_elements:
             target.elements.remove(target.elements[-1])
             num_target_elements -= 1
+
+
+def evaluate_color_ramp(color_ramp: ColorRamp, values: ArrayLike) -> NDArray:
+    """Evaluates a color ramp at multiple positions at once.
+
+    Calling `ColorRamp.evaluate()` for every position separately is slow when
+    there are thousands of positions to evaluate, so this function samples the
+    color ramp into a lookup table first and then looks up the colors of all
+    the positions from the table. The table is cached and it is rebuilt only
+    when the elements or the interpolation settings of the color ramp change.
+
+    Positions are rounded to the nearest entry of the lookup table, which is
+    well below the resolution of the LEDs of the drones.
+
+    Parameters:
+        color_ramp: the color ramp to evaluate
+        values: the positions to evaluate the color ramp at; values outside
+            the [0; 1] range are clamped, just like `ColorRamp.evaluate()`
+            does
+
+    Returns:
+        the colors of the color ramp at the given positions, as an array of
+        RGBA colors
+    """
+    return evaluate_lookup_table(get_color_ramp_lookup_table(color_ramp), values)
+
+
+def invalidate_color_ramp_lookup_tables() -> None:
+    """Removes all cached lookup tables of color ramps. Called when a new file
+    is opened in Blender.
+    """
+    _lookup_tables.clear()
+
+
+def get_color_ramp_lookup_table(color_ramp: ColorRamp) -> NDArray:
+    """Returns the lookup table of the given color ramp, building it if
+    needed.
+
+    The lookup table samples the color ramp at evenly spaced positions of the
+    [0; 1] range; see `evaluate_lookup_table()`. The table is shared with the
+    cache so it must not be modified.
+    """
+    key = color_ramp.as_pointer()
+    signature = _get_color_ramp_signature(color_ramp)
+
+    entry = _lookup_tables.get(key)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    lookup_table = asarray(
+        [
+            color_ramp.evaluate(position)
+            for position in linspace(0.0, 1.0, _LOOKUP_TABLE_SIZE).tolist()
+        ],
+        dtype=float32,
+    )
+    _lookup_tables[key] = signature, lookup_table
+    return lookup_table
+
+
+def _get_color_ramp_signature(color_ramp: ColorRamp) -> tuple[Any, ...]:
+    """Returns a tuple that changes whenever the colors that the given color
+    ramp evaluates to may change.
+
+    Blender does not notify us when a color ramp is modified so we need to
+    compare the current state of the color ramp with the one that the lookup
+    table was built from.
+    """
+    return (
+        color_ramp.color_mode,
+        color_ramp.hue_interpolation,
+        color_ramp.interpolation,
+        tuple(
+            (element.position, tuple(element.color)) for element in color_ramp.elements
+        ),
+    )
@@ -3,9 +3,15 @@
 import bpy
 
 from bpy.types import Image
+from numpy.typing import NDArray
 from sbstudio.model.types import RGBAColor
 
-__all__ = ["convert_from_srgb_to_linear", "find_image_by_name", "get_pixel"]
+__all__ = [
+    "convert_from_srgb_to_linear",
+    "convert_from_srgb_to_linear_in_place",
+    "find_image_by_name",
+    "get_pixel",
+]
 
 
 def convert_from_srgb_to_linear(color: RGBAColor) -> RGBAColor:
@@ -24,6 +30,20 @@ def convert_from_srgb_to_linear(color: RGBAColor) -> RGBAColor:
     return (r**2.2, g**2.2, b**2.2, a)
 
 
+def convert_from_srgb_to_linear_in_place(colors: NDArray) -> NDArray:
+    """Converts an array of RGBA colors from sRGB to linear space in-place.
+
+    Args:
+        colors: The colors to convert, as a floating-point array of shape
+            ``(N, 4)``.
+
+    Returns:
+        The converted colors; the same array as the input.
+    """
+    colors[:, :3] **= 2.2
+    return colors
+
+
 def find_image_by_name(name: str) -> Image | None:
     """Searches for an image in bpy.data.images by its name.
 
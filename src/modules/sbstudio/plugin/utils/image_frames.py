@@ -0,0 +1,350 @@
+"""Readers that load individual frames of image sequences and movies used as
+light effect textures straight from disk, without relying on Blender to
+refresh the pixels of the image during a redraw of the UI.
+
+The readers are meant for exports and bakes that visit the frames of the show
+in increasing order. They are used only within a
+`reading_image_frames_from_disk()` context; interactive playback relies on
+the pixels that Blender loads for the current frame.
+"""
+
+import bpy
+import logging
+import re
+
+from bpy.path import abspath
+from bpy.types import Image, ImageUser
+from contextlib import contextmanager
+from numpy import empty, float32, frombuffer, uint8
+from numpy.typing import NDArray
+from os.path import basename, dirname, join, splitext
+from shutil import which
+from subprocess import DEVNULL, PIPE, Popen
+from typing import Iterator, Optional
+
+__all__ = (
+    "ImageFrameReader",
+    "close_image_frame_readers",
+    "get_image_frame_reader",
+    "get_image_sequence_frame_path",
+    "get_image_user_frame",
+    "is_reading_image_frames_from_disk",
+    "reading_image_frames_from_disk",
+)
+
+log = logging.getLogger(__name__)
+
+_LAST_DIGITS = re.compile(r"(\d+)\D*$")
+"""Regular expression matching the last group of digits in a string."""
+
+
+class ImageFrameReader:
+    """Base class for objects that read individual frames of an animated
+    image from disk.
+    """
+
+    def close(self) -> None:
+        """Releases all resources held by the reader."""
+        pass
+
+    def read(self, frame: int) -> Optional[NDArray]:
+        """Reads the given frame of the image.
+
+        Parameters:
+            frame: the frame number, as returned from `get_image_user_frame()`
+
+        Returns:
+            the pixels of the frame as a flat float32 array in the same layout
+            as `Image.pixels`, i.e. RGBA floats in the [0; 1] range, rows
+            ordered from bottom to top; `None` if the frame cannot be read.
+            The array may be returned again by later calls so it must not be
+            modified
+        """
+        raise NotImplementedError
+
+
+class ImageSequenceFrameReader(ImageFrameReader):
+    """Frame reader for image sequences where each frame is a separate file
+    whose name contains the frame number.
+    """
+
+    _path: str
+    """Absolute path of any frame of the image sequence."""
+
+    _colorspace: str
+    """Name of the color space of the image sequence."""
+
+    def __init__(self, path: str, colorspace: str):
+        """Constructor.
+
+        Parameters:
+            path: absolute path of any frame of the image sequence
+            colorspace: name of the color space of the image sequence
+        """
+        self._path = path
+        self._colorspace = colorspace
+
+    def read(self, frame: int) -> Optional[NDArray]:
+        path = get_image_sequence_frame_path(self._path, frame)
+        if path is None:
+            return None
+
+        try:
+            image = bpy.data.images.load(path, check_existing=False)
+        except RuntimeError:
+            log.warning(f"Could not load frame {frame} from {path!r}")
+            return None
+
+        try:
+            image.colorspace_settings.name = self._colorspace
+            pixels = empty(len(image.pixels), dtype=float32)
+            image.pixels.foreach_get(pixels)
+            return pixels
+        finally:
+            bpy.data.images.remove(image)
+
+
+class MovieFrameReader(ImageFrameReader):
+    """Frame reader for movies that decodes the frames of the movie with an
+    external ``ffmpeg`` process.
+
+    Frames are decoded sequentially; reading an earlier frame than the last
+    one restarts the decoder from the beginning of the movie. This is
+    efficient for exports that iterate over the frames of the show in
+    increasing order.
+    """
+
+    _executable: str
+    """Path to the ``ffmpeg`` executable."""
+
+    _path: str
+    """Absolute path of the movie file."""
+
+    _width: int
+    """Width of the frames of the movie, in pixels."""
+
+    _height: int
+    """Height of the frames of the movie, in pixels."""
+
+    _process: Optional[Popen] = None
+    """The running decoder process, if any."""
+
+    _next_frame: int = 1
+    """Number of the frame that the decoder process will produce next."""
+
+    _last_frame: Optional[tuple[int, NDArray]] = None
+    """The number and the pixels of the last decoded frame, if any."""
+
+    def __init__(self, executable: str, path: str, width: int, height: int):
+        """Constructor.
+
+        Parameters:
+            executable: path to the ``ffmpeg`` executable
+            path: absolute path of the movie file
+            width: width of the frames of the movie, in pixels
+            height: height of the frames of the movie, in pixels
+        """
+        self._executable = executable
+        self._path = path
+        self._width = width
+        self._height = height
+
+    def close(self) -> None:
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+        self._next_frame = 1
+
+    def read(self, frame: int) -> Optional[NDArray]:
+        if frame < 1:
+            return None
+
+        if self._last_frame is not None and self._last_frame[0] == frame:
+            return self._last_frame[1]
+
+        if self._process is None or frame < self._next_frame:
+            self.close()
+            try:
+                self._process = Popen(
+                    [
+                        self._executable,
+                        "-v",
+                        "error",
+                        "-i",
+                        self._path,
+                        "-f",
+                        "rawvideo",
+                        "-pix_fmt",
+                        "rgba",
+                        "-",
+                    ],
+                    stdin=DEVNULL,
+                    stdout=PIPE,
+                    stderr=DEVNULL,
+                )
+            except OSError as ex:
+                log.warning(f"Could not start ffmpeg to decode {self._path!r}: {ex}")
+                return None
+
+        assert self._process.stdout is not None
+        frame_size = self._width * self._height * 4
+        data = b""
+        while self._next_frame <= frame:
+            data = self._process.stdout.read(frame_size)
+            self._next_frame += 1
+            if len(data) < frame_size:
+                # End of the movie
+                self.close()
+                return None
+
+        # ffmpeg yields the rows from top to bottom, Blender stores them from
+        # bottom to top
+        pixels = frombuffer(data, dtype=uint8).reshape(self._height, self._width, 4)
+        result = (pixels[::-1].astype(float32) / 255).ravel()
+        self._last_frame = frame, result
+        return result
+
+
+_readers: dict[
+    tuple[str, str, Optional[tuple[int, int]]], Optional[ImageFrameReader]
+] = {}
+"""Frame readers created so far, keyed by the names and file paths of the
+images they belong to and by the frame offsets of the image users reading
+them. ``None`` values denote images that cannot be read from disk.
+"""
+
+_reading_counter: int = 0
+"""Number of active `reading_image_frames_from_disk()` contexts."""
+
+
+def close_image_frame_readers() -> None:
+    """Closes all the frame readers created by `get_image_frame_reader()`."""
+    for reader in _readers.values():
+        if reader is not None:
+            reader.close()
+    _readers.clear()
+
+
+def get_image_frame_reader(
+    image: Image, image_user: Optional[ImageUser] = None
+) -> Optional[ImageFrameReader]:
+    """Returns a frame reader for the given image, creating it if needed.
+
+    Image users with different frame offsets get separate readers so a movie
+    shown with different offsets by multiple light effects does not restart
+    the decoder in every frame.
+
+    Parameters:
+        image: the image to read frames from
+        image_user: the image user that reads the frames of the image
+
+    Returns:
+        the frame reader of the image, or `None` if the frames of the image
+        cannot be read from disk. This is the case for images that are packed
+        into the .blend file, images that are neither image sequences nor
+        movies, and movies when ``ffmpeg`` is not installed.
+    """
+    offset = (
+        (image_user.frame_start, image_user.frame_offset)
+        if image_user is not None
+        else None
+    )
+    key = image.name, image.filepath, offset
+    if key in _readers:
+        return _readers[key]
+
+    reader: Optional[ImageFrameReader] = None
+    if image.packed_file is None and image.filepath:
+        if image.source == "SEQUENCE":
+            reader = ImageSequenceFrameReader(
+                abspath(image.filepath), image.colorspace_settings.name
+            )
+        elif image.source == "MOVIE":
+            executable = which("ffmpeg")
+            if executable is not None:
+                width, height = image.size
+                reader = MovieFrameReader(
+                    executable, abspath(image.filepath), width, height
+                )
+
+    _readers[key] = reader
+    return reader
+
+
+def is_reading_image_frames_from_disk() -> bool:
+    """Returns whether the frames of animated images should be read from disk
+    with the frame readers, i.e. whether we are within a
+    `reading_image_frames_from_disk()` context.
+    """
+    return _reading_counter > 0
+
+
+@contextmanager
+def reading_image_frames_from_disk() -> Iterator[None]:
+    """Context manager that lets light effects read the frames of animated
+    images from disk while the context is active. The frame readers are closed
+    when the outermost context is exited.
+    """
+    global _reading_counter
+    _reading_counter += 1
+    try:
+        yield
+    finally:
+        _reading_counter -= 1
+        if not _reading_counter:
+            close_image_frame_readers()
+
+
+def get_image_sequence_frame_path(path: str, frame: int) -> Optional[str]:
+    """Returns the path of the file that contains the given frame of an
+    image sequence.
+
+    The frame number is stored in the last group of digits in the name of the
+    file, padded with zeros to the length of the group, just like Blender does.
+
+    Parameters:
+        path: the path of any frame of the image sequence
+        frame: the frame number
+
+    Returns:
+        the path of the frame or `None` if the name of the file does not
+        contain any digits
+    """
+    stem, ext = splitext(basename(path))
+    match = _LAST_DIGITS.search(stem)
+    if match is None:
+        return None
+
+    digits = match.group(1)
+    stem = f"{stem[: match.start(1)]}{frame:0{len(digits)}d}{stem[match.end(1) :]}"
+    return join(dirname(path), stem + ext)
+
+
+def get_image_user_frame(image_user: ImageUser, frame: int) -> int:
+    """Returns the frame number of an animated image that is shown in the
+    given frame of the scene, according to the settings of an image user.
+
+    This function mirrors how Blender maps scene frames to image frames.
+
+    Parameters:
+        image_user: the image user that defines the mapping
+        frame: the frame number of the scene
+
+    Returns:
+        the frame number of the image; zero if the image user does not show
+        any frames
+    """
+    length = image_user.frame_duration
+    if length == 0:
+        return 0
+
+    frame = frame - image_user.frame_start + 1
+    if image_user.use_cyclic:
+        frame %= length
+        if frame == 0:
+            frame = length
+    else:
+        frame = min(max(frame, 0), length)
+
+    return frame + image_user.frame_offset
@@ -0,0 +1,534 @@
+"""Optional bake of the colors that the light effects of the show produce.
+
+The bake stores the colors of all the drones in every frame of the scene as
+8-bit RGBA values so scrubbing the timeline and exporting the show can read
+the colors back instead of evaluating the light effects again.
+
+The timeline is split into segments along the storyboard and each segment is
+validated with the same kind of content hash that the export sample cache
+uses for it. The hash of a segment covers only the light effects overlapping
+with the segment, so modifying a light effect invalidates only the frames of
+the segments that the effect overlaps with.
+
+The bake is kept in memory and it is saved next to the .blend file, in a
+compressed archive, when the file is saved and the bake has changed since it
+was last saved or loaded.
+"""
+
+from __future__ import annotations
+
+import bpy
+import logging
+
+from bpy.types import Context, Object
+from itertools import islice
+from numpy import array, clip, float64, int64, rint, uint8, zeros
+from numpy import load as load_arrays
+from numpy import savez_compressed as save_arrays
+from numpy.typing import NDArray
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from sbstudio.model.light_effects import (
+    LightEffectBakeChunk,
+    LightEffectDescriptor,
+    bake_light_effect_chunks,
+)
+from sbstudio.model.types import Coordinate3D, RGBAColor
+from sbstudio.plugin.colors import get_color_of_drone
+from sbstudio.plugin.constants import Collections
+
+from .decorators import with_context
+from .evaluator import get_position_of_object
+from .image_frames import reading_image_frames_from_disk
+from .progress import FrameProgressReport, FrameScheduleIterator
+
+__all__ = (
+    "LightEffectBake",
+    "bake_light_effects",
+    "clear_light_effect_bake",
+    "get_light_effect_bake",
+    "has_light_effect_bake",
+    "invalidate_light_effect_bake",
+    "load_light_effect_bake",
+    "save_light_effect_bake",
+    "validate_light_effect_bake",
+)
+
+
+log = logging.getLogger(__name__)
+
+_BAKE_FILE_SUFFIX = ".light_effect_bake.npz"
+"""Suffix of the file that stores the bake next to the .blend file."""
+
+_FRAMES_PER_CHUNK = 128
+"""Number of consecutive frames that are evaluated together in a single worker
+process when baking light effects in parallel.
+"""
+
+
+class LightEffectBake:
+    """Colors of a set of drones in every frame of a contiguous frame range,
+    along with the frames where the stored colors are up-to-date.
+    """
+
+    frame_start: int
+    """The first frame of the bake."""
+
+    names: list[str]
+    """Names of the drones in the bake, in the order of the columns of the
+    color array.
+    """
+
+    colors: NDArray[uint8]
+    """The colors of the drones, as an array of shape ``(frames, drones, 4)``
+    with RGBA components in the [0; 255] range.
+    """
+
+    valid: NDArray
+    """Boolean array that tells which frames of the bake are up-to-date."""
+
+    segment_keys: dict[tuple[int, int], str]
+    """Content hashes of the segments of the show that the bake was validated
+    against, keyed by the start and end frames of the segments (inclusive).
+    """
+
+    is_dirty: bool
+    """Whether the bake was modified since it was last saved or loaded."""
+
+    _columns: dict[str, int]
+    """Mapping from the names of the drones to the columns of the color array."""
+
+    def __init__(self, frame_start: int, num_frames: int, names: Sequence[str]):
+        """Constructor.
+
+        Parameters:
+            frame_start: the first frame of the bake
+            num_frames: number of frames in the bake
+            names: names of the drones in the bake
+        """
+        self.frame_start = frame_start
+        self.names = list(names)
+        self.colors = zeros((num_frames, len(self.names), 4), dtype=uint8)
+        self.valid = zeros(num_frames, dtype=bool)
+        self.segment_keys = {}
+        self.is_dirty = True
+        self._columns = {name: index for index, name in enumerate(self.names)}
+
+    @property
+    def frame_end(self) -> int:
+        """The last frame of the bake, inclusive."""
+        return self.frame_start + len(self.valid) - 1
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether all the frames of the bake are up-to-date."""
+        return bool(self.valid.all())
+
+    def colors_at(self, frame: int) -> Optional[NDArray[uint8]]:
+        """Returns the colors of the drones in the given frame, or `None` if
+        the frame is not in the bake or it is not up-to-date.
+        """
+        index = frame - self.frame_start
+        if 0 <= index < len(self.valid) and self.valid[index]:
+            return self.colors[index]
+        else:
+            return None
+
+    def columns_of(self, names: Sequence[str]) -> Optional[NDArray]:
+        """Returns the columns of the color array that correspond to the drones
+        with the given names, or `None` if some of the drones are not in the
+        bake.
+        """
+        try:
+            return array([self._columns[name] for name in names], dtype=int64)
+        except KeyError:
+            return None
+
+    def invalidate_frames(self, start: int, end: int) -> None:
+        """Marks the frames in the given range as outdated.
+
+        Parameters:
+            start: the first frame of the range
+            end: the last frame of the range, inclusive
+        """
+        lo = max(start - self.frame_start, 0)
+        hi = min(end - self.frame_start + 1, len(self.valid))
+        if lo < hi and self.valid[lo:hi].any():
+            self.valid[lo:hi] = False
+            self.is_dirty = True
+
+    def put(self, frame: int, colors: Sequence[RGBAColor]) -> None:
+        """Stores the colors of the drones in the given frame and marks the
+        frame as up-to-date.
+
+        Parameters:
+            frame: the frame to update; must be within the range of the bake
+            colors: the RGBA colors of the drones in the [0; 1] range, in the
+                order of the drones in the bake
+        """
+        index = frame - self.frame_start
+        self.colors[index] = clip(rint(array(colors, dtype=float64) * 255), 0, 255)
+        self.valid[index] = True
+        self.is_dirty = True
+
+    def put_many(self, frames: Sequence[int], colors: NDArray[uint8]) -> None:
+        """Stores the colors of the drones in multiple frames and marks the
+        frames as up-to-date.
+
+        Parameters:
+            frames: the frames to update; must be within the range of the bake
+            colors: the RGBA colors of the drones in the [0; 255] range, as an
+                array of shape ``(len(frames), drones, 4)``
+        """
+        indices = array(frames, dtype=int64) - self.frame_start
+        self.colors[indices] = colors
+        self.valid[indices] = True
+        self.is_dirty = True
+
+    @classmethod
+    def load(cls, path: Path) -> LightEffectBake:
+        """Loads a bake from the given file, created earlier with `save()`."""
+        with load_arrays(path) as data:
+            colors = data["colors"]
+            result = cls(int(data["frame_start"]), len(colors), data["names"].tolist())
+            result.colors[:] = colors
+            result.valid[:] = data["valid"]
+            result.segment_keys = {
+                (int(start), int(end)): str(key)
+                for (start, end), key in zip(
+                    data["segments"].reshape(-1, 2), data["keys"]
+                )
+            }
+        result.is_dirty = False
+        return result
+
+    def save(self, path: Path) -> None:
+        """Saves the bake into the given file."""
+        segments = sorted(self.segment_keys)
+        with path.open("wb") as fp:
+            save_arrays(
+                fp,
+                frame_start=array(self.frame_start),
+                names=array(self.names, dtype=str),
+                colors=self.colors,
+                valid=self.valid,
+                segments=array(segments, dtype=int64).reshape(-1, 2),
+                keys=array([self.segment_keys[s] for s in segments], dtype=str),
+            )
+        self.is_dirty = False
+
+
+_bake: Optional[LightEffectBake] = None
+"""The light effect bake of the current file, if any."""
+
+_needs_validation: bool = False
+"""Whether the scene may have changed since the bake was validated the last
+time.
+"""
+
+_stored_path: Optional[Path] = None
+"""Path of the file that the current bake was last saved to or loaded from;
+`None` if the bake was not saved or loaded yet.
+"""
+
+
+@with_context
+def bake_light_effects(
+    *,
+    max_workers: Optional[int] = None,
+    context: Optional[Context] = None,
+    progress: Optional[Callable[[FrameProgressReport], None]] = None,
+) -> LightEffectBake:
+    """Bakes the colors of the drones in the frame range of the scene.
+
+    Only the outdated frames are evaluated if the existing bake covers the
+    same frame range and the same drones.
+
+    The positions and base colors of the drones are sampled frame by frame in
+    Blender, but the light effects themselves are evaluated on snapshots in
+    worker processes, in chunks of consecutive frames, unless `max_workers`
+    is 1.
+
+    Parameters:
+        max_workers: the number of worker processes to evaluate the light
+            effects in; `None` means the number of CPU cores. 1 evaluates the
+            light effects in Blender, frame by frame.
+        context: the Blender execution context; `None` means the current
+            Blender context
+        progress: optional progress callback
+
+    Returns:
+        the bake
+    """
+    global _bake, _needs_validation
+
+    assert context is not None  # injected
+
+    scene = context.scene
+    drones = _get_drones()
+    names = [drone.name for drone in drones]
+    start, end = scene.frame_start, scene.frame_end
+
+    bake = _bake
+    if (
+        bake is None
+        or bake.names != names
+        or bake.frame_start != start
+        or bake.frame_end != end
+    ):
+        bake = LightEffectBake(start, end - start + 1, names)
+
+    _update_segment_keys(bake, drones, context=context)
+    _bake, _needs_validation = bake, False
+
+    # Video-based light effects need the window to be redrawn to update
+    # their frames
+    redraw = any(
+        effect.needs_redraw
+        for effect in scene.skybrush.light_effects.iter_active_effects_in_frame_range(
+            start, end
+        )
+    )
+
+    frames = [frame for frame in range(start, end + 1) if bake.colors_at(frame) is None]
+    schedule = FrameScheduleIterator(
+        frames, operation="Baking light effects", progress=progress
+    )
+    current_frame = scene.frame_current
+    try:
+        with reading_image_frames_from_disk():
+            if max_workers == 1:
+                for frame in schedule:
+                    scene.frame_set(frame)
+                    if redraw:
+                        bpy.ops.wm.redraw_timer(type="DRAW_WIN_SWAP", iterations=0)
+                    bake.put(frame, [get_color_of_drone(drone) for drone in drones])
+            else:
+                chunks = _iter_bake_chunks(
+                    schedule, drones, redraw=redraw, context=context
+                )
+                for chunk, colors in bake_light_effect_chunks(
+                    chunks, max_workers=max_workers
+                ):
+                    bake.put_many(chunk.frames, colors)
+    finally:
+        scene.frame_set(current_frame)
+
+    return bake
+
+
+def clear_light_effect_bake() -> None:
+    """Removes the light effect bake of the current file."""
+    global _bake, _needs_validation
+    _bake, _needs_validation = None, False
+
+
+@with_context
+def get_light_effect_bake(
+    *, validate: bool = False, context: Optional[Context] = None
+) -> Optional[LightEffectBake]:
+    """Returns the light effect bake of the current file.
+
+    Parameters:
+        validate: whether to validate the bake if the scene may have changed
+            since its last validation. When this is `False`, no bake is
+            returned until the next validation.
+        context: the Blender execution context; `None` means the current
+            Blender context
+
+    Returns:
+        the bake, or `None` if there is no bake or it needs to be validated
+        first
+    """
+    if _bake is not None and _needs_validation:
+        if not validate:
+            return None
+        validate_light_effect_bake(context=context)
+
+    return _bake
+
+
+def has_light_effect_bake() -> bool:
+    """Returns whether the current file has a light effect bake, no matter
+    whether it is up-to-date or not.
+    """
+    return _bake is not None
+
+
+def invalidate_light_effect_bake() -> None:
+    """Notifies the bake that the scene may have changed, suspending its use
+    until it is validated again with `validate_light_effect_bake()`.
+    """
+    global _needs_validation
+    if _bake is not None:
+        _needs_validation = True
+
+
+def load_light_effect_bake(filepath: str) -> None:
+    """Loads the light effect bake stored next to the given .blend file,
+    replacing the current bake. The bake is validated before its next use.
+    """
+    global _bake, _needs_validation, _stored_path
+
+    _bake, _needs_validation, _stored_path = None, False, None
+
+    path = _get_path_of_bake_of_file(filepath)
+    if path is None or not path.is_file():
+        return
+
+    try:
+        _bake = LightEffectBake.load(path)
+    except Exception:
+        log.warning(f"Ignoring corrupted light effect bake in {path}")
+    else:
+        _needs_validation, _stored_path = True, path
+
+
+def save_light_effect_bake(filepath: str) -> None:
+    """Saves the light effect bake next to the given .blend file, or removes
+    the stored bake if there is no bake.
+
+    The bake is written only if it has changed since it was last saved or
+    loaded, or if it was stored next to a different file.
+    """
+    global _stored_path
+
+    path = _get_path_of_bake_of_file(filepath)
+    if path is None:
+        return
+
+    try:
+        if _bake is None:
+            path.unlink(missing_ok=True)
+        elif _bake.is_dirty or path != _stored_path or not path.is_file():
+            _bake.save(path)
+            _stored_path = path
+    except OSError:
+        log.warning(f"Failed to save light effect bake to {path}")
+
+
+@with_context
+def validate_light_effect_bake(*, context: Optional[Context] = None) -> None:
+    """Compares the content hashes of the segments of the show with the ones
+    that the bake was validated against, and marks the frames of the
+    segments that have changed as outdated.
+    """
+    global _needs_validation
+
+    _needs_validation = False
+    if _bake is None:
+        return
+
+    drones = _get_drones()
+    if [drone.name for drone in drones] != _bake.names:
+        _bake.invalidate_frames(_bake.frame_start, _bake.frame_end)
+        _bake.segment_keys = {}
+        _bake.is_dirty = True
+    else:
+        _update_segment_keys(_bake, drones, context=context)
+
+
+def _get_drones() -> Sequence[Object]:
+    drones = Collections.find_drones(create=False)
+    return list(drones.objects) if drones else []
+
+
+def _get_path_of_bake_of_file(filepath: str) -> Optional[Path]:
+    return Path(filepath).with_suffix(_BAKE_FILE_SUFFIX) if filepath else None
+
+
+def _iter_bake_chunks(
+    frames: Iterable[int],
+    drones: Sequence[Object],
+    *,
+    redraw: bool,
+    context: Context,
+) -> Iterator[LightEffectBakeChunk]:
+    """Samples the positions, base colors and formation mappings of the drones
+    and takes snapshots of the active light effects in the given frames, and
+    yields them in chunks of consecutive frames to be evaluated without
+    Blender.
+
+    Light effects are suspended while sampling so the colors of the drones are
+    their base colors, before the light effects are applied.
+    """
+    # Imported here to avoid a circular import: the light effect task uses the
+    # bake
+    from sbstudio.plugin.tasks.light_effects import suspended_light_effects
+
+    scene = context.scene
+    light_effects = scene.skybrush.light_effects
+    storyboard = scene.skybrush.storyboard
+    random_seed = scene.skybrush.settings.random_seed
+
+    frames = iter(frames)
+    num_drones = len(drones)
+    while True:
+        chunk_frames: list[int] = []
+        positions: list[list[Coordinate3D]] = []
+        colors: list[list[RGBAColor]] = []
+        mappings: list[Optional[list[Optional[int]]]] = []
+        effects: list[list[LightEffectDescriptor]] = []
+
+        with suspended_light_effects():
+            for frame in islice(frames, _FRAMES_PER_CHUNK):
+                scene.frame_set(frame)
+                if redraw:
+                    bpy.ops.wm.redraw_timer(type="DRAW_WIN_SWAP", iterations=0)
+
+                chunk_frames.append(frame)
+                positions.append([get_position_of_object(drone) for drone in drones])
+                colors.append([get_color_of_drone(drone) for drone in drones])
+                mappings.append(storyboard.get_mapping_at_frame(frame))
+                effects.append(
+                    [
+                        effect.snapshot(frame, with_triangles=True)
+                        for effect in light_effects.iter_active_effects_in_frame(frame)
+                    ]
+                )
+
+        if not chunk_frames:
+            break
+
+        yield LightEffectBakeChunk(
+            frames=chunk_frames,
+            positions=array(positions, dtype=float64).reshape(
+                len(chunk_frames), num_drones, 3
+            ),
+            colors=array(colors, dtype=float64).reshape(
+                len(chunk_frames), num_drones, 4
+            ),
+            mappings=mappings,
+            effects=effects,
+            random_seed=random_seed,
+        )
+
+
+def _update_segment_keys(
+    bake: LightEffectBake, drones: Sequence[Object], *, context: Context
+) -> None:
+    """Recalculates the content hashes of the segments of the show within the
+    range of the bake and marks the frames of the segments whose hash changed
+    as outdated.
+    """
+    # Imported here to avoid a circular import: the sampling functions use
+    # the light effect task, which uses the bake
+    from .sample_cache import get_segment_keys, get_show_segments
+
+    segments = get_show_segments((bake.frame_start, bake.frame_end), context=context)
+    keys = get_segment_keys(
+        drones,
+        segments,
+        options=("light_effect_bake", context.scene.skybrush.settings.random_seed),
+        context=context,
+    )
+
+    for segment, key in zip(segments, keys):
+        if bake.segment_keys.get(segment) != key:
+            bake.invalidate_frames(*segment)
+
+    segment_keys = dict(zip(segments, keys))
+    if bake.segment_keys != segment_keys:
+        bake.segment_keys = segment_keys
+        bake.is_dirty = True
@@ -1,8 +1,13 @@
 from dataclasses import dataclass
 from time import time
-from typing import Callable, Iterator, Optional, Tuple
+from typing import Callable, Iterator, Optional, Sequence, Tuple
 
-__all__ = ("ProgressReport", "FrameProgressReport")
+__all__ = (
+    "FrameIterator",
+    "FrameProgressReport",
+    "FrameScheduleIterator",
+    "ProgressReport",
+)
 
 
 @dataclass
@@ -113,6 +118,9 @@ class FrameIterator(Iterator[int]):
     current: int
     """The current frame number."""
 
+    _length: int
+    """Total number of frames that the iterator yields."""
+
     _callback: Optional[Callable[[FrameProgressReport], None]] = None
     """Callback to call in every iteration to report progress."""
 
@@ -138,6 +146,7 @@ class FrameIterator(Iterator[int]):
 
         total_steps, remainder = divmod(self.end - self.start, self.step)
         total_steps += 2 if remainder else 1
+        self._length = total_steps
 
         self._progress = FrameProgressReport(
             frame_range=(start, end), operation=operation, total_steps=total_steps
@@ -148,6 +157,29 @@ class FrameIterator(Iterator[int]):
     def __iter__(self) -> Iterator[int]:
         return self
 
+    def __len__(self) -> int:
+        """Returns the total number of frames yielded by the iterator."""
+        return self._length
+
+    def get_frames(self) -> list[int]:
+        """Returns all the frames that the iterator yields, starting from the
+        start frame, without advancing the iterator.
+        """
+        frames = list(range(self.start, self.end, self.step))
+        frames.append(self.end)
+        return frames
+
+    def reschedule(self, frames: Sequence[int]) -> "FrameScheduleIterator":
+        """Returns an iterator that yields the given frames instead of the
+        frames of this iterator, reporting progress to the same callback.
+
+        Parameters:
+            frames: the frames to yield, in increasing order
+        """
+        return FrameScheduleIterator(
+            frames, operation=self._progress.operation, progress=self._callback
+        )
+
     def __next__(self) -> int:
         if self.current > self.end:
             self._progress.total_steps = self._progress.steps_done
@@ -178,3 +210,72 @@ class FrameIterator(Iterator[int]):
                 self._callback_called_at = now
 
         return frame
+
+
+class FrameScheduleIterator(Iterator[int]):
+    """Iterator that yields frame numbers from an arbitrary, sorted list of
+    frames, reporting progress the same way as FrameIterator_.
+    """
+
+    frames: Sequence[int]
+    """The frames to yield, in increasing order."""
+
+    _index: int
+    """Index of the next frame to yield."""
+
+    _callback: Optional[Callable[[FrameProgressReport], None]] = None
+    """Callback to call in every iteration to report progress."""
+
+    _callback_called_at: float
+    """Time when the callback was last called."""
+
+    _progress: FrameProgressReport
+    """Frame progress report object yielded from the callback."""
+
+    def __init__(
+        self,
+        frames: Sequence[int],
+        *,
+        operation: Optional[str] = None,
+        progress: Optional[Callable[[FrameProgressReport], None]] = None,
+    ):
+        self.frames = frames
+        self._index = 0
+
+        frame_range = (frames[0], frames[-1]) if frames else (0, 0)
+        self._progress = FrameProgressReport(
+            frame_range=frame_range, operation=operation, total_steps=len(frames)
+        )
+        self._callback = progress
+        self._callback_called_at = 0
+
+    def __iter__(self) -> Iterator[int]:
+        return self
+
+    def __len__(self) -> int:
+        """Returns the total number of frames yielded by the iterator."""
+        return len(self.frames)
+
+    def __next__(self) -> int:
+        if self._index >= len(self.frames):
+            raise StopIteration
+
+        frame = self.frames[self._index]
+        self._index += 1
+
+        self._progress.current_frame = frame
+        self._progress.steps_done = self._index
+
+        if self._callback:
+            now = time()
+
+            if not self._progress.start_time:
+                self._progress.start_time = now
+            self._progress.current_time = now
+
+            is_last = self._index == len(self.frames)
+            if now - self._callback_called_at >= 1 or is_last:
+                self._callback(self._progress)
+                self._callback_called_at = now
+
+        return frame
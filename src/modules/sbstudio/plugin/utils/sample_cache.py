@@ -0,0 +1,788 @@
+"""On-disk cache of the samples taken from the scene during export, split
+into storyboard segments and keyed by content hashes of the inputs of each
+segment.
+
+The timeline of the show is split into segments along the storyboard: each
+formation (storyboard entry) and each transition between two consecutive
+entries is a separate segment. The samples of a segment depend only on the
+animation data of the drones and of the formation markers within the segment,
+on the storyboard entries and on the light effects overlapping with the
+segment. When only a single transition is modified between two exports, the
+keys of all the other segments remain the same and their samples can be
+loaded from the cache instead of evaluating the scene again.
+
+The cache is stored in the temporary directory of the current Blender
+session, which Blender removes when it exits, so cached segments are re-used
+only by exports within the same session. The total size of the cache is
+bounded; the least recently used segments are evicted first.
+"""
+
+import json
+import logging
+
+from bpy.path import abspath
+from bpy.types import Context, Object
+from hashlib import sha1
+from numpy import (
+    array,
+    asarray,
+    empty,
+    float32,
+    rint,
+    searchsorted,
+)
+from numpy import load as load_arrays
+from numpy import savez as save_arrays
+from numpy.typing import NDArray
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from sbstudio.model.samples import SampleBuffer
+from sbstudio.plugin.actions import get_action_for_object
+from sbstudio.plugin.model.storyboard import get_storyboard
+
+from .decorators import with_context
+from .platform import get_temporary_directory
+from .progress import FrameProgressReport
+from .sampling import sample_objects_into_buffers_at_multiple_rates
+
+__all__ = (
+    "ExportSampleCache",
+    "get_export_sample_cache",
+    "get_segment_keys",
+    "get_show_segments",
+    "sample_show_into_buffers",
+)
+
+
+log = logging.getLogger(__name__)
+
+_CACHE_FORMAT_VERSION = 2
+"""Version number of the cache format; it is hashed into every key so
+changing it invalidates all the cached segments.
+"""
+
+_MAX_CACHE_SIZE = 2 << 30
+"""Maximum total size of the cached segments, in bytes."""
+
+_STATIC_DATA_PATHS = (
+    "location",
+    "rotation_euler",
+    "rotation_quaternion",
+    "rotation_axis_angle",
+    "rotation_mode",
+    "scale",
+    "delta_location",
+    "delta_rotation_euler",
+    "delta_rotation_quaternion",
+    "delta_scale",
+    "color",
+)
+"""Properties of objects that influence their transformation or their color
+and that are hashed as static values if they are not animated.
+"""
+
+_CONSTRAINT_PROPERTIES = (
+    "type",
+    "name",
+    "mute",
+    "influence",
+    "subtarget",
+    "use_x",
+    "use_y",
+    "use_z",
+    "invert_x",
+    "invert_y",
+    "invert_z",
+    "use_offset",
+    "target_space",
+    "owner_space",
+)
+"""Properties of constraints that are hashed when they exist."""
+
+_INTERPOLATION_TYPES = (
+    "CONSTANT",
+    "LINEAR",
+    "BEZIER",
+    "SINE",
+    "QUAD",
+    "CUBIC",
+    "QUART",
+    "QUINT",
+    "EXPO",
+    "CIRC",
+    "BACK",
+    "BOUNCE",
+    "ELASTIC",
+)
+"""Known keyframe interpolation types in Blender."""
+
+_EASING_TYPES = ("AUTO", "EASE_IN", "EASE_OUT", "EASE_IN_OUT")
+"""Known keyframe easing types in Blender."""
+
+
+class ExportSampleCache:
+    """On-disk cache of the samples of individual show segments, keyed by
+    content hashes.
+
+    Each entry is stored in a separate NumPy archive in the cache directory.
+    When the total size of the entries exceeds the limit of the cache, the
+    least recently used entries are removed.
+    """
+
+    _directory: Path
+    """The directory that stores the cached segments."""
+
+    _max_size: int
+    """Maximum total size of the cached segments, in bytes."""
+
+    def __init__(self, directory: Path, max_size: int = _MAX_CACHE_SIZE):
+        """Constructor.
+
+        Parameters:
+            directory: the directory that stores the cached segments; it is
+                created on demand
+            max_size: maximum total size of the cached segments, in bytes
+        """
+        self._directory = directory
+        self._max_size = max_size
+
+    def clear(self) -> None:
+        """Removes all the cached segments."""
+        if self._directory.is_dir():
+            for path in self._directory.glob("*.npz"):
+                path.unlink(missing_ok=True)
+
+    def get(self, key: str) -> Optional[tuple[SampleBuffer, SampleBuffer]]:
+        """Returns the position and color samples of the segment with the given
+        key, or `None` if the segment is not in the cache.
+        """
+        path = self._path_of(key)
+        if not path.is_file():
+            return None
+
+        try:
+            with load_arrays(path) as data:
+                positions = SampleBuffer.from_arrays(
+                    data["position_times"],
+                    positions=data["positions"],
+                    yaw=data["yaw"] if "yaw" in data else None,
+                )
+                colors = SampleBuffer.from_arrays(
+                    data["color_times"], colors=data["colors"]
+                )
+        except Exception:
+            log.warning(f"Ignoring corrupted cached segment {key}")
+            return None
+
+        # Mark the segment as recently used so it is evicted last
+        try:
+            path.touch()
+        except OSError:
+            pass
+
+        return positions, colors
+
+    def put(self, key: str, positions: SampleBuffer, colors: SampleBuffer) -> None:
+        """Stores the position and color samples of the segment with the given
+        key in the cache.
+        """
+        assert positions.positions is not None
+        assert colors.colors is not None
+
+        arrays = {
+            "position_times": positions.times[: len(positions)],
+            "positions": positions.positions[: len(positions)],
+            "color_times": colors.times[: len(colors)],
+            "colors": colors.colors[: len(colors)],
+        }
+        if positions.yaw is not None:
+            arrays["yaw"] = positions.yaw[: len(positions)]
+
+        try:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            with self._path_of(key).open("wb") as fp:
+                save_arrays(fp, **arrays)
+        except OSError:
+            log.warning(f"Failed to store segment {key} in the sample cache")
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """Removes the least recently used segments from the cache until the
+        total size of the cache is within its limit.
+        """
+        entries = []
+        for path in self._directory.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+    def _path_of(self, key: str) -> Path:
+        return self._directory / f"{key}.npz"
+
+
+_cache: Optional[ExportSampleCache] = None
+"""The global export sample cache of the current Blender session."""
+
+
+def get_export_sample_cache() -> ExportSampleCache:
+    """Returns the export sample cache of the current Blender session. The
+    cache lives in the temporary directory of the plugin, which Blender removes
+    when it exits.
+    """
+    global _cache
+
+    if _cache is None:
+        _cache = ExportSampleCache(get_temporary_directory() / "export-cache")
+
+    return _cache
+
+
+@with_context
+def get_segment_keys(
+    drones: Sequence[Object],
+    segments: Sequence[tuple[int, int]],
+    *,
+    options: Any = None,
+    context: Optional[Context] = None,
+) -> list[str]:
+    """Returns content hashes of the given segments of the show that change
+    whenever the positions or the colors of the given drones may change in
+    any frame of the segment.
+
+    Parameters:
+        drones: the drones whose positions and colors the hashes should cover
+        segments: the segments to hash; both ends of each segment are
+            inclusive
+        options: additional options that affect the result
+
+    Returns:
+        the content hashes of the segments
+    """
+    fingerprint = _ShowFingerprint(drones, context=context)
+    return [
+        fingerprint.key_of(
+            segment,
+            position_frames=[],
+            color_frames=range(segment[0], segment[1] + 1),
+            options=options,
+        )
+        for segment in segments
+    ]
+
+
+@with_context
+def get_show_segments(
+    bounds: tuple[int, int], *, context: Optional[Context] = None
+) -> list[tuple[int, int]]:
+    """Splits the given frame range into segments along the storyboard.
+
+    Each storyboard entry becomes a segment, and so does the gap between two
+    consecutive entries, as well as the parts of the range before the first and
+    after the last entry.
+
+    Parameters:
+        bounds: the range of frames to split; both ends are inclusive
+
+    Returns:
+        the segments, in increasing order; both ends of each segment are
+        inclusive and the segments cover the input range without gaps
+    """
+    start, end = bounds
+    result: list[tuple[int, int]] = []
+    cursor = start
+
+    entries = sorted(
+        get_storyboard(context=context).entries, key=lambda e: e.frame_start
+    )
+    for entry in entries:
+        if cursor > end:
+            break
+
+        entry_start, entry_end = entry.frame_start, entry.frame_end
+        if entry_end < cursor:
+            continue
+
+        if entry_start > cursor:
+            result.append((cursor, min(entry_start - 1, end)))
+            cursor = entry_start
+
+        if cursor <= end:
+            result.append((cursor, min(entry_end, end)))
+            cursor = entry_end + 1
+
+    if cursor <= end:
+        result.append((cursor, end))
+
+    return result
+
+
+@with_context
+def sample_show_into_buffers(
+    drones: Sequence[Object],
+    position_frames: Iterable[int],
+    color_frames: Iterable[int],
+    *,
+    yaw: bool = False,
+    redraw: bool = False,
+    cache: Optional[ExportSampleCache] = None,
+    context: Optional[Context] = None,
+    operation: Optional[str] = None,
+    progress: Optional[Callable[[FrameProgressReport], None]] = None,
+) -> tuple[SampleBuffer, SampleBuffer]:
+    """Samples the positions (and optionally the yaw angles) and the colors of
+    the given drones for export, re-using cached samples of the segments of
+    the show whose inputs did not change since they were cached.
+
+    Parameters:
+        drones: the drones to sample
+        position_frames: the frames where positions (and yaw angles) must be
+            sampled
+        color_frames: the frames where colors must be sampled
+        yaw: whether to sample the yaw angles of the drones
+        redraw: whether to redraw the Blender window after each frame where
+            colors are sampled
+        cache: the cache to use; `None` means to sample the entire show
+            without caching
+        context: the Blender execution context; `None` means the current
+            Blender context
+        operation: description of the operation, used in progress reports
+        progress: optional progress callback
+
+    Returns:
+        a sample buffer with positions (and yaw angles) and another sample
+        buffer with colors
+    """
+    assert context is not None  # injected
+
+    position_frames = sorted(set(position_frames))
+    color_frames = sorted(set(color_frames))
+
+    def sample(pos_frames, col_frames):
+        return sample_objects_into_buffers_at_multiple_rates(
+            drones,
+            pos_frames,
+            col_frames,
+            yaw=yaw,
+            redraw=redraw,
+            skip_static_holds=True,
+            context=context,
+            operation=operation,
+            progress=progress,
+        )
+
+    all_frames = position_frames + color_frames
+    if cache is None or not all_frames:
+        return sample(position_frames, color_frames)
+
+    bounds = min(all_frames), max(all_frames)
+    segments = get_show_segments(bounds, context=context)
+    segment_starts = array([segment[0] for segment in segments])
+
+    def segment_indices_of(frames: Sequence[int]) -> NDArray:
+        return searchsorted(segment_starts, asarray(frames), side="right") - 1
+
+    position_segments = segment_indices_of(position_frames)
+    color_segments = segment_indices_of(color_frames)
+
+    fingerprint = _ShowFingerprint(drones, context=context)
+    keys = [
+        fingerprint.key_of(
+            segment,
+            position_frames=[
+                frame
+                for frame, index in zip(position_frames, position_segments)
+                if index == segment_index
+            ],
+            color_frames=[
+                frame
+                for frame, index in zip(color_frames, color_segments)
+                if index == segment_index
+            ],
+            options=(
+                yaw,
+                redraw,
+                context.scene.render.fps,
+                context.scene.skybrush.settings.random_seed,
+            ),
+        )
+        for segment_index, segment in enumerate(segments)
+    ]
+
+    parts: list[Optional[tuple[SampleBuffer, SampleBuffer]]] = [
+        cache.get(key) for key in keys
+    ]
+    missing = {index for index, part in enumerate(parts) if part is None}
+    log.info(
+        f"Re-using {len(segments) - len(missing)} of {len(segments)} show "
+        "segments from the sample cache"
+    )
+
+    if missing:
+        positions, colors = sample(
+            [
+                frame
+                for frame, index in zip(position_frames, position_segments)
+                if index in missing
+            ],
+            [
+                frame
+                for frame, index in zip(color_frames, color_segments)
+                if index in missing
+            ],
+        )
+
+        fps = context.scene.render.fps
+        sampled_position_segments = segment_indices_of(
+            rint(positions.times[: len(positions)] * fps).astype(int)
+        )
+        sampled_color_segments = segment_indices_of(
+            rint(colors.times[: len(colors)] * fps).astype(int)
+        )
+        for index in sorted(missing):
+            part = (
+                positions.select(sampled_position_segments == index),
+                colors.select(sampled_color_segments == index),
+            )
+            cache.put(keys[index], *part)
+            parts[index] = part
+
+    position_parts = [part[0] for part in parts if part is not None]
+    color_parts = [part[1] for part in parts if part is not None]
+    return (
+        SampleBuffer.concatenate(position_parts),
+        SampleBuffer.concatenate(color_parts),
+    )
+
+
+class _ShowFingerprint:
+    """Snapshot of the inputs of the sampling process that allows us to
+    compute content hashes for arbitrary segments of the show.
+
+    Static inputs (e.g., constraint settings or the vertices of formation
+    meshes) are hashed once; keyframes of F-curves are stored as arrays so
+    only the keyframes that affect a given segment are hashed for it.
+    """
+
+    _static_digest: bytes
+    """Digest of the inputs that are relevant to every segment."""
+
+    _curves: list[tuple[bytes, NDArray, Optional[NDArray]]]
+    """Header, keyframe X coordinates and keyframe data of each F-curve of the
+    drones and of their constraint targets. The keyframe data is `None` if the
+    entire curve is relevant for every segment; in this case the curve is
+    hashed into the header.
+    """
+
+    _entries: list[tuple[int, int, bytes]]
+    """Start frame, end frame and digest of each storyboard entry."""
+
+    _light_effects: list[tuple[int, int, bytes]]
+    """Start frame, end frame and digest of each light effect."""
+
+    @with_context
+    def __init__(self, drones: Sequence[Object], *, context: Optional[Context] = None):
+        assert context is not None  # injected
+
+        self._curves = []
+        self._entries = []
+        self._light_effects = []
+
+        static = sha1()
+        static.update(repr(_CACHE_FORMAT_VERSION).encode("utf-8"))
+
+        targets: dict[str, Object] = {}
+        for drone in drones:
+            static.update(self._hash_object(drone).encode("utf-8"))
+            for constraint in drone.constraints:
+                target = getattr(constraint, "target", None)
+                if target is not None:
+                    targets[target.name] = target
+
+        for name in sorted(targets):
+            static.update(self._hash_object(targets[name]).encode("utf-8"))
+            static.update(_hash_mesh_of(targets[name]))
+
+        self._static_digest = static.digest()
+
+        for entry in get_storyboard(context=context).entries:
+            mapping = entry.get_mapping()
+            formation = entry.formation
+            self._entries.append(
+                (
+                    entry.frame_start,
+                    entry.frame_end,
+                    _digest_of(
+                        (
+                            entry.id,
+                            formation.name if formation else None,
+                            mapping,
+                        )
+                    ),
+                )
+            )
+
+        for effect in context.scene.skybrush.light_effects.entries:
+            mesh = effect.mesh
+            image = effect.color_image
+            self._light_effects.append(
+                (
+                    effect.frame_start,
+                    effect.frame_end,
+                    _digest_of(
+                        (
+                            effect.as_dict(),
+                            (self._hash_object(mesh), _hash_mesh_of(mesh).hex())
+                            if mesh
+                            else None,
+                            _describe_image(image) if image else None,
+                            [
+                                _describe_file(path)
+                                for path in _get_function_paths_of(effect)
+                            ],
+                        )
+                    ),
+                )
+            )
+
+    def key_of(
+        self,
+        segment: tuple[int, int],
+        *,
+        position_frames: Sequence[int],
+        color_frames: Sequence[int],
+        options: Any,
+    ) -> str:
+        """Returns the content hash of the given segment.
+
+        Parameters:
+            segment: the start and end frames of the segment, inclusive
+            position_frames: the frames where positions are sampled within the
+                segment
+            color_frames: the frames where colors are sampled within the
+                segment
+            options: additional sampling options that affect the result
+        """
+        start, end = segment
+        digest = sha1(self._static_digest)
+        digest.update(
+            repr((segment, list(position_frames), list(color_frames), options)).encode(
+                "utf-8"
+            )
+        )
+
+        for header, xs, data in self._curves:
+            digest.update(header)
+            if data is not None and len(xs):
+                # Keyframes from the last one at or before the start of the
+                # segment to the first one at or after its end
+                lo = max(int(searchsorted(xs, start, side="right")) - 1, 0)
+                hi = min(int(searchsorted(xs, end, side="left")), len(xs) - 1)
+                digest.update(data[lo : hi + 1].tobytes())
+
+        for entry_start, entry_end, entry_digest in self._entries:
+            if entry_start <= end and entry_end >= start:
+                digest.update(entry_digest)
+
+        for effect_start, effect_end, effect_digest in self._light_effects:
+            if effect_start <= end and effect_end >= start:
+                digest.update(effect_digest)
+
+        return digest.hexdigest()
+
+    def _hash_object(self, obj: Object) -> str:
+        """Registers the F-curves of the given object and returns a string
+        describing its static, frame-independent properties.
+        """
+        parts: list[Any] = [obj.name, obj.type, obj.parent.name if obj.parent else None]
+
+        animated: set[str] = set()
+        anim = obj.animation_data
+        if anim is not None:
+            parts.append(len(anim.drivers))
+            parts.append(len(anim.nla_tracks))
+
+        action = get_action_for_object(obj)
+        if action is not None:
+            for curve in action.fcurves:
+                animated.add(curve.data_path)
+                self._add_curve(obj, curve)
+
+        for name in _STATIC_DATA_PATHS:
+            if name not in animated:
+                value = getattr(obj, name, None)
+                parts.append((name, _to_plain(value)))
+
+        for constraint in obj.constraints:
+            target = getattr(constraint, "target", None)
+            parts.append(
+                (
+                    target.name if target else None,
+                    [
+                        _to_plain(getattr(constraint, prop, None))
+                        for prop in _CONSTRAINT_PROPERTIES
+                    ],
+                )
+            )
+
+        if obj.parent is None and not animated:
+            parts.append(_to_plain(obj.matrix_world))
+
+        return repr(parts)
+
+    def _add_curve(self, obj: Object, curve) -> None:
+        points = curve.keyframe_points
+        num_points = len(points)
+
+        header = (
+            obj.name,
+            curve.data_path,
+            curve.array_index,
+            curve.mute,
+            curve.extrapolation,
+            len(curve.modifiers),
+        )
+
+        co = empty(num_points * 2, dtype=float32)
+        points.foreach_get("co", co)
+        handle_left = empty(num_points * 2, dtype=float32)
+        points.foreach_get("handle_left", handle_left)
+        handle_right = empty(num_points * 2, dtype=float32)
+        points.foreach_get("handle_right", handle_right)
+        interpolation = array(
+            [_code_of_interpolation(p.interpolation, p.easing) for p in points],
+            dtype=float32,
+        )
+
+        data = (
+            array(
+                [
+                    co[0::2],
+                    co[1::2],
+                    handle_left[0::2],
+                    handle_left[1::2],
+                    handle_right[0::2],
+                    handle_right[1::2],
+                    interpolation,
+                ],
+                dtype=float32,
+            ).T.copy()
+            if num_points
+            else empty((0, 7), dtype=float32)
+        )
+        xs = data[:, 0]
+
+        if curve.extrapolation != "CONSTANT" or len(curve.modifiers) > 0:
+            # Cyclic modifiers and extrapolation make every keyframe relevant
+            # to every segment
+            self._curves.append((_digest_of(header) + data.tobytes(), xs, None))
+        else:
+            self._curves.append((_digest_of(header), xs, data))
+
+
+def _code_of_interpolation(interpolation: str, easing: str) -> int:
+    """Returns a stable numeric code for the given interpolation and easing
+    type of a keyframe.
+    """
+    try:
+        return _INTERPOLATION_TYPES.index(interpolation) * len(
+            _EASING_TYPES
+        ) + _EASING_TYPES.index(easing)
+    except ValueError:
+        return -1
+
+
+def _describe_file(path: str) -> Any:
+    """Returns a description of the file at the given path that changes when
+    the file is modified.
+    """
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return (path, None)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def _describe_image(image) -> Any:
+    """Returns a description of the given image that changes when the image
+    is modified.
+    """
+    if image.filepath and not image.is_dirty and not image.packed_file:
+        return (image.name, _describe_file(abspath(image.filepath)))
+
+    # In-memory or modified image; we need to hash the pixels
+    pixels = empty(len(image.pixels), dtype=float32)
+    image.pixels.foreach_get(pixels)
+    return (image.name, tuple(image.size), sha1(pixels.tobytes()).hexdigest())
+
+
+def _digest_of(value: Any) -> bytes:
+    return sha1(
+        json.dumps(value, sort_keys=True, default=repr).encode("utf-8")
+    ).digest()
+
+
+def _get_function_paths_of(effect) -> list[str]:
+    """Returns the absolute paths of the Python modules that contain the
+    custom functions used by the given light effect.
+    """
+    functions = []
+    if effect.type == "FUNCTION":
+        functions.append(effect.color_function)
+    if effect.output == "CUSTOM":
+        functions.append(effect.output_function)
+    if effect.output_y == "CUSTOM":
+        functions.append(effect.output_function_y)
+    return [abspath(function.path) for function in functions if function.path]
+
+
+def _hash_mesh_of(obj: Any) -> bytes:
+    """Returns the digest of the vertex coordinates and vertex groups of the
+    mesh of the given object, or the mesh itself if the argument is a mesh.
+
+    The transformation of the object is not included; it is hashed along with
+    the F-curves of the object by `_ShowFingerprint`.
+    """
+    mesh = getattr(obj, "data", obj)
+    vertices = getattr(mesh, "vertices", None)
+    if vertices is None:
+        return b""
+
+    coords = empty(len(vertices) * 3, dtype=float32)
+    vertices.foreach_get("co", coords)
+
+    digest = sha1(coords.tobytes())
+    vertex_groups = getattr(obj, "vertex_groups", None)
+    if vertex_groups:
+        digest.update(repr([group.name for group in vertex_groups]).encode("utf-8"))
+        digest.update(
+            repr(
+                [
+                    [(element.group, element.weight) for element in vertex.groups]
+                    for vertex in vertices
+                ]
+            ).encode("utf-8")
+        )
+    return digest.digest()
+
+
+def _to_plain(value: Any) -> Any:
+    """Converts Blender math types and other sequences into nested tuples of
+    plain Python values so they can be hashed via their representation.
+    """
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    try:
+        return tuple(_to_plain(item) for item in value)
+    except TypeError:
+        return repr(value)
@@ -1,20 +1,31 @@
 import bpy
 
+from bisect import bisect_left, bisect_right
 from bpy.types import Context, Object
-from collections import defaultdict
+from collections.abc import Sized
+from numpy import array, clip, empty, float64, int64, rint, uint8
+from numpy.typing import NDArray
 from typing import Callable, Iterable, Iterator, Optional, Sequence
 
-from sbstudio.model.color import Color4D
 from sbstudio.model.light_program import LightProgram
-from sbstudio.model.point import Point4D
+from sbstudio.model.samples import SampleBuffer
 from sbstudio.model.trajectory import Trajectory
-from sbstudio.model.yaw import YawSetpoint, YawSetpointList
+from sbstudio.model.yaw import YawSetpointList
 from sbstudio.plugin.colors import get_color_of_drone
+from sbstudio.plugin.model.storyboard import get_storyboard
 from sbstudio.plugin.utils.evaluator import (
     get_position_of_object,
     get_xyz_euler_rotation_of_object,
 )
-from sbstudio.plugin.utils.progress import FrameIterator, FrameProgressReport
+from sbstudio.plugin.tasks.light_effects import suspended_light_effects
+from sbstudio.plugin.utils.light_effect_bake import get_light_effect_bake
+from sbstudio.plugin.utils.image_frames import reading_image_frames_from_disk
+from sbstudio.plugin.utils.progress import (
+    FrameIterator,
+    FrameProgressReport,
+    FrameScheduleIterator,
+)
+from sbstudio.plugin.utils.show_evaluator import AnalyticShowEvaluator
 
 from .decorators import with_context
 
@@ -22,6 +33,8 @@ __all__ = (
     "each_frame_in",
     "frame_range",
     "sample_colors_of_objects",
+    "sample_objects_into_buffer",
+    "sample_objects_into_buffers_at_multiple_rates",
     "sample_positions_of_objects",
     "sample_positions_and_yaw_of_objects",
     "sample_positions_of_objects_in_frame_range",
@@ -30,9 +43,11 @@ __all__ = (
 )
 
 
-def _to_int_255(value: float) -> int:
-    """Convert [0,1] float to clamped [0,255] int."""
-    return int(max(0, min(255, round(value * 255))))
+def _to_uint8_array(values: Sequence[Sequence[float]]) -> NDArray[uint8]:
+    """Converts a sequence of RGB colors in the [0; 1] range to a clamped
+    array of integers in the [0; 255] range.
+    """
+    return clip(rint(array(values, dtype=float64) * 255), 0, 255).astype(uint8)
 
 
 @with_context
@@ -82,6 +97,313 @@ def each_frame_in(
         yield frame, time
 
 
+@with_context
+def sample_objects_into_buffer(
+    objects: Sequence[Object],
+    frames: Iterable[int],
+    *,
+    positions: bool = True,
+    colors: bool = False,
+    yaw: bool = False,
+    redraw: bool = False,
+    skip_static_holds: bool = False,
+    context: Optional[Context] = None,
+) -> SampleBuffer:
+    """Samples the positions, colors and/or yaw angles of the given Blender
+    objects at the given frames into a preallocated columnar sample buffer.
+
+    This is the most memory-efficient way of sampling a show as no Python
+    objects are created per drone and per frame; the samples are written
+    directly into NumPy arrays.
+
+    Parameters:
+        objects: the Blender objects to process
+        frames: an iterable yielding the indices of the frames to process.
+            The iterable is converted into a list first if it has no length.
+        positions: whether to sample the positions of the objects
+        colors: whether to sample the colors of the objects
+        yaw: whether to sample the yaw angles of the objects
+        redraw: whether to redraw the Blender window after each frame is set
+            (this is necessary to ensure that the light colors are updated
+            correctly for video-based light effects)
+        skip_static_holds: whether to replace the frames inside storyboard
+            entries where all the drones are provably stationary with the
+            first and last of these frames. Applies only if positions are
+            sampled alone. Use it only if the trajectories are simplified
+            afterwards as the samples will not be uniformly spaced in time.
+        context: the Blender execution context; `None` means the current
+            Blender context
+
+    Returns:
+        the sample buffer; the i-th drone in the buffer corresponds to the
+        i-th object in the input
+    """
+    assert context is not None  # injected
+
+    positions_only = positions and not colors and not yaw
+    evaluator = (
+        AnalyticShowEvaluator(objects, context=context) if positions_only else None
+    )
+
+    if evaluator is not None and skip_static_holds:
+        if isinstance(frames, FrameIterator):
+            # Do not consume the iterator of the caller as it reports progress;
+            # reduce its frames and report progress on the reduced list
+            frames = frames.reschedule(
+                _replace_static_holds_with_endpoints(
+                    frames.get_frames(), evaluator, context
+                )
+            )
+        else:
+            frames = _replace_static_holds_with_endpoints(frames, evaluator, context)
+    elif not isinstance(frames, Sized):
+        frames = list(frames)
+
+    buffer = SampleBuffer(
+        len(frames), len(objects), positions=positions, colors=colors, yaw=yaw
+    )
+
+    if evaluator is not None:
+        _sample_positions_into(buffer, objects, frames, evaluator, context=context)
+    else:
+        with reading_image_frames_from_disk():
+            for _, time in each_frame_in(frames, context=context, redraw=redraw):
+                _sample_objects_into(buffer, objects, time)
+
+    return buffer
+
+
+def _sample_positions_into(
+    buffer: SampleBuffer,
+    objects: Sequence[Object],
+    frames: Iterable[int],
+    evaluator: AnalyticShowEvaluator,
+    *,
+    context: Context,
+) -> None:
+    """Samples the positions of the given objects at the given frames into the
+    given buffer, using the analytical show evaluator for drones that are
+    driven only by their transition constraints.
+
+    Blender is asked to seek to each frame only if there are drones that the
+    analytical evaluator cannot handle, and only those drones are read back
+    from Blender.
+    """
+    assert buffer.positions is not None
+
+    fallback_indices = evaluator.unsupported_indices
+    fallback_objects = [objects[index] for index in fallback_indices]
+
+    frame_numbers = empty(buffer.capacity, dtype=int64)
+    if fallback_objects:
+        for frame, time in each_frame_in(frames, context=context):
+            index = buffer.next_frame(time)
+            frame_numbers[index] = frame
+            buffer.positions[index, fallback_indices] = [
+                get_position_of_object(obj) for obj in fallback_objects
+            ]
+    else:
+        fps = context.scene.render.fps
+        for frame in frames:
+            index = buffer.next_frame(frame / fps)
+            frame_numbers[index] = frame
+
+    evaluator.evaluate_into(buffer.positions, frame_numbers[: len(buffer)])
+
+
+def _replace_static_holds_with_endpoints(
+    frames: Iterable[int], evaluator: AnalyticShowEvaluator, context: Context
+) -> list[int]:
+    """Removes the frames that fall inside storyboard entries where all the
+    drones are provably stationary, except the first and the last such frame
+    of each entry, so each hold is represented by two samples on the original
+    sampling grid.
+
+    An entry is considered static if all the drones are handled by the
+    analytical evaluator (which implies that none of the formation markers
+    are animated) and none of the constraint influences change between the
+    first and the last frame of the entry.
+    """
+    frames = sorted(set(frames))
+    if not frames:
+        return frames
+
+    to_keep = [True] * len(frames)
+    for entry in get_storyboard(context=context).entries:
+        # Indices of the first and the last frame inside the entry
+        lo = bisect_left(frames, entry.frame_start)
+        hi = bisect_right(frames, entry.frame_end) - 1
+        if hi - lo > 1 and evaluator.is_static_between(frames[lo], frames[hi]):
+            to_keep[lo + 1 : hi] = [False] * (hi - lo - 1)
+
+    return [frame for frame, keep in zip(frames, to_keep) if keep]
+
+
+@with_context
+def sample_objects_into_buffers_at_multiple_rates(
+    objects: Sequence[Object],
+    position_frames: Iterable[int],
+    color_frames: Iterable[int],
+    *,
+    yaw: bool = False,
+    redraw: bool = False,
+    skip_static_holds: bool = False,
+    context: Optional[Context] = None,
+    operation: Optional[str] = None,
+    progress: Optional[Callable[[FrameProgressReport], None]] = None,
+) -> tuple[SampleBuffer, SampleBuffer]:
+    """Samples the positions (and optionally the yaw angles) and the colors
+    of the given Blender objects at two different sets of frames, visiting
+    each frame in the union of the two sets only once.
+
+    Light effects are suspended while seeking to frames where only positions
+    are needed. When yaw angles are not requested, positions on these frames
+    are computed with the analytical show evaluator for drones driven only by
+    their transition constraints, and Blender is not asked to seek to the
+    frame at all if every drone can be evaluated that way.
+
+    Colors are read from the light effect bake in the frames where the bake
+    is up-to-date; these frames are treated as if only positions were needed
+    in them.
+
+    Parameters:
+        objects: the Blender objects to process
+        position_frames: the frames where positions (and yaw angles) must be
+            sampled
+        color_frames: the frames where colors must be sampled
+        yaw: whether to sample the yaw angles of the objects
+        redraw: whether to redraw the Blender window after each frame where
+            colors are sampled (this is necessary to ensure that the light
+            colors are updated correctly for video-based light effects)
+        skip_static_holds: whether to replace the position frames inside
+            storyboard entries where all the drones are provably stationary
+            with the first and last of these frames. Applies only if yaw
+            angles are not sampled.
+        context: the Blender execution context; `None` means the current
+            Blender context
+        operation: description of the operation, used in progress reports
+        progress: optional progress callback
+
+    Returns:
+        a sample buffer with positions (and yaw angles) and another sample
+        buffer with colors
+    """
+    assert context is not None  # injected
+
+    evaluator = None if yaw else AnalyticShowEvaluator(objects, context=context)
+    if evaluator is not None and skip_static_holds:
+        position_frames = _replace_static_holds_with_endpoints(
+            position_frames, evaluator, context
+        )
+
+    position_frames = set(position_frames)
+    color_frames = set(color_frames)
+    schedule = FrameScheduleIterator(
+        sorted(position_frames | color_frames),
+        operation=operation,
+        progress=progress,
+    )
+
+    positions = SampleBuffer(len(position_frames), len(objects), yaw=yaw)
+    colors = SampleBuffer(len(color_frames), len(objects), positions=False, colors=True)
+
+    scene = context.scene
+    fps = scene.render.fps
+
+    bake = get_light_effect_bake(validate=True, context=context)
+    bake_columns = (
+        bake.columns_of([obj.name for obj in objects]) if bake is not None else None
+    )
+
+    can_skip_seeking = evaluator is not None and not len(evaluator.unsupported_indices)
+    analytic_rows: list[int] = []
+    analytic_frames: list[int] = []
+
+    with reading_image_frames_from_disk():
+        for frame in schedule:
+            needs_colors = frame in color_frames
+            time = frame / fps
+
+            if needs_colors and bake is not None and bake_columns is not None:
+                baked_colors = bake.colors_at(frame)
+                if baked_colors is not None:
+                    # Colors are taken from the bake so we need the frame only for
+                    # the positions, if at all
+                    assert colors.colors is not None
+                    index = colors.next_frame(time)
+                    colors.colors[index] = baked_colors[bake_columns, :3]
+                    needs_colors = False
+                    if frame not in position_frames:
+                        continue
+
+            if needs_colors:
+                scene.frame_set(frame)
+                if redraw:
+                    bpy.ops.wm.redraw_timer(type="DRAW_WIN_SWAP", iterations=0)
+            elif evaluator is not None:
+                # Only positions are needed and the analytical evaluator handles
+                # them; seek only if some drones still need Blender
+                if not can_skip_seeking:
+                    with suspended_light_effects():
+                        scene.frame_set(frame)
+                    _sample_objects_into(positions, objects, time)
+                    analytic_rows.append(len(positions) - 1)
+                else:
+                    analytic_rows.append(positions.next_frame(time))
+                analytic_frames.append(frame)
+                continue
+            else:
+                with suspended_light_effects():
+                    scene.frame_set(frame)
+
+            if frame in position_frames:
+                _sample_objects_into(positions, objects, time)
+            if needs_colors:
+                _sample_objects_into(colors, objects, time)
+
+    if evaluator is not None and analytic_rows:
+        assert positions.positions is not None
+        evaluator.evaluate_into(positions.positions, analytic_frames, analytic_rows)
+
+    return positions, colors
+
+
+def _sample_objects_into(
+    buffer: SampleBuffer, objects: Sequence[Object], time: float
+) -> None:
+    """Samples the current state of the given objects into the next frame slot
+    of the given buffer.
+    """
+    index = buffer.next_frame(time)
+    if not objects:
+        return
+
+    if buffer.positions is not None:
+        buffer.positions[index] = [get_position_of_object(obj) for obj in objects]
+
+    if buffer.colors is not None:
+        buffer.colors[index] = _to_uint8_array(
+            [get_color_of_drone(obj)[:3] for obj in objects]
+        )
+
+    if buffer.yaw is not None:
+        # note the conversion from Blender CCW to Skybrush CW representation
+        buffer.yaw[index] = [
+            -get_xyz_euler_rotation_of_object(obj)[2] for obj in objects
+        ]
+
+
+def _keys_of_objects(
+    objects: Sequence[Object], buffer: SampleBuffer, *, by_name: bool
+) -> list[Object | str]:
+    """Returns the keys of the result dictionaries of the sampling functions
+    for the given objects, or an empty list if no frames were sampled.
+    """
+    if not len(buffer):
+        return []
+    return [obj.name if by_name else obj for obj in objects]
+
+
 @with_context
 def sample_positions_of_objects(
     objects: Sequence[Object],
@@ -89,6 +411,7 @@ def sample_positions_of_objects(
     *,
     by_name: bool = False,
     simplify: bool = False,
+    skip_static_holds: bool = False,
     context: Optional[Context] = None,
 ) -> dict[Object, Trajectory]:
     """Samples the positions of the given Blender objects at the given frames,
@@ -105,21 +428,21 @@ def sample_positions_of_objects(
             enabled, the resulting trajectories might not contain samples for
             all the input frames; excess samples that are identical to previous
             ones will be removed.
+        skip_static_holds: whether to skip the frames inside storyboard
+            entries where all the drones are provably stationary, except the
+            first and the last one. The samples will not be uniformly spaced
+            in time if this option is enabled.
 
     Returns:
         a dictionary mapping the objects to their trajectories
     """
-    trajectories = defaultdict(Trajectory)
-
-    for _, time in each_frame_in(frames, context=context):
-        for obj in objects:
-            key = obj.name if by_name else obj
-            trajectories[key].append(Point4D(time, *get_position_of_object(obj)))
-
-    if simplify:
-        return {key: value.simplify_in_place() for key, value in trajectories.items()}
-    else:
-        return dict(trajectories)
+    buffer = sample_objects_into_buffer(
+        objects, frames, skip_static_holds=skip_static_holds, context=context
+    )
+    return {
+        key: buffer.trajectory_of(index, simplify=simplify)
+        for index, key in enumerate(_keys_of_objects(objects, buffer, by_name=by_name))
+    }
 
 
 @with_context
@@ -149,36 +472,14 @@ def sample_positions_and_yaw_of_objects(
     Returns:
         a dictionaries mapping the objects to their trajectories and yaw setpoints
     """
-    trajectories = defaultdict(Trajectory)
-    yaw_setpoints = defaultdict(YawSetpointList)
-
-    for _, time in each_frame_in(frames, context=context):
-        for obj in objects:
-            key = obj.name if by_name else obj
-            trajectories[key].append(Point4D(time, *get_position_of_object(obj)))
-            rotation = get_xyz_euler_rotation_of_object(obj)
-            # note the conversion from Blender CCW to Skybrush CW representation
-            yaw_setpoints[key].append(YawSetpoint(time, -rotation[2]))
-
-    # Ensure that the yaw curve makes sense even if the extracted yaw angles
-    # "wrap around" the boundary between -180 and 180 degrees
-    for yaw in yaw_setpoints.values():
-        yaw.unwrap()
-
-    if simplify:
-        return {
-            key: (
-                trajectory.simplify_in_place(),
-                yaw_setpoints[key].simplify(),
-            )
-            for key, trajectory in trajectories.items()
-        }
-
-    else:
-        return {
-            key: (trajectory, yaw_setpoints[key])
-            for key, trajectory in trajectories.items()
-        }
+    buffer = sample_objects_into_buffer(objects, frames, yaw=True, context=context)
+    return {
+        key: (
+            buffer.trajectory_of(index, simplify=simplify),
+            buffer.yaw_setpoints_of(index, simplify=simplify),
+        )
+        for index, key in enumerate(_keys_of_objects(objects, buffer, by_name=by_name))
+    }
 
 
 @with_context
@@ -212,25 +513,13 @@ def sample_colors_of_objects(
     Returns:
         a dictionary mapping the objects to their light programs
     """
-    lights = defaultdict(LightProgram)
-
-    for _, time in each_frame_in(frames, context=context, redraw=redraw):
-        for obj in objects:
-            key = obj.name if by_name else obj
-            color = get_color_of_drone(obj)
-            lights[key].append(
-                Color4D(
-                    time,
-                    _to_int_255(color[0]),
-                    _to_int_255(color[1]),
-                    _to_int_255(color[2]),
-                )
-            )
-
-    if simplify:
-        return {key: value.simplify() for key, value in lights.items()}
-    else:
-        return dict(lights)
+    buffer = sample_objects_into_buffer(
+        objects, frames, positions=False, colors=True, redraw=redraw, context=context
+    )
+    return {
+        key: buffer.light_program_of(index, simplify=simplify)
+        for index, key in enumerate(_keys_of_objects(objects, buffer, by_name=by_name))
+    }
 
 
 @with_context
@@ -265,33 +554,16 @@ def sample_positions_and_colors_of_objects(
     Returns:
         a dictionary mapping the objects to their trajectories and light programs
     """
-    trajectories = defaultdict(Trajectory)
-    lights = defaultdict(LightProgram)
-
-    for _, time in each_frame_in(frames, context=context, redraw=redraw):
-        for obj in objects:
-            key = obj.name if by_name else obj
-            pos = get_position_of_object(obj)
-            color = get_color_of_drone(obj)
-            trajectories[key].append(Point4D(time, *pos))
-            lights[key].append(
-                Color4D(
-                    time,
-                    _to_int_255(color[0]),
-                    _to_int_255(color[1]),
-                    _to_int_255(color[2]),
-                )
-            )
-
-    if simplify:
-        return {
-            key: (trajectory.simplify_in_place(), lights[key].simplify())
-            for key, trajectory in trajectories.items()
-        }
-    else:
-        return {
-            key: (trajectory, lights[key]) for key, trajectory in trajectories.items()
-        }
+    buffer = sample_objects_into_buffer(
+        objects, frames, colors=True, redraw=redraw, context=context
+    )
+    return {
+        key: (
+            buffer.trajectory_of(index, simplify=simplify),
+            buffer.light_program_of(index, simplify=simplify),
+        )
+        for index, key in enumerate(_keys_of_objects(objects, buffer, by_name=by_name))
+    }
 
 
 @with_context
@@ -327,47 +599,17 @@ def sample_positions_colors_and_yaw_of_objects(
     Returns:
         a dictionary mapping the objects to their trajectories and light programs
     """
-    trajectories = defaultdict(Trajectory)
-    lights = defaultdict(LightProgram)
-    yaw_setpoints = defaultdict(YawSetpointList)
-
-    for _, time in each_frame_in(frames, context=context, redraw=redraw):
-        for obj in objects:
-            key = obj.name if by_name else obj
-            pos = get_position_of_object(obj)
-            color = get_color_of_drone(obj)
-            rotation = get_xyz_euler_rotation_of_object(obj)
-            trajectories[key].append(Point4D(time, *pos))
-            lights[key].append(
-                Color4D(
-                    time,
-                    _to_int_255(color[0]),
-                    _to_int_255(color[1]),
-                    _to_int_255(color[2]),
-                )
-            )
-            # note the conversion from Blender CCW to Skybrush CW representation
-            yaw_setpoints[key].append(YawSetpoint(time, -rotation[2]))
-
-    # Ensure that the yaw curve makes sense even if the extracted yaw angles
-    # "wrap around" the boundary between -180 and 180 degrees
-    for yaw in yaw_setpoints.values():
-        yaw.unwrap()
-
-    if simplify:
-        return {
-            key: (
-                trajectory.simplify_in_place(),
-                lights[key].simplify(),
-                yaw_setpoints[key].simplify(),
-            )
-            for key, trajectory in trajectories.items()
-        }
-    else:
-        return {
-            key: (trajectory, lights[key], yaw_setpoints[key])
-            for key, trajectory in trajectories.items()
-        }
+    buffer = sample_objects_into_buffer(
+        objects, frames, colors=True, yaw=True, redraw=redraw, context=context
+    )
+    return {
+        key: (
+            buffer.trajectory_of(index, simplify=simplify),
+            buffer.light_program_of(index, simplify=simplify),
+            buffer.yaw_setpoints_of(index, simplify=simplify),
+        )
+        for index, key in enumerate(_keys_of_objects(objects, buffer, by_name=by_name))
+    }
 
 
 @with_context
@@ -0,0 +1,431 @@
+"""Analytical evaluator that computes the positions of storyboard-driven drones
+at arbitrary frames without asking Blender to evaluate the scene.
+
+Drones in a show are typically placed at a fixed base position and driven
+around by the "copy location" transition constraints that are created when
+the transitions of the storyboard are recalculated. The positions of such
+drones depend only on the positions of their transition targets and on the
+influence F-curves of their constraints, both of which can be snapshotted
+into NumPy arrays and evaluated for many frames at once. Drones that have
+any other animation or constraint that the evaluator cannot model are
+reported as unsupported and must be evaluated by Blender as usual.
+"""
+
+from bpy.types import Context, Object
+from mathutils import Vector
+from numpy import (
+    array,
+    asarray,
+    float64,
+    flatnonzero,
+    int32,
+    linalg,
+    newaxis,
+    zeros,
+)
+from numpy.typing import ArrayLike, NDArray
+from typing import Optional, Sequence
+
+from sbstudio.math.fcurves import BEZIER, CONSTANT, LINEAR, FCurveBatch, Keyframe
+from sbstudio.plugin.actions import get_action_for_object
+
+from .decorators import with_context
+from .transition import is_transition_constraint
+
+__all__ = ("AnalyticShowEvaluator",)
+
+
+_INTERPOLATION_CODES = {"CONSTANT": CONSTANT, "LINEAR": LINEAR, "BEZIER": BEZIER}
+"""Mapping from Blender keyframe interpolation types to the interpolation
+codes of the F-curve batch evaluator. Keyframes with any other interpolation
+type make the owning drone unsupported.
+"""
+
+_TRANSFORM_DATA_PATHS = frozenset(
+    (
+        "location",
+        "rotation_euler",
+        "rotation_quaternion",
+        "rotation_axis_angle",
+        "scale",
+        "delta_location",
+        "delta_rotation_euler",
+        "delta_rotation_quaternion",
+        "delta_scale",
+    )
+)
+"""Data paths of F-curves that animate the transformation of an object."""
+
+_POSITION_DATA_PATHS = frozenset(("location", "delta_location"))
+"""Data paths of F-curves that animate the position of an object."""
+
+_MAX_VALUES_PER_CHUNK = 1 << 20
+"""Maximum number of curve or drone values (i.e. frames times the number of
+influence curves or drones, whichever is larger) to evaluate at once, to keep
+the size of the intermediate arrays bounded for large shows.
+"""
+
+_SELF_CHECK_TOLERANCE = 1e-4
+"""Maximum allowed distance between the analytically computed position of a
+drone and the position reported by Blender for the current frame; drones
+with larger deviations are treated as unsupported.
+"""
+
+
+class _UnsupportedError(Exception):
+    """Raised internally when a drone, one of its constraints or one of its
+    targets cannot be modelled by the analytical evaluator.
+    """
+
+    pass
+
+
+class AnalyticShowEvaluator:
+    """Analytical evaluator of the positions of a fixed set of drones.
+
+    The evaluator takes a snapshot of the base positions of the drones, the
+    world coordinates of the targets of their transition constraints and the
+    keyframes of the influence curves of these constraints when it is
+    constructed. It is assumed that the scene is not modified while the
+    evaluator is in use.
+    """
+
+    _base_positions: NDArray[float64]
+    """Base positions of all the drones; shape is ``(D, 3)``."""
+
+    _supported: NDArray
+    """Boolean mask that tells which drones are handled by the evaluator;
+    shape is ``(D,)``.
+    """
+
+    _influences: FCurveBatch
+    """Influence curves of all the transition constraints of all the supported
+    drones, in the order they appear in the constraint stacks of the drones.
+    """
+
+    _drone_of_constraint: NDArray[int32]
+    """Index of the drone that owns each constraint; shape is ``(C,)``."""
+
+    _layer_of_constraint: NDArray[int32]
+    """Index of each constraint within the constraint stack of its owner;
+    shape is ``(C,)``.
+    """
+
+    _targets: NDArray[float64]
+    """World coordinates of the targets of each constraint; shape is
+    ``(C, 3)``.
+    """
+
+    @with_context
+    def __init__(self, drones: Sequence[Object], *, context: Optional[Context] = None):
+        """Constructor.
+
+        Parameters:
+            drones: the drones to evaluate
+            context: the Blender execution context; `None` means the current
+                Blender context. The current frame of the scene in the context
+                is used to verify the analytical model against the positions
+                that Blender has already evaluated.
+        """
+        assert context is not None  # injected
+
+        num_drones = len(drones)
+        self._base_positions = zeros((num_drones, 3), dtype=float64)
+        self._supported = zeros(num_drones, dtype=bool)
+
+        curves: list[list[Keyframe]] = []
+        drone_of_constraint: list[int] = []
+        layer_of_constraint: list[int] = []
+        targets: list[Vector] = []
+        target_cache: dict[tuple[str, str], Vector] = {}
+
+        for index, drone in enumerate(drones):
+            try:
+                base, layers = _snapshot_drone(drone, target_cache)
+            except _UnsupportedError:
+                continue
+
+            self._base_positions[index] = base
+            self._supported[index] = True
+            for layer, (target, curve) in enumerate(layers):
+                curves.append(curve)
+                drone_of_constraint.append(index)
+                layer_of_constraint.append(layer)
+                targets.append(target)
+
+        self._influences = FCurveBatch(curves)
+        self._drone_of_constraint = array(drone_of_constraint, dtype=int32)
+        self._layer_of_constraint = array(layer_of_constraint, dtype=int32)
+        self._targets = (
+            array(targets, dtype=float64) if targets else zeros((0, 3), dtype=float64)
+        )
+
+        self._verify(drones, context.scene.frame_current)
+
+    @property
+    def supported_indices(self) -> NDArray:
+        """Returns the indices of the drones that are handled by the evaluator."""
+        return flatnonzero(self._supported)
+
+    @property
+    def unsupported_indices(self) -> NDArray:
+        """Returns the indices of the drones that must be evaluated by Blender."""
+        return flatnonzero(~self._supported)
+
+    def is_static_between(self, start: float, end: float) -> bool:
+        """Returns whether all the drones are provably stationary between the
+        given frames, both ends inclusive.
+
+        This is the case if all the drones are handled by the evaluator and
+        the influences of their transition constraints do not change in the
+        given interval; the targets of the constraints are always static.
+        """
+        if len(self.unsupported_indices):
+            return False
+        return bool(self._influences.is_constant_between(start, end).all())
+
+    def evaluate(self, frames: ArrayLike) -> NDArray[float64]:
+        """Evaluates the positions of all the drones at the given frames.
+
+        Positions of unsupported drones are left at zero in the result.
+
+        Parameters:
+            frames: the frames to evaluate the positions at; shape is ``(F,)``
+
+        Returns:
+            the positions of the drones; shape is ``(F, D, 3)``
+        """
+        frames = asarray(frames, dtype=float64)
+        result = zeros((len(frames), len(self._supported), 3), dtype=float64)
+        chunk_size = self._get_frames_per_chunk()
+        for start in range(0, len(frames), chunk_size):
+            end = start + chunk_size
+            result[start:end] = self._evaluate_chunk(frames[start:end])
+        return result
+
+    def evaluate_into(
+        self, out: NDArray, frames: ArrayLike, rows: Optional[ArrayLike] = None
+    ) -> None:
+        """Evaluates the positions of the supported drones at the given frames
+        and writes them into the given array. Columns that belong to
+        unsupported drones are left intact.
+
+        Parameters:
+            out: the array to write the positions into; shape is
+                ``(R, D, 3)``
+            frames: the frames to evaluate the positions at; shape is ``(F,)``
+            rows: the indices of the rows of the output array corresponding
+                to the frames; `None` means the first F rows
+        """
+        frames = asarray(frames, dtype=float64)
+        rows = range(len(frames)) if rows is None else asarray(rows)
+        columns = self.supported_indices
+        chunk_size = self._get_frames_per_chunk()
+        for start in range(0, len(frames), chunk_size):
+            end = start + chunk_size
+            positions = self._evaluate_chunk(frames[start:end])
+            out[asarray(rows[start:end])[:, newaxis], columns] = positions[:, columns]
+
+    def _get_frames_per_chunk(self) -> int:
+        """Returns the number of frames to evaluate at once such that the
+        intermediate arrays of a chunk stay bounded in size.
+        """
+        width = max(len(self._influences), len(self._supported), 1)
+        return max(_MAX_VALUES_PER_CHUNK // width, 1)
+
+    def _evaluate_chunk(self, frames: NDArray[float64]) -> NDArray[float64]:
+        positions = self._base_positions[newaxis, :, :].repeat(len(frames), axis=0)
+        if not len(self._influences):
+            return positions
+
+        weights = self._influences.evaluate(frames)[:, :, newaxis]
+        num_layers = int(self._layer_of_constraint.max()) + 1
+
+        # Each drone has at most one constraint per layer so the constraints
+        # of a single layer can be applied to all the drones at once
+        for layer in range(num_layers):
+            mask = self._layer_of_constraint == layer
+            drones = self._drone_of_constraint[mask]
+            w = weights[:, mask]
+            targets = self._targets[mask]
+            positions[:, drones] = (1 - w) * positions[:, drones] + w * targets
+
+        return positions
+
+    def _verify(self, drones: Sequence[Object], frame: int) -> None:
+        """Compares the analytically computed positions of the supported drones
+        with the positions evaluated by Blender at the given frame, and marks
+        the drones that do not match as unsupported.
+        """
+        indices = self.supported_indices
+        if not len(indices):
+            return
+
+        expected = array(
+            [tuple(drones[i].matrix_world.translation) for i in indices],
+            dtype=float64,
+        )
+        actual = self.evaluate([frame])[0, indices]
+        errors = linalg.norm(actual - expected, axis=1)
+        self._supported[indices[errors > _SELF_CHECK_TOLERANCE]] = False
+
+
+def _snapshot_drone(
+    drone: Object, target_cache: dict[tuple[str, str], Vector]
+) -> tuple[Vector, list[tuple[Vector, list[Keyframe]]]]:
+    """Takes a snapshot of the base position of a drone and of the targets and
+    influence curves of its transition constraints.
+
+    Raises:
+        _UnsupportedError: if the drone cannot be modelled analytically
+    """
+    if drone.parent is not None:
+        raise _UnsupportedError("drone has a parent")
+
+    action = _get_action_of_static_object(drone, prohibited=_POSITION_DATA_PATHS)
+
+    layers: list[tuple[Vector, list[Keyframe]]] = []
+    for constraint in drone.constraints:
+        if getattr(constraint, "mute", False):
+            continue
+        if not is_transition_constraint(constraint):
+            raise _UnsupportedError("drone has a non-transition constraint")
+        _ensure_constraint_is_plain(constraint)
+
+        target = _get_target_position(constraint, target_cache)
+        curve = _snapshot_influence_curve(drone, action, constraint)
+        layers.append((target, curve))
+
+    return drone.matrix_basis.translation.copy(), layers
+
+
+def _get_action_of_static_object(
+    obj: Object, *, prohibited: frozenset[str] = _TRANSFORM_DATA_PATHS
+):
+    """Returns the action of an object after checking that the object has no
+    drivers, NLA tracks or F-curves that would move it.
+
+    Parameters:
+        obj: the object to check
+        prohibited: data paths that are not allowed to be animated
+
+    Raises:
+        _UnsupportedError: if the object is animated in a way that the
+            analytical evaluator cannot model
+    """
+    anim = obj.animation_data
+    if anim is None:
+        return None
+
+    if anim.drivers or anim.nla_tracks:
+        raise _UnsupportedError("object has drivers or NLA tracks")
+
+    action = get_action_for_object(obj)
+    if action is not None:
+        for curve in action.fcurves:
+            if curve.data_path in prohibited:
+                raise _UnsupportedError("object has animated transformation")
+
+    return action
+
+
+def _ensure_constraint_is_plain(constraint) -> None:
+    """Checks that a transition constraint uses the default settings that the
+    analytical evaluator assumes.
+    """
+    if not (constraint.use_x and constraint.use_y and constraint.use_z):
+        raise _UnsupportedError("constraint does not copy all axes")
+    if constraint.invert_x or constraint.invert_y or constraint.invert_z:
+        raise _UnsupportedError("constraint inverts an axis")
+    if constraint.use_offset:
+        raise _UnsupportedError("constraint uses offset")
+    if constraint.target_space != "WORLD" or constraint.owner_space != "WORLD":
+        raise _UnsupportedError("constraint is not in world space")
+
+
+def _get_target_position(
+    constraint, target_cache: dict[tuple[str, str], Vector]
+) -> Vector:
+    """Returns the world coordinates of the target of a transition constraint.
+
+    Raises:
+        _UnsupportedError: if the target is missing or it may move in time
+    """
+    target = constraint.target
+    if target is None:
+        raise _UnsupportedError("constraint has no target")
+
+    key = (target.name, constraint.subtarget)
+    position = target_cache.get(key)
+    if position is None:
+        position = _evaluate_target_position(target, constraint.subtarget)
+        target_cache[key] = position
+
+    return position
+
+
+def _evaluate_target_position(target: Object, subtarget: str) -> Vector:
+    if target.parent is not None or len(target.constraints) > 0:
+        raise _UnsupportedError("target has a parent or constraints")
+
+    _get_action_of_static_object(target)
+
+    if not subtarget:
+        return target.matrix_world.translation.copy()
+
+    # The target is a vertex group of a mesh; Blender uses the weighted
+    # average of the vertices in the group as the target
+    mesh = target.data
+    if (
+        target.type != "MESH"
+        or len(target.modifiers) > 0
+        or getattr(mesh, "shape_keys", None) is not None
+    ):
+        raise _UnsupportedError("target mesh may be deformed")
+
+    group = target.vertex_groups.get(subtarget)
+    if group is None:
+        raise _UnsupportedError("target vertex group does not exist")
+
+    total, total_weight = Vector((0.0, 0.0, 0.0)), 0.0
+    for vertex in mesh.vertices:
+        for element in vertex.groups:
+            if element.group == group.index and element.weight > 0:
+                total += vertex.co * element.weight
+                total_weight += element.weight
+
+    if total_weight <= 0:
+        raise _UnsupportedError("target vertex group is empty")
+
+    return target.matrix_world @ (total / total_weight)
+
+
+def _snapshot_influence_curve(drone: Object, action, constraint) -> list[Keyframe]:
+    """Takes a snapshot of the keyframes of the influence curve of a
+    constraint. Constraints with no influence curve are represented with a
+    single keyframe holding their static influence.
+    """
+    data_path = f"constraints[{constraint.name!r}].influence".replace("'", '"')
+    curve = None
+    if action is not None:
+        for candidate in action.fcurves:
+            if candidate.data_path == data_path:
+                curve = candidate
+                break
+
+    if curve is None or not curve.keyframe_points:
+        value = float(constraint.influence)
+        return [(0.0, value, 0.0, value, 0.0, value, CONSTANT)]
+
+    if curve.mute or len(curve.modifiers) > 0 or curve.extrapolation != "CONSTANT":
+        raise _UnsupportedError("influence curve cannot be evaluated")
+
+    result: list[Keyframe] = []
+    for point in curve.keyframe_points:
+        code = _INTERPOLATION_CODES.get(point.interpolation)
+        if code is None:
+            raise _UnsupportedError("unsupported keyframe interpolation")
+        result.append((*point.co, *point.handle_left, *point.handle_right, code))
+
+    result.sort(key=lambda keyframe: keyframe[0])
+    return result
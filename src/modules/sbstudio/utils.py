@@ -1,5 +1,6 @@
 import importlib.util
 import numpy as np
+import os
 
 from collections import OrderedDict
 from collections.abc import Callable, Iterable, MutableMapping, Sequence
@@ -7,6 +8,7 @@ from functools import wraps
 from pathlib import Path
 from typing import Any, Generic, Optional, TypeVar
 
+from sbstudio.math.simplification import find_points_to_keep_in_path
 from sbstudio.model.types import Coordinate3D
 
 
@@ -15,12 +17,15 @@ __all__ = (
     "constant",
     "create_path_and_open",
     "distance_sq_of",
+    "is_vectorized",
     "simplify_path",
+    "vectorized",
 )
 
 T = TypeVar("T")
 K = TypeVar("K")
 V = TypeVar("V")
+C = TypeVar("C", bound=Callable[..., Any])
 
 
 def consecutive_pairs(
@@ -134,7 +139,10 @@ def simplify_path(
     points, using a distance function and an acceptable error term.
 
     The function uses the Ramer-Douglas-Peucker algorithm for simplifying the
-    line segments.
+    line segments. This is a compatibility wrapper around
+    `find_points_to_keep_in_path()`; prefer calling that function directly
+    with a deviation function that operates on NumPy arrays when the points
+    can be represented as rows of an array.
 
     Parameters:
         points: a sequence of points. Each point may be an arbitrary object
@@ -165,66 +173,73 @@ def simplify_path(
         [eq_func(u, v) for u, v in consecutive_pairs(points)], dtype=bool
     )
 
-    to_keep = np.full(len(points), False)
-    to_keep[0] = True
-    to_keep[-1] = True
-    to_keep[np.diff(eq_with_next).nonzero()[0] + 1] = True  # type: ignore
+    def deviation_func(points: Sequence[T], start: int, end: int) -> np.ndarray:
+        dists = distance_func(points[start : (end + 1)], points[start], points[end])
+        return np.asarray(dists, dtype=float)[1:-1]
 
-    result = []
+    to_keep = find_points_to_keep_in_path(points, eps, deviation_func, eq_with_next)
+    return factory([points[index] for index in to_keep.nonzero()[0]])  # type: ignore
 
-    for start, end in consecutive_pairs(to_keep.nonzero()[0]):
-        if not result:
-            result.append(points[start])
 
-        if not eq_with_next[start]:
-            if eps > 0:
-                _simplify_line(points, start, end, eps, distance_func, result)
-            else:
-                result.extend(points[(start + 1) : (end - 1)])
+_module_cache: dict[str, tuple[tuple[int, int], Any]] = {}
+"""Modules loaded with `load_module()`, keyed by the absolute paths of their
+files. Each entry also stores the modification time (in nanoseconds) and the
+size of the file when it was loaded.
+"""
 
-        result.append(points[end])
 
-    return factory(result)  # type: ignore
+def is_vectorized(func: Callable[..., Any]) -> bool:
+    """Returns whether the given custom light effect function was marked as
+    vectorized with the `vectorized()` decorator or by setting its
+    ``vectorized`` attribute to `True`.
+    """
+    return getattr(func, "vectorized", False) is True
 
 
-def _simplify_line(
-    points: Sequence[T],
-    start: int,
-    end: int,
-    eps: float,
-    distance_func: DistanceFunc,
-    result: list[T],
-) -> None:
-    if end - start < 2:
-        return
+def load_module(path: str, *, reload: bool = False) -> Any:
+    """Loads a module and returns it.
 
-    dists = distance_func(points[start : (end + 1)], points[start], points[end])
-    index = max(range(len(dists)), key=dists.__getitem__)
-    dmax = dists[index]
+    Loaded modules are cached; a module is executed again only if its file
+    was modified since it was loaded (based on its modification time and
+    size) or if it is reloaded explicitly.
 
-    if dmax <= eps:
-        return
+    Parameters:
+        path: the path to the module.
+        reload: whether to execute the module again even if its file has not
+            changed.
 
-    index += start
+    Returns:
+        the loaded module.
+    """
+    resolved_path = os.path.abspath(path)
+    stat = os.stat(resolved_path)
+    signature = stat.st_mtime_ns, stat.st_size
 
-    result.append(points[index])
-    _simplify_line(points, start, index, eps, distance_func, result)
-    _simplify_line(points, index, end, eps, distance_func, result)
+    entry = _module_cache.get(resolved_path)
+    if entry is not None and entry[0] == signature and not reload:
+        return entry[1]
 
+    spec = importlib.util.spec_from_file_location("colors_module", resolved_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    _module_cache[resolved_path] = signature, module
+    return module
 
-def load_module(path: str) -> Any:
-    """Loads a module and returns it.
+
+def load_function(path: str, name: str) -> Optional[Callable[..., Any]]:
+    """Loads a module with `load_module()` and returns the function with the
+    given name from the module.
 
     Parameters:
         path: the path to the module.
+        name: the name of the function.
 
     Returns:
-        the loaded module.
+        the function, or `None` if the module has no attribute with the given
+        name.
     """
-    spec = importlib.util.spec_from_file_location("colors_module", path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
+    return getattr(load_module(path), name, None)
 
 
 class LRUCache(Generic[K, V], MutableMapping[K, V]):
@@ -271,3 +286,33 @@ class LRUCache(Generic[K, V], MutableMapping[K, V]):
         return self._items[key]
 
     __getitem__ = peek
+
+
+def vectorized(func: C) -> C:
+    """Decorator that marks a custom light effect function as vectorized.
+
+    Vectorized functions are called once per frame for all the drones instead
+    of once per drone. They receive the following keyword arguments:
+
+    - ``frame``: the frame index
+    - ``time_fraction``: the time elapsed since the start of the light effect,
+      as a fraction of its duration
+    - ``drone_indices``: integer array of shape ``(N,)`` with the indices of
+      the drones
+    - ``formation_indices``: integer array of shape ``(N,)`` with the indices
+      of the drones in the formation (-1 for drones not mapped to the
+      formation), or `None` if there is no mapping in the current frame
+    - ``positions``: array of shape ``(N, 3)`` with the positions of the drones
+    - ``drone_count``: the total number of drones
+
+    Color functions must return an array of shape ``(N, 3)`` or ``(N, 4)``
+    with the RGB or RGBA colors of the drones. Output functions must return
+    an array of shape ``(N,)``, using NaN for drones that the light effect
+    should not affect.
+
+    Setting the ``vectorized`` attribute of the function to `True` has the
+    same effect; this is useful in files that should not depend on this
+    module.
+    """
+    func.vectorized = True  # type: ignore
+    return func